@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# Throughput benchmark for FindTheMole (fileriskscanner.py) and the metadata
+# reader (exifread.py) on a reproducible synthetic corpus.
+#
+#   python3 benchmarks/bench_scanners.py --corpus /tmp/corpus --out run.json
+#   python3 benchmarks/bench_scanners.py --corpus /tmp/corpus --compare old.json
+#
+# Everything runs offline: VT_API_KEY is removed and the scan cache is off.
+# Each tool runs in its own interpreter so peak RSS is measured per tool.
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import struct
+import zipfile
+import argparse
+import platform
+import resource
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODULES = os.path.join(os.path.dirname(HERE), "modules")
+
+SEED = 1337
+ZIP_TIME = (2020, 1, 1, 0, 0, 0)
+
+# ---------------------------
+# Corpus generators
+# ---------------------------
+
+def _tiff_exif(make, model, when, lat, lon):
+    # little-endian TIFF: IFD0 (Make, Model, DateTime, GPS pointer) + GPS IFD
+    def rational(v):
+        return struct.pack("<II", int(v * 10000), 10000)
+
+    def dms(v):
+        v = abs(v)
+        d = int(v)
+        m = int((v - d) * 60)
+        s = ((v - d) * 60 - m) * 60
+        return rational(d) + rational(m) + rational(s)
+
+    strings = [make.encode() + b"\0", model.encode() + b"\0", when.encode() + b"\0"]
+    ifd0_count = 4
+    ifd0_size = 2 + ifd0_count * 12 + 4
+    gps_count = 4
+    gps_size = 2 + gps_count * 12 + 4
+    data_off = 8 + ifd0_size + gps_size
+
+    blob = b""
+    offsets = []
+    for sv in strings:
+        offsets.append(data_off + len(blob))
+        blob += sv
+    lat_off = data_off + len(blob)
+    blob += dms(lat)
+    lon_off = data_off + len(blob)
+    blob += dms(lon)
+
+    ifd0 = struct.pack("<H", ifd0_count)
+    ifd0 += struct.pack("<HHII", 0x010F, 2, len(strings[0]), offsets[0])
+    ifd0 += struct.pack("<HHII", 0x0110, 2, len(strings[1]), offsets[1])
+    ifd0 += struct.pack("<HHII", 0x0132, 2, len(strings[2]), offsets[2])
+    ifd0 += struct.pack("<HHII", 0x8825, 4, 1, 8 + ifd0_size)
+    ifd0 += struct.pack("<I", 0)
+
+    gps = struct.pack("<H", gps_count)
+    gps += struct.pack("<HH I 2s2x", 0x0001, 2, 2, b"NS"[lat < 0:][:1] + b"\0")
+    gps += struct.pack("<HHII", 0x0002, 5, 3, lat_off)
+    gps += struct.pack("<HH I 2s2x", 0x0003, 2, 2, b"EW"[lon < 0:][:1] + b"\0")
+    gps += struct.pack("<HHII", 0x0004, 5, 3, lon_off)
+    gps += struct.pack("<I", 0)
+
+    return b"II*\x00" + struct.pack("<I", 8) + ifd0 + gps + blob
+
+def make_jpeg(rng, size):
+    exif = b"Exif\x00\x00" + _tiff_exif(
+        rng.choice(["Canon", "Nikon", "Apple"]), rng.choice(["EOS 80D", "D750", "iPhone 12"]),
+        f"20{rng.randint(10, 23)}:0{rng.randint(1, 9)}:1{rng.randint(0, 9)} 12:00:00",
+        rng.uniform(-80, 80), rng.uniform(-170, 170)
+    )
+    out = b"\xff\xd8" + b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif
+    # entropy-coded-looking payload so size is configurable
+    body = rng.randbytes(max(0, size - len(out) - 4)).replace(b"\xff", b"\xfe")
+    return out + b"\xff\xda\x00\x02" + body + b"\xff\xd9"
+
+def make_pdf(rng, size):
+    author = rng.choice(["alice", "bob", "carol"])
+    stream = rng.randbytes(max(0, size - 600)).hex()[:max(0, size - 600)].encode()
+    objs = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Author (%s) /Producer (bench) /CreationDate (D:20200101000000Z) >>" % author.encode(),
+    ]
+    out = b"%PDF-1.4\n"
+    xref = []
+    for i, body in enumerate(objs, 1):
+        xref.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    start = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % x for x in xref)
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, start)
+    return out
+
+CORE_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dc:creator>{author}</dc:creator><cp:lastModifiedBy>{author}</cp:lastModifiedBy>'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">2021-03-04T05:06:07Z</dcterms:created>'
+    '<dcterms:modified xsi:type="dcterms:W3CDTF">2021-03-05T05:06:07Z</dcterms:modified>'
+    '</cp:coreProperties>'
+)
+
+APP_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+    '<Application>{app}</Application>{extra}</Properties>'
+)
+
+def _zip_write(z, name, data):
+    z.writestr(zipfile.ZipInfo(name, ZIP_TIME), data, compress_type=zipfile.ZIP_DEFLATED)
+
+def make_docx(rng, size):
+    buf = io.BytesIO()
+    words = " ".join(rng.choice(["lorem", "ipsum", "dolor", "sit", "amet"]) for _ in range(size // 6))
+    with zipfile.ZipFile(buf, "w") as z:
+        _zip_write(z, "[Content_Types].xml", "<Types/>")
+        _zip_write(z, "docProps/core.xml", CORE_XML.format(author=rng.choice(["alice", "bob"])))
+        _zip_write(z, "docProps/app.xml", APP_XML.format(app="Microsoft Office Word", extra="<Pages>1</Pages>"))
+        _zip_write(z, "word/document.xml", f"<w:document><w:body><w:p>{words}</w:p></w:body></w:document>")
+    return buf.getvalue()
+
+def make_xlsx(rng, size):
+    buf = io.BytesIO()
+    rows = "".join(f'<row r="{r}"><c r="A{r}"><v>{rng.random()}</v></c></row>' for r in range(1, size // 40 + 2))
+    with zipfile.ZipFile(buf, "w") as z:
+        _zip_write(z, "[Content_Types].xml", "<Types/>")
+        _zip_write(z, "docProps/core.xml", CORE_XML.format(author=rng.choice(["alice", "bob"])))
+        _zip_write(z, "docProps/app.xml", APP_XML.format(app="Microsoft Excel", extra=""))
+        _zip_write(z, "xl/workbook.xml",
+                   '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                   '<sheets><sheet name="Data" sheetId="1"/><sheet name="Summary" sheetId="2"/></sheets></workbook>')
+        _zip_write(z, "xl/worksheets/sheet1.xml", f"<worksheet><sheetData>{rows}</sheetData></worksheet>")
+    return buf.getvalue()
+
+def make_zip(rng, size):
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, "w") as z:
+        _zip_write(z, "inner.txt", rng.randbytes(size // 4).hex())
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        _zip_write(z, "nested.zip", inner.getvalue())
+        _zip_write(z, "secret.bin", rng.randbytes(size // 4))
+        _zip_write(z, "notes.txt", "powershell -enc AAAA " * 10)
+        # zipfile can't encrypt; flag the member so it looks password protected
+        z.getinfo("secret.bin").flag_bits |= 0x1
+    return buf.getvalue()
+
+def make_elf(rng, size):
+    head = b"\x7fELF\x02\x01\x01" + b"\0" * 9 + struct.pack("<HHI", 2, 0x3E, 1)
+    return head + rng.randbytes(max(0, size - len(head)))
+
+def make_pe(rng, size):
+    head = b"MZ" + b"\0" * 58 + struct.pack("<I", 64) + b"PE\0\0"
+    return head + rng.randbytes(max(0, size - len(head)))
+
+def make_blob(rng, size):
+    return rng.randbytes(size)
+
+GENERATORS = {
+    "jpg": make_jpeg,
+    "pdf": make_pdf,
+    "docx": make_docx,
+    "xlsx": make_xlsx,
+    "zip": make_zip,
+    "elf": make_elf,
+    "exe": make_pe,
+    "bin": make_blob,
+}
+
+def generate_corpus(root, count, sizes, seed=SEED):
+    """count files per (kind, size); identical output for identical arguments."""
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    spec = {"seed": seed, "count": count, "sizes": sizes, "kinds": sorted(GENERATORS)}
+    for kind in sorted(GENERATORS):
+        for size in sizes:
+            for i in range(count):
+                name = os.path.join(root, f"{kind}_{size}_{i:04d}.{kind}")
+                with open(name, "wb") as f:
+                    f.write(GENERATORS[kind](rng, size))
+    with open(os.path.join(root, "corpus.json"), "w") as f:
+        json.dump(spec, f, indent=2)
+    return spec
+
+# ---------------------------
+# Measurement (child process)
+# ---------------------------
+
+def percentiles(values):
+    if not values:
+        return {}
+    v = sorted(values)
+    pick = lambda q: v[min(len(v) - 1, int(q * len(v)))]
+    return {"p50": pick(0.50) * 1000, "p90": pick(0.90) * 1000,
+            "p99": pick(0.99) * 1000, "max": v[-1] * 1000}
+
+def corpus_files(root):
+    files = []
+    for base, dirs, names in os.walk(root):
+        dirs.sort()
+        files += [os.path.join(base, n) for n in sorted(names) if n != "corpus.json"]
+    return files
+
+def _kind(path):
+    return os.path.splitext(path)[1].lstrip(".")
+
+# Each tool returns (latency percentiles, {kind: error count}, failed paths);
+# failed files are left out of the throughput so a broken parser can't look fast.
+
+def bench_scanner(files):
+    import fileriskscanner
+    fileriskscanner.configure(cache=None)
+    per_check, errors, failed = {}, {}, set()
+    for path in files:
+        result = fileriskscanner.analyze_file(path)
+        for name, t in result["timings"].items():
+            per_check.setdefault(name, []).append(t)
+        if any(x[0] == "error" for x in result["findings"]):
+            errors[_kind(path)] = errors.get(_kind(path), 0) + 1
+            failed.add(path)
+    return {name: percentiles(v) for name, v in per_check.items()}, errors, failed
+
+def bench_reader(files):
+    import exifread as reader
+    per_kind, errors, failed = {}, {}, set()
+    for path in files:
+        t = time.perf_counter()
+        rec = reader.capture_scan(path)
+        elapsed = time.perf_counter() - t
+        if rec.error:
+            errors[_kind(path)] = errors.get(_kind(path), 0) + 1
+            failed.add(path)
+            continue
+        per_kind.setdefault(_kind(path), []).append(elapsed)
+    return {name: percentiles(v) for name, v in per_kind.items()}, errors, failed
+
+TOOLS = {"scanner": bench_scanner, "reader": bench_reader}
+
+def run_child(tool, root):
+    sys.path.insert(0, MODULES)
+    os.environ.pop("VT_API_KEY", None)
+    files = corpus_files(root)
+    total = sum(os.path.getsize(f) for f in files)
+
+    start = time.perf_counter()
+    latency, errors, failed = TOOLS[tool](files)
+    elapsed = time.perf_counter() - start
+    done = len(files) - len(failed)
+    total -= sum(os.path.getsize(f) for f in failed)
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss //= 1024
+    return {
+        "files": done,
+        "errors": errors,
+        "bytes": total,
+        "elapsed": elapsed,
+        "files_per_sec": done / elapsed if elapsed else None,
+        "mb_per_sec": total / 1e6 / elapsed if elapsed else None,
+        "peak_rss_kb": rss,
+        "latency_ms": latency,
+    }
+
+# ---------------------------
+# Driver
+# ---------------------------
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+            capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(old, new):
+    print(f"\n{'tool':<10} {'metric':<14} {'old':>12} {'new':>12} {'change':>9}")
+    for tool, stats in new["tools"].items():
+        before = old.get("tools", {}).get(tool)
+        if not before:
+            continue
+        for metric in ("files_per_sec", "mb_per_sec", "peak_rss_kb"):
+            a, b = before.get(metric), stats.get(metric)
+            if not a or b is None:
+                continue
+            print(f"{tool:<10} {metric:<14} {a:>12.2f} {b:>12.2f} {(b - a) / a * 100:>8.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FindTheMole and the metadata reader")
+    parser.add_argument("--corpus", required=True, help="corpus directory (generated if missing)")
+    parser.add_argument("--count", type=int, default=5, help="files per kind and size")
+    parser.add_argument("--sizes", default="4096,262144,4194304",
+                        help="comma-separated file sizes in bytes")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--regenerate", action="store_true")
+    parser.add_argument("--tools", default="scanner,reader")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="print deltas against an earlier run")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.corpus)))
+        return
+
+    sizes = [int(x) for x in args.sizes.split(",") if x]
+    if args.regenerate or not os.path.exists(os.path.join(args.corpus, "corpus.json")):
+        spec = generate_corpus(args.corpus, args.count, sizes, args.seed)
+    else:
+        with open(os.path.join(args.corpus, "corpus.json")) as f:
+            spec = json.load(f)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": spec,
+        "tools": {},
+    }
+
+    for tool in args.tools.split(","):
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--corpus", args.corpus, "--child", tool],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"[!] {tool} failed:\n{proc.stderr}", file=sys.stderr)
+            continue
+        stats = results["tools"][tool] = json.loads(proc.stdout.splitlines()[-1])
+        print(f"[+] {tool:<8} {stats['files']} files  {stats['files_per_sec']:.1f} files/s  "
+              f"{stats['mb_per_sec']:.1f} MB/s  peak RSS {stats['peak_rss_kb'] / 1024:.1f} MB")
+        if stats["errors"]:
+            failed = ", ".join(f"{kind}: {n}" for kind, n in sorted(stats["errors"].items()))
+            print(f"[!] {tool:<8} {sum(stats['errors'].values())} files failed and were "
+                  f"excluded ({failed})", file=sys.stderr)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"[+] Saved results: {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
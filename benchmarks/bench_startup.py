@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# Startup cost of the metadata reader (exifread.py), measured the way
+# MikoshiOSINT.sh pays it: a fresh interpreter per run.
+#
+#   python3 benchmarks/bench_startup.py --runs 15
+#
+# "eager" loads every parser backend up front, which is what the reader
+# used to do at import time; "jpeg" is a real one-file run with lazy loading.
+
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from bench_scanners import MODULES, SEED, make_jpeg
+
+CASES = {
+    "import": "import exifread",
+    "jpeg": "import exifread; exifread.scan_file({path!r})",
+    "eager": "import exifread; exifread.BACKENDS.load_all()",
+}
+
+def time_case(code, runs):
+    # timed inside the child: interpreter start is the same for every case
+    probe = ("import time, io, contextlib; t = time.perf_counter()\n"
+             "with contextlib.redirect_stdout(io.StringIO()):\n"
+             f"    {code}\n"
+             "print(time.perf_counter() - t)")
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", probe], cwd=MODULES, env=env,
+                             capture_output=True, text=True, check=True).stdout
+        samples.append(float(out.strip().splitlines()[-1]) * 1000)
+    return samples
+
+def loaded_backends():
+    code = "import exifread; exifread.BACKENDS.load_all(); print(exifread.BACKENDS.loaded())"
+    out = subprocess.run([sys.executable, "-c", code], cwd=MODULES,
+                         capture_output=True, text=True).stdout.strip()
+    return out.splitlines()[-1] if out else "[]"
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metadata reader startup")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "one.jpg")
+        with open(path, "wb") as f:
+            f.write(make_jpeg(random.Random(SEED), 64 * 1024))
+
+        results = {}
+        for name, code in CASES.items():
+            samples = time_case(code.format(path=path), args.runs)
+            results[name] = {"median_ms": statistics.median(samples),
+                             "min_ms": min(samples), "max_ms": max(samples)}
+
+    print(f"\n{'case':<8} {'median ms':>10} {'min ms':>9} {'max ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['median_ms']:>10.1f} {r['min_ms']:>9.1f} {r['max_ms']:>9.1f}")
+    print(f"\nbackends available here: {loaded_backends()}")
+    eager, jpeg = results["eager"]["median_ms"], results["jpeg"]["median_ms"]
+    print(f"one JPEG vs eager load: {eager - jpeg:+.1f} ms saved")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"runs": args.runs, "cases": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
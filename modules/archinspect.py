@@ -0,0 +1,109 @@
+# ZIP / Office container inspection for FindTheMole
+# The central directory is parsed once per archive; nested archives are read
+# from the member stream into memory (bounded) and inspected recursively,
+# nothing is extracted to disk.
+
+import os
+import zipfile
+from io import BytesIO
+
+from magicsig import EXT_KIND, KIND_EXTS
+
+MAX_DEPTH = 3
+MAX_MEMBER = 64 * 1024 * 1024      # nested archives bigger than this are not opened
+MAX_SNIFF = 256                    # members per archive sniffed for a PK header
+BOMB_RATIO = 100
+BOMB_MIN = 10 * 1024 * 1024        # ignore tiny members with silly ratios
+BOMB_TOTAL = 4 * 1024 * 1024 * 1024
+
+ZIP_KINDS = {"zip"} | KIND_EXTS["zip"]
+
+class ArchiveReport:
+    def __init__(self):
+        self.members = 0
+        self.total_size = 0
+        self.total_compressed = 0
+        self.encrypted = []
+        self.macros = []
+        self.bombs = []
+        self.nested = []
+        self.corrupted = []
+        self.skipped = []
+
+    @property
+    def ratio(self):
+        return self.total_size / max(self.total_compressed, 1)
+
+def _read_bounded(z, info, limit):
+    buf = BytesIO()
+    with z.open(info) as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                break
+            buf.write(chunk)
+            if buf.tell() > limit:
+                return None
+    buf.seek(0)
+    return buf
+
+def _looks_nested(z, info, sniffed):
+    ext = os.path.splitext(info.filename)[1].lower().lstrip(".")
+    if EXT_KIND.get(ext) in ZIP_KINDS:
+        return True
+    if sniffed >= MAX_SNIFF or info.flag_bits & 0x1 or info.file_size < 4:
+        return False
+    with z.open(info) as f:
+        return f.read(4) == b"PK\x03\x04"
+
+def _inspect(z, report, depth, prefix):
+    sniffed = 0
+    for info in z.infolist():
+        if info.is_dir():
+            continue
+        name = prefix + info.filename
+        report.members += 1
+        report.total_size += info.file_size
+        report.total_compressed += info.compress_size
+
+        if info.flag_bits & 0x1:
+            report.encrypted.append(name)
+        if "vbaProject.bin" in info.filename:
+            report.macros.append(name)
+
+        ratio = info.file_size / max(info.compress_size, 1)
+        if info.file_size >= BOMB_MIN and ratio >= BOMB_RATIO:
+            report.bombs.append((name, ratio))
+
+        try:
+            nested = _looks_nested(z, info, sniffed)
+            sniffed += 1
+        except Exception:
+            report.corrupted.append(name)
+            continue
+        if not nested:
+            continue
+
+        report.nested.append(name)
+        if depth + 1 > MAX_DEPTH or info.file_size > MAX_MEMBER or info.flag_bits & 0x1:
+            report.skipped.append(name)
+            continue
+        try:
+            buf = _read_bounded(z, info, MAX_MEMBER)
+            if buf is None:
+                report.skipped.append(name)
+                continue
+            with zipfile.ZipFile(buf) as inner:
+                _inspect(inner, report, depth + 1, name + "!/")
+        except Exception:
+            report.corrupted.append(name)
+
+def inspect_zip(source):
+    """ArchiveReport for a path or seekable file object. Raises if the
+    top-level archive itself can't be opened."""
+    report = ArchiveReport()
+    with zipfile.ZipFile(source) as z:
+        _inspect(z, report, 0, "")
+    if report.total_size >= BOMB_TOTAL:
+        report.bombs.append(("<total>", report.ratio))
+    return report
@@ -0,0 +1,424 @@
+# Streaming archive walker for the metadata reader (exifread.py)
+# Members are yielded one at a time: ZIP central directories (zip64 too) are
+# parsed straight from the file with struct, RAR / 7z go through rarfile /
+# py7zr iteration. Filters, pagination and the summary never keep more than
+# one page + the top-N heap in memory.
+#
+#   python3 modules/archwalk.py dump.zip --ext jpg,heic --min-size 1M --limit 50
+#   python3 modules/archwalk.py dump.zip --summary --top 20
+#   python3 modules/archwalk.py dump.zip --since 2022-01-01 --meta --format jsonl
+
+import os
+import json
+import zlib
+import heapq
+import struct
+import argparse
+import itertools
+from collections import Counter
+from functools import lru_cache
+from datetime import datetime, timezone
+
+from lazyimport import Backends
+from metarecord import norm_time
+
+LIBS = Backends({"rarfile": ("rarfile", None), "py7zr": ("py7zr", None)})
+
+MAX_READ = 32 * 1024 * 1024        # member bytes read for in-stream metadata
+READ_BUFFER = 1024 * 1024
+
+class Member:
+    __slots__ = ("name", "size", "compressed", "date", "is_dir", "encrypted",
+                 "method", "offset")
+
+    def __init__(self, name, size=0, compressed=None, date=None, is_dir=False,
+                 encrypted=False, method=None, offset=None):
+        self.name = name
+        self.size = size or 0
+        self.compressed = compressed
+        self.date = date
+        self.is_dir = is_dir
+        self.encrypted = encrypted
+        self.method = method
+        self.offset = offset
+
+    @property
+    def ext(self):
+        return os.path.splitext(self.name)[1].lower().lstrip(".")
+
+    def to_dict(self):
+        out = {"name": self.name, "date": self.date, "size": self.size}
+        if self.compressed is not None:
+            out["compressed"] = self.compressed
+        if self.is_dir:
+            out["dir"] = True
+        if self.encrypted:
+            out["encrypted"] = True
+        return out
+
+# ---------------------------
+# ZIP (central directory, zip64)
+# ---------------------------
+
+EOCD = struct.Struct("<4s4H2IH")
+EOCD64_LOCATOR = struct.Struct("<4sIQI")
+EOCD64 = struct.Struct("<4sQ2H2I4Q")
+CENTRAL = struct.Struct("<4s6H3I5H2I")
+LOCAL = struct.Struct("<4s5H3I2H")
+MAX_COMMENT = 65535
+
+@lru_cache(maxsize=4096)
+def _dos_time(date, time):
+    # members of one archive share few distinct timestamps
+    month, day = (date >> 5) & 0xF, date & 0x1F
+    if not (1 <= month <= 12 and day):
+        return None
+    return (f"{((date >> 9) & 0x7F) + 1980:04d}-{month:02d}-{day:02d}"
+            f"T{time >> 11:02d}:{(time >> 5) & 0x3F:02d}:{(time & 0x1F) * 2:02d}")
+
+def _zip_extra(extra, usize, csize, offset):
+    """zip64 sizes/offset and the Unix mtime from the extra field"""
+    mtime = None
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, size = struct.unpack_from("<HH", extra, pos)
+        body = extra[pos + 4:pos + 4 + size]
+        if tag == 0x0001:
+            vals = [v[0] for v in struct.iter_unpack("<Q", body[:len(body) // 8 * 8])]
+            if usize == 0xFFFFFFFF and vals:
+                usize = vals.pop(0)
+            if csize == 0xFFFFFFFF and vals:
+                csize = vals.pop(0)
+            if offset == 0xFFFFFFFF and vals:
+                offset = vals.pop(0)
+        elif tag == 0x5455 and body[:1] and body[0] & 1 and len(body) >= 5:
+            mtime = struct.unpack_from("<I", body, 1)[0]
+        pos += 4 + size
+    return usize, csize, offset, mtime
+
+class ZipWalker:
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb", buffering=READ_BUFFER)
+        self.f.seek(0, os.SEEK_END)
+        self.size = self.f.tell()
+        self.entries, self.cd_size, self.cd_offset, self.concat = self._end_record()
+
+    def _end_record(self):
+        tail_size = min(self.size, EOCD.size + MAX_COMMENT)
+        self.f.seek(self.size - tail_size)
+        tail = self.f.read(tail_size)
+        pos = tail.rfind(b"PK\x05\x06")
+        while pos >= 0 and pos + EOCD.size > len(tail):
+            pos = tail.rfind(b"PK\x05\x06", 0, pos)
+        if pos < 0:
+            raise ValueError("not a zip file (no end of central directory)")
+        eocd_at = self.size - tail_size + pos
+        _, _, _, _, entries, cd_size, cd_offset, _ = EOCD.unpack_from(tail, pos)
+        end = eocd_at
+
+        if eocd_at >= EOCD64_LOCATOR.size:
+            self.f.seek(eocd_at - EOCD64_LOCATOR.size)
+            sig, _, _, _ = EOCD64_LOCATOR.unpack(self.f.read(EOCD64_LOCATOR.size))
+            if sig == b"PK\x06\x07":
+                end = eocd_at - EOCD64_LOCATOR.size - EOCD64.size
+                self.f.seek(end)
+                raw = self.f.read(EOCD64.size)
+                if len(raw) == EOCD64.size and raw[:4] == b"PK\x06\x06":
+                    _, _, _, _, _, _, _, entries, cd_size, cd_offset = EOCD64.unpack(raw)
+                else:
+                    end = eocd_at
+        # bytes prepended to the archive (self-extractors) shift every offset
+        return entries, cd_size, cd_offset, max(0, end - cd_size - cd_offset)
+
+    def members(self):
+        # the directory is read in READ_BUFFER chunks and parsed from memory
+        pos = self.cd_offset + self.concat
+        stop = pos + self.cd_size
+        buf, at = b"", 0
+        while pos < stop:
+            if at + CENTRAL.size > len(buf):
+                self.f.seek(pos)
+                buf, at = self.f.read(min(READ_BUFFER, stop - pos)), 0
+                if len(buf) < CENTRAL.size:
+                    return
+            (sig, _, _, flags, method, mtime, mdate, _, csize, usize,
+             name_len, extra_len, comment_len, _, _, _, offset) = CENTRAL.unpack_from(buf, at)
+            if sig != b"PK\x01\x02":
+                return
+            end = at + CENTRAL.size + name_len + extra_len + comment_len
+            if end > len(buf):
+                if at == 0:
+                    return
+                # entry crosses the chunk: refill from its start
+                buf = b""
+                continue
+            name = buf[at + CENTRAL.size:at + CENTRAL.size + name_len]
+            if flags & 0x800:
+                name = name.decode("utf-8", "replace")
+            else:
+                # the cp437 codec is pure Python; most names are ASCII anyway
+                name = name.decode("ascii") if name.isascii() else name.decode("cp437")
+            unix = None
+            if extra_len:
+                extra = buf[at + CENTRAL.size + name_len:at + CENTRAL.size + name_len + extra_len]
+                usize, csize, offset, unix = _zip_extra(extra, usize, csize, offset)
+            date = (datetime.fromtimestamp(unix, timezone.utc).replace(tzinfo=None).isoformat()
+                    if unix else _dos_time(mdate, mtime))
+            pos += end - at
+            at = end
+            yield Member(name, usize, csize, date, name.endswith("/"), bool(flags & 1),
+                         method, offset)
+
+    def read(self, member, limit=MAX_READ):
+        """member bytes (stored / deflate), None if too big or unsupported"""
+        if member.encrypted or member.is_dir or member.size > limit or member.method not in (0, 8):
+            return None
+        f = self.f
+        f.seek(member.offset + self.concat)
+        head = f.read(LOCAL.size)
+        if len(head) < LOCAL.size or head[:4] != b"PK\x03\x04":
+            return None
+        name_len, extra_len = LOCAL.unpack(head)[-2:]
+        f.seek(name_len + extra_len, os.SEEK_CUR)
+        if member.method == 0:
+            return f.read(member.size)
+        out = bytearray()
+        inflate = zlib.decompressobj(-15)
+        left = member.compressed
+        while left > 0 and len(out) <= limit:
+            chunk = f.read(min(READ_BUFFER, left))
+            if not chunk:
+                break
+            left -= len(chunk)
+            out += inflate.decompress(chunk, limit + 1 - len(out))
+        return bytes(out) if len(out) <= limit else None
+
+    def close(self):
+        self.f.close()
+
+# ---------------------------
+# RAR / 7z
+# ---------------------------
+
+class RarWalker:
+    def __init__(self, path):
+        rarfile = LIBS.get("rarfile")
+        if rarfile is None:
+            raise ImportError("rarfile not installed")
+        self.rf = rarfile.RarFile(path)
+
+    def members(self):
+        for info in self.rf.infolist():
+            yield Member(info.filename, info.file_size, info.compress_size,
+                         norm_time(info.date_time), info.isdir(), info.needs_password())
+
+    def read(self, member, limit=MAX_READ):
+        if member.encrypted or member.is_dir or member.size > limit:
+            return None
+        try:
+            with self.rf.open(member.name) as f:
+                return f.read(limit)
+        except Exception:
+            # rarfile needs unrar/bsdtar for compressed members
+            return None
+
+    def close(self):
+        self.rf.close()
+
+class SevenZipWalker:
+    def __init__(self, path):
+        py7zr = LIBS.get("py7zr")
+        if py7zr is None:
+            raise ImportError("py7zr not installed")
+        self.archive = py7zr.SevenZipFile(path, mode="r")
+        self.encrypted = self.archive.needs_password()
+
+    def members(self):
+        for f in self.archive.files:
+            when = getattr(f, "lastwritetime", None)
+            # UTC without offset, like ZIP extended timestamps
+            date = when.as_datetime().replace(tzinfo=None, microsecond=0).isoformat() if when else None
+            yield Member(f.filename, getattr(f, "uncompressed", 0),
+                         getattr(f, "compressed", None), date, f.is_directory, self.encrypted)
+
+    def read(self, member, limit=MAX_READ):
+        # solid blocks: one member can cost decompressing the whole block
+        return None
+
+    def close(self):
+        self.archive.close()
+
+WALKERS = {"zip": ZipWalker, "rar": RarWalker, "7z": SevenZipWalker}
+
+class open_archive:
+    """with open_archive(path, kind) as arc: for m in arc.members(): ..."""
+
+    def __init__(self, path, kind="zip"):
+        self.walker = WALKERS[kind](path)
+
+    def __enter__(self):
+        return self.walker
+
+    def __exit__(self, *exc):
+        self.walker.close()
+
+# ---------------------------
+# Filters, pages, summary
+# ---------------------------
+
+_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+def parse_size(text):
+    text = str(text).strip().upper().rstrip("B")
+    unit = text[-1:] if text[-1:] in _UNITS else ""
+    return int(float(text[:len(text) - len(unit)]) * _UNITS[unit])
+
+def filter_members(members, exts=None, min_size=None, max_size=None,
+                   since=None, until=None, dirs=False):
+    """since/until are ISO strings compared against member dates"""
+    exts = {e.lower().lstrip(".") for e in exts} if exts else None
+    for m in members:
+        if m.is_dir and not dirs:
+            continue
+        if exts is not None and m.ext not in exts:
+            continue
+        if min_size is not None and m.size < min_size:
+            continue
+        if max_size is not None and m.size > max_size:
+            continue
+        if since and (not m.date or m.date < since):
+            continue
+        if until and (not m.date or m.date > until):
+            continue
+        yield m
+
+def page(members, offset=0, limit=None):
+    return itertools.islice(members, offset, None if limit is None else offset + limit)
+
+class Summary:
+    def __init__(self, top=10):
+        self.top = top
+        self.members = 0
+        self.dirs = 0
+        self.encrypted = 0
+        self.total_size = 0
+        self.total_compressed = 0
+        self.first = None
+        self.last = None
+        self.exts = Counter()
+        self._largest = []
+
+    def add(self, m):
+        self.members += 1
+        if m.is_dir:
+            self.dirs += 1
+            return
+        self.encrypted += m.encrypted
+        self.total_size += m.size
+        self.total_compressed += m.compressed or 0
+        if m.date:
+            self.first = m.date if self.first is None else min(self.first, m.date)
+            self.last = m.date if self.last is None else max(self.last, m.date)
+        self.exts[m.ext or "(none)"] += 1
+        if self.top:
+            item = (m.size, m.name)
+            if len(self._largest) < self.top:
+                heapq.heappush(self._largest, item)
+            elif item > self._largest[0]:
+                heapq.heapreplace(self._largest, item)
+
+    def to_dict(self):
+        return {
+            "members": self.members,
+            "dirs": self.dirs,
+            "encrypted": self.encrypted,
+            "total_size": self.total_size,
+            "total_compressed": self.total_compressed,
+            "first": self.first,
+            "last": self.last,
+            "extensions": dict(self.exts.most_common(self.top or None)),
+            "largest": [{"name": n, "size": s} for s, n in sorted(self._largest, reverse=True)],
+        }
+
+def date_bounds(since=None, until=None):
+    """CLI dates -> ISO bounds; a bare --until date includes that whole day"""
+    lo = norm_time(since) if since else None
+    hi = norm_time(until) if until else None
+    if (since and lo is None) or (until and hi is None):
+        raise ValueError(f"bad date: {since if since and lo is None else until}")
+    if hi and len(until.strip()) <= 10:
+        hi = hi[:10] + "T23:59:59"
+    return lo, hi
+
+# ---------------------------
+# CLI
+# ---------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="List huge archives without loading them")
+    parser.add_argument("archive")
+    parser.add_argument("--type", choices=sorted(WALKERS), help="archive type (default: by signature)")
+    parser.add_argument("--ext", help="only these extensions, comma separated")
+    parser.add_argument("--min-size", type=parse_size, help="e.g. 500K, 10M")
+    parser.add_argument("--max-size", type=parse_size)
+    parser.add_argument("--since", help="earliest member date (YYYY-MM-DD or ISO 8601)")
+    parser.add_argument("--until", help="latest member date")
+    parser.add_argument("--dirs", action="store_true", help="include directory entries")
+    parser.add_argument("--offset", type=int, default=0)
+    parser.add_argument("--limit", type=int, help="members per page (default: all)")
+    parser.add_argument("--summary", action="store_true", help="print only the summary")
+    parser.add_argument("--top", type=int, default=10, help="largest members / extensions in the summary")
+    parser.add_argument("--meta", action="store_true",
+                        help="read metadata of image/document members in memory")
+    parser.add_argument("--format", choices=("text", "jsonl"), default="text")
+    args = parser.parse_args()
+
+    kind = args.type
+    if kind is None:
+        from magicsig import detect_file
+        detected, _ = detect_file(args.archive)
+        # docx/apk/jar and self-extracting exes are zips found by their end record
+        kind = detected if detected in WALKERS else "zip"
+    try:
+        since, until = date_bounds(args.since, args.until)
+    except ValueError as e:
+        parser.error(str(e))
+    exts = args.ext.split(",") if args.ext else None
+    reader = None
+    if args.meta:
+        import exifread as reader
+
+    summary = Summary(args.top)
+    try:
+        arc_ctx = open_archive(args.archive, kind)
+    except (OSError, ValueError, ImportError) as e:
+        parser.error(str(e))
+    with arc_ctx as arc:
+        members = filter_members(arc.members(), exts, args.min_size, args.max_size,
+                                 since, until, args.dirs)
+        for i, m in enumerate(members):
+            summary.add(m)
+            if args.summary or i < args.offset or (args.limit is not None and i >= args.offset + args.limit):
+                continue
+            item = m.to_dict()
+            if reader is not None:
+                meta = reader.member_meta(args.archive, arc, m)
+                if meta:
+                    item["meta"] = meta
+            if args.format == "jsonl":
+                print(json.dumps(item, ensure_ascii=False))
+            else:
+                line = f"{m.name} | {m.date} | {m.size} bytes"
+                if item.get("meta"):
+                    line += " | " + json.dumps(item["meta"], ensure_ascii=False)
+                print(line)
+    if args.format == "jsonl":
+        print(json.dumps({"summary": summary.to_dict()}, ensure_ascii=False))
+    else:
+        if not args.summary:
+            print()
+        print(json.dumps(summary.to_dict(), indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
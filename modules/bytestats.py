@@ -0,0 +1,66 @@
+# Byte statistics for FindTheMole: histograms, entropy, printable ratio
+# NumPy is used when available, otherwise everything falls back to C-level
+# builtins (Counter, bytes.translate) so no per-byte Python loop remains.
+
+import math
+import string
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# histograms of whole files are only affordable with NumPy's bincount
+FAST_HISTOGRAM = np is not None
+
+PRINTABLE = string.printable.encode()
+MIN_STRING = 9
+
+# ---------------------------
+# Histograms
+# ---------------------------
+
+def empty_histogram():
+    if np is not None:
+        return np.zeros(256, dtype=np.int64)
+    return [0] * 256
+
+def histogram(data):
+    if np is not None:
+        return np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+    counts = [0] * 256
+    for b, n in Counter(data).items():
+        counts[b] = n
+    return counts
+
+def add_histogram(acc, counts):
+    if np is not None:
+        acc += counts
+        return acc
+    return [a + b for a, b in zip(acc, counts)]
+
+# ---------------------------
+# Entropy / printable ratio
+# ---------------------------
+
+def entropy_from_counts(counts, total):
+    if not total:
+        return 0.0
+    if np is not None:
+        c = np.asarray(counts, dtype=np.float64)
+        p = c[c > 0] / total
+        return float(-(p * np.log2(p)).sum())
+    return -sum((v / total) * math.log2(v / total) for v in counts if v)
+
+def entropy(data):
+    if not data:
+        return 0.0
+    return entropy_from_counts(histogram(data), len(data))
+
+def printable_ratio(data):
+    if not data:
+        return 0.0
+    # translate() with a delete table strips printable bytes in C
+    printable = len(data) - len(bytes(data).translate(None, PRINTABLE))
+    return printable / len(data)
@@ -1,8 +1,27 @@
 import piexif
-from PIL import Image
 import random
 import datetime
+import argparse
+import tempfile
+import hashlib
+import struct
+import shutil
+import glob
+import json
+import time
+import zlib
+import sys
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from magicsig import detect
+from lazyimport import Backends
+
+# Pillow нужен только для форматов без байтового переписывания (TIFF, BMP, GIF, ...)
+LIBS = Backends({"Image": ("PIL.Image", None)})
+
+CHUNK = 1 << 20
 
 # ---------- RANDOM DATA ----------
 
@@ -46,16 +65,8 @@ def random_gps():
         piexif.GPSIFD.GPSLongitude: to_dms(lon)
     }
 
-# ---------- MAIN CLEANER ----------
-
-def sanitize_image(path):
-    img = Image.open(path)
-
-    # Полное удаление старого EXIF
-    clean_img = Image.new(img.mode, img.size)
-    clean_img.putdata(list(img.getdata()))
-
-    # Рандомные EXIF
+def random_exif():
+    """b'Exif\\0\\0' + TIFF со случайной камерой, датой и GPS"""
     make, model = random.choice(CAMERAS)
 
     exif_dict = {
@@ -74,15 +85,482 @@ def sanitize_image(path):
         "thumbnail": None
     }
 
-    exif_bytes = piexif.dump(exif_dict)
+    return piexif.dump(exif_dict)
+
+EXIF_HEADER = b"Exif\x00\x00"
+
+def _tiff(exif):
+    # PNG eXIf и WebP EXIF хранят TIFF без заголовка "Exif\0\0"
+    return exif[len(EXIF_HEADER):] if exif and exif.startswith(EXIF_HEADER) else exif
+
+def _copy(src, dst, n):
+    while n > 0:
+        buf = src.read(min(n, CHUNK))
+        if not buf:
+            raise ValueError("truncated file")
+        dst.write(buf)
+        n -= len(buf)
+
+def _read(src, n):
+    buf = src.read(n)
+    if len(buf) != n:
+        raise ValueError("truncated file")
+    return buf
+
+# ---------- JPEG ----------
+
+# сегменты без длины: TEM, RST0-7
+_STANDALONE = {0x01} | set(range(0xD0, 0xD8))
+
+def _keep_jpeg_segment(marker, payload):
+    """оставляем всё, что нужно для декодирования и цвета; APPn/COM с метаданными - нет"""
+    if marker == 0xE0:
+        return payload.startswith((b"JFIF\x00", b"JFXX\x00"))
+    if marker == 0xE2:
+        return payload.startswith(b"ICC_PROFILE\x00")
+    if marker == 0xEE:
+        return payload.startswith(b"Adobe")      # цветовое преобразование CMYK/YCCK
+    if 0xE0 <= marker <= 0xEF or marker == 0xFE:
+        return False                             # Exif/XMP, MPF, IPTC (APP13), COM, ...
+    return True
+
+def rewrite_jpeg(src, dst, exif=None):
+    """Копирует JPEG без метаданных; скан-данные переносятся байт в байт"""
+    if _read(src, 2) != b"\xff\xd8":
+        raise ValueError("not a JPEG")
+    dst.write(b"\xff\xd8")
+    pending = exif
+
+    while True:
+        b = _read(src, 1)
+        if b != b"\xff":
+            raise ValueError("broken JPEG marker")
+        while b == b"\xff":                      # байты-заполнители
+            b = _read(src, 1)
+        marker = b[0]
+
+        if marker in _STANDALONE:
+            dst.write(b"\xff" + b)
+            continue
+        if marker == 0xD9:
+            dst.write(b"\xff\xd9")
+            return
+
+        head = _read(src, 2)
+        length = struct.unpack(">H", head)[0]
+        if length < 2:
+            raise ValueError("broken JPEG segment")
+        payload = _read(src, length - 2)
+
+        # новый EXIF - сразу после SOI/JFIF, как его пишут камеры
+        if pending and not (marker == 0xE0 and _keep_jpeg_segment(marker, payload)):
+            dst.write(b"\xff\xe1" + struct.pack(">H", len(pending) + 2) + pending)
+            pending = None
+
+        if marker == 0xDA:
+            dst.write(b"\xff\xda" + head + payload)
+            _copy_scan(src, dst)
+            return
+        if _keep_jpeg_segment(marker, payload):
+            dst.write(b"\xff" + b + head + payload)
+
+def _copy_scan(src, dst):
+    # до первого EOI: в энтропийных данных 0xFF всегда экранирован (FF 00),
+    # так что FF D9 - настоящий конец. Хвост после EOI (MPF-кадры, превью со
+    # своим EXIF, дописанные данные) отбрасывается.
+    tail = b""
+    while True:
+        buf = src.read(CHUNK)
+        if not buf:
+            dst.write(tail)
+            return
+        data = tail + buf
+        end = data.find(b"\xff\xd9")
+        if end >= 0:
+            dst.write(data[:end + 2])
+            return
+        dst.write(data[:-1])
+        tail = data[-1:]
+
+# ---------- PNG ----------
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# текстовые чанки (Author, Software, Comment, XMP), EXIF и время изменения
+PNG_DROP = {b"tEXt", b"zTXt", b"iTXt", b"eXIf", b"tIME"}
+
+def _png_chunk(ctype, data):
+    return struct.pack(">I", len(data)) + ctype + data + \
+        struct.pack(">I", zlib.crc32(ctype + data) & 0xFFFFFFFF)
+
+def rewrite_png(src, dst, exif=None):
+    """Копирует PNG без текстовых чанков; IDAT и остальное - байт в байт, с исходным CRC"""
+    if _read(src, 8) != PNG_SIGNATURE:
+        raise ValueError("not a PNG")
+    dst.write(PNG_SIGNATURE)
+    pending = _tiff(exif)
+
+    while True:
+        head = src.read(8)
+        if not head:
+            return
+        if len(head) != 8:
+            raise ValueError("truncated file")
+        length, ctype = struct.unpack(">I4s", head)
+
+        # eXIf обязан стоять до первого IDAT
+        if pending and ctype in (b"IDAT", b"IEND"):
+            dst.write(_png_chunk(b"eXIf", pending))
+            pending = None
+
+        if ctype in PNG_DROP:
+            src.seek(length + 4, os.SEEK_CUR)
+            continue
+        dst.write(head)
+        _copy(src, dst, length + 4)
+        if ctype == b"IEND":
+            return
+
+# ---------- WebP ----------
+
+VP8X_ICC, VP8X_ALPHA, VP8X_EXIF, VP8X_XMP, VP8X_ANIM = 0x20, 0x10, 0x08, 0x04, 0x02
+WEBP_DROP = {b"EXIF", b"XMP "}
+
+def _webp_chunks(src):
+    """(fourcc, offset данных, размер) - читаются только заголовки чанков"""
+    head = _read(src, 12)
+    if head[:4] != b"RIFF" or head[8:12] != b"WEBP":
+        raise ValueError("not a WebP")
+    end = 8 + struct.unpack("<I", head[4:8])[0]
+    chunks, pos = [], 12
+    while pos + 8 <= end:
+        src.seek(pos)
+        fourcc, size = struct.unpack("<4sI", _read(src, 8))
+        chunks.append((fourcc, pos + 8, size))
+        pos += 8 + size + (size & 1)
+    return chunks
+
+def _canvas(src, fourcc, offset):
+    """(ширина, высота, есть альфа) из заголовка потока VP8/VP8L"""
+    src.seek(offset)
+    data = _read(src, 10)
+    if fourcc == b"VP8 ":
+        if data[3:6] != b"\x9d\x01\x2a":
+            raise ValueError("bad VP8 frame")
+        w, h = struct.unpack("<HH", data[6:10])
+        return w & 0x3FFF, h & 0x3FFF, False
+    if data[0] != 0x2F:
+        raise ValueError("bad VP8L header")
+    bits = struct.unpack("<I", data[1:5])[0]
+    return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, bool(bits >> 28 & 1)
+
+def _vp8x(flags, width, height):
+    data = struct.pack("<B3x", flags) + (width - 1).to_bytes(3, "little") + \
+        (height - 1).to_bytes(3, "little")
+    return b"VP8X" + struct.pack("<I", len(data)) + data
+
+def rewrite_webp(src, dst, exif=None):
+    """Копирует WebP без EXIF/XMP, правит флаги VP8X и размер RIFF"""
+    chunks = [c for c in _webp_chunks(src) if c[0] not in WEBP_DROP]
+    payload = _tiff(exif)
 
-    out = "cleaned_" + os.path.basename(path)
-    clean_img.save(out, "jpeg", exif=exif_bytes, quality=95)
+    header = b""
+    if chunks and chunks[0][0] == b"VP8X":
+        _, offset, size = chunks.pop(0)
+        src.seek(offset)
+        data = bytearray(_read(src, size))
+        data[0] &= ~(VP8X_EXIF | VP8X_XMP) & 0xFF
+        if payload:
+            data[0] |= VP8X_EXIF
+        header = b"VP8X" + struct.pack("<I", size) + bytes(data) + b"\x00" * (size & 1)
+    elif payload:
+        # простой формат (один VP8/VP8L) - для EXIF нужен расширенный заголовок
+        fourcc, offset, _ = chunks[0]
+        width, height, alpha = _canvas(src, fourcc, offset)
+        header = _vp8x(VP8X_EXIF | (VP8X_ALPHA if alpha else 0), width, height)
 
-    print(f"[+] Saved sanitized image: {out}")
+    trailer = b""
+    if payload:
+        trailer = b"EXIF" + struct.pack("<I", len(payload)) + payload + b"\x00" * (len(payload) & 1)
+
+    riff = 4 + len(header) + len(trailer) + sum(8 + s + (s & 1) for _, _, s in chunks)
+    dst.write(b"RIFF" + struct.pack("<I", riff) + b"WEBP" + header)
+    for fourcc, offset, size in chunks:
+        src.seek(offset - 8)
+        _copy(src, dst, 8 + size + (size & 1))
+    dst.write(trailer)
+
+# ---------- PILLOW FALLBACK ----------
+
+def rewrite_pillow(path, out, exif=None):
+    """Остальные форматы: пиксели переносятся внутри Pillow, без Python-списков"""
+    Image = LIBS.get("Image")
+    if Image is None:
+        raise RuntimeError("Pillow is required for this image format")
+    with Image.open(path) as img:
+        fmt = img.format
+        clean = Image.new(img.mode, img.size)
+        clean.paste(img)
+        if img.mode == "P":
+            clean.putpalette(img.getpalette())
+            if "transparency" in img.info:
+                clean.info["transparency"] = img.info["transparency"]
+    kwargs = {"exif": exif} if exif and fmt in ("JPEG", "PNG", "WEBP", "TIFF") else {}
+    clean.save(out, fmt, **kwargs)
+
+# ---------- MAIN CLEANER ----------
+
+REWRITERS = {"jpg": rewrite_jpeg, "png": rewrite_png, "webp": rewrite_webp}
+
+def sanitize_image(path, out=None, strip=False):
+    """Снимает метаданные и (без strip) подставляет случайный EXIF; возвращает путь результата"""
+    out = out or "cleaned_" + os.path.basename(path)
+    exif = None if strip else random_exif()
+
+    with open(path, "rb") as src:
+        rewrite = REWRITERS.get(detect(src.read(16)))
+        if rewrite is not None:
+            src.seek(0)
+            with open(out, "wb") as dst:
+                rewrite(src, dst, exif)
+            return out
+
+    rewrite_pillow(path, out, exif)
+    return out
+
+# ---------- METADATA FINGERPRINT ----------
+
+def _jpeg_meta(src):
+    # сегменты до первого SOS; скан-данные не читаются
+    src.read(2)
+    while True:
+        b = src.read(2)
+        if len(b) < 2 or b[0] != 0xFF or b[1] in (0xD9, 0xDA):
+            return
+        if b[1] in _STANDALONE:
+            continue
+        length = struct.unpack(">H", _read(src, 2))[0]
+        if 0xE0 <= b[1] <= 0xEF or b[1] == 0xFE:
+            payload = _read(src, length - 2)
+            yield b[1], payload, not _keep_jpeg_segment(b[1], payload)
+        else:
+            src.seek(length - 2, os.SEEK_CUR)
+
+def _png_meta(src):
+    src.read(8)
+    while True:
+        head = src.read(8)
+        if len(head) < 8:
+            return
+        length, ctype = struct.unpack(">I4s", head)
+        if ctype in (b"IDAT", b"IEND"):
+            src.seek(length + 4, os.SEEK_CUR)
+            continue
+        yield ctype, _read(src, length), ctype in PNG_DROP
+        src.seek(4, os.SEEK_CUR)
+
+def _webp_meta(src):
+    for fourcc, offset, size in _webp_chunks(src):
+        if fourcc in WEBP_DROP or fourcc == b"VP8X":
+            src.seek(offset)
+            yield fourcc, _read(src, size), fourcc in WEBP_DROP
+
+FINGERPRINTS = {"jpg": _jpeg_meta, "png": _png_meta, "webp": _webp_meta}
+
+def metadata_fingerprint(path):
+    """(sha256 метаданных, есть ли что снимать) по заголовкам; (None, True) для прочих форматов"""
+    with open(path, "rb") as src:
+        walk = FINGERPRINTS.get(detect(src.read(16)))
+        if walk is None:
+            return None, True
+        src.seek(0)
+        h, dirty = hashlib.sha256(), False
+        for tag, payload, droppable in walk(src):
+            h.update(repr(tag).encode() + struct.pack(">I", len(payload)) + payload)
+            dirty = dirty or droppable
+    return h.hexdigest(), dirty
+
+# ---------- BATCH ----------
+
+IMAGE_KINDS = {"jpg", "png", "webp", "gif", "bmp", "tiff"}
+MANIFEST = os.path.join(os.path.expanduser("~"), ".cache", "mikoshi", "exifclean.json")
+
+def _stat_key(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def clean_file(src, dest, strip=False):
+    """sanitize_image во временный файл рядом с dest + атомарный os.replace"""
+    folder = os.path.dirname(os.path.abspath(dest))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".exifclean-",
+                               suffix=os.path.splitext(dest)[1])
+    os.close(fd)
+    try:
+        sanitize_image(src, tmp, strip)
+        shutil.copymode(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def clean_task(src, dest, strip=False, known=None):
+    """-> (src, dest, status, секунды, байт, запись манифеста или ошибка)"""
+    start = time.perf_counter()
+    try:
+        with open(src, "rb") as f:
+            kind = detect(f.read(16))
+        if kind not in IMAGE_KINDS:
+            return src, dest, "ignored", 0.0, 0, None
+        size = os.path.getsize(src)
+
+        # уже очищен этим же инструментом и с тех пор не менялся
+        if known and known["src"] == _stat_key(src) and os.path.exists(dest) \
+                and metadata_fingerprint(dest)[0] == known["out"]:
+            return src, dest, "skipped", time.perf_counter() - start, size, known
+        # --strip на месте: снимать нечего
+        if strip and src == dest:
+            digest, dirty = metadata_fingerprint(src)
+            if not dirty:
+                entry = {"src": _stat_key(src), "out": digest}
+                return src, dest, "skipped", time.perf_counter() - start, size, entry
+
+        clean_file(src, dest, strip)
+        entry = {"src": _stat_key(src), "out": metadata_fingerprint(dest)[0]}
+        return src, dest, "cleaned", time.perf_counter() - start, size, entry
+    except Exception as e:
+        return src, dest, "error", time.perf_counter() - start, 0, f"{type(e).__name__}: {e}"
+
+def expand_inputs(paths):
+    """(файл, корневая папка или None) для файлов, папок и glob-шаблонов"""
+    for arg in paths:
+        matches = [arg] if os.path.exists(arg) else sorted(glob.glob(arg, recursive=True))
+        if not matches:
+            print(f"[!] Path not found: {arg}", file=sys.stderr)
+        for path in matches:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for file in sorted(files):
+                        yield os.path.join(root, file), path
+            else:
+                yield path, None
+
+def _output_root(root, out_dir):
+    return out_dir or "cleaned_" + os.path.basename(os.path.abspath(root))
+
+def destination(src, root, out_dir=None, in_place=False):
+    if in_place:
+        return src
+    if root is not None:
+        return os.path.join(_output_root(root, out_dir), os.path.relpath(src, root))
+    return os.path.join(out_dir or "", "cleaned_" + os.path.basename(src))
+
+def load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(path, manifest):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+def clean_pool(jobs):
+    try:
+        return ProcessPoolExecutor(max_workers=jobs)
+    except (NotImplementedError, ImportError, OSError):
+        # нет sem_open (Termux) - потоки
+        return ThreadPoolExecutor(max_workers=jobs)
+
+def clean_batch(paths, out_dir=None, in_place=False, strip=False, jobs=1,
+                manifest_path=MANIFEST, force=False):
+    """чистит всё найденное, печатает строку на файл и итог; возвращает счётчики"""
+    manifest = {} if manifest_path is None else load_manifest(manifest_path)
+    counts = {"cleaned": 0, "skipped": 0, "error": 0, "ignored": 0}
+    total_bytes = 0
+    started = time.perf_counter()
+
+    def report(result):
+        nonlocal total_bytes
+        src, dest, status, seconds, size, extra = result
+        counts[status] += 1
+        if status == "error":
+            print(f"[!] {src}: {extra}")
+            return
+        if status == "ignored":
+            return
+        key = os.path.abspath(dest)
+        manifest[key] = extra
+        if status == "skipped":
+            print(f"[=] {src} (already clean)")
+        else:
+            total_bytes += size
+            print(f"[+] {src} -> {dest} ({seconds * 1000:.1f} ms)")
+
+    def tasks():
+        for src, root in expand_inputs(paths):
+            # выходная папка внутри обходимой - свои результаты не трогаем
+            if root is not None and not in_place and os.path.abspath(src).startswith(
+                    os.path.abspath(_output_root(root, out_dir)) + os.sep):
+                continue
+            dest = destination(src, root, out_dir, in_place)
+            known = None if force else manifest.get(os.path.abspath(dest))
+            yield src, dest, strip, known
+
+    try:
+        if jobs > 1:
+            with clean_pool(jobs) as pool:
+                pending = deque()
+                for task in tasks():
+                    pending.append(pool.submit(clean_task, *task))
+                    if len(pending) >= jobs * 4:
+                        report(pending.popleft().result())
+                while pending:
+                    report(pending.popleft().result())
+        else:
+            for task in tasks():
+                report(clean_task(*task))
+    finally:
+        if manifest_path is not None:
+            try:
+                save_manifest(manifest_path, manifest)
+            except OSError as e:
+                print(f"[!] Manifest not saved: {e}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(f"\n[*] {counts['cleaned']} cleaned, {counts['skipped']} skipped, "
+          f"{counts['error']} failed, {counts['ignored']} not images in {elapsed:.2f} s")
+    if counts["cleaned"] and elapsed > 0:
+        print(f"[*] {counts['cleaned'] / elapsed:.1f} files/s, "
+              f"{total_bytes / elapsed / 1e6:.1f} MB/s")
+    return counts
 
 # ---------- RUN ----------
 
 if __name__ == "__main__":
-    path = input("Enter the path to the photo: ").strip()
-    sanitize_image(path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Strip or randomize image metadata")
+    parser.add_argument("paths", nargs="*",
+                        help="images, folders or glob patterns (asked interactively if omitted)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--out-dir", help="write cleaned copies here (folder layout is kept)")
+    target.add_argument("--in-place", action="store_true",
+                        help="replace the originals (atomic rename)")
+    parser.add_argument("--strip", action="store_true",
+                        help="only remove metadata, do not insert random EXIF")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--manifest", default=MANIFEST,
+                        help=f"fingerprints of cleaned files (default: {MANIFEST})")
+    parser.add_argument("--force", action="store_true",
+                        help="clean files even if the manifest says they are clean")
+    args = parser.parse_args()
+
+    paths = args.paths or [input("Enter the path to the photo or folder: ").strip()]
+    counts = clean_batch(paths, args.out_dir, args.in_place, args.strip,
+                         max(1, args.jobs), args.manifest, args.force)
+    sys.exit(1 if counts["error"] else 0)
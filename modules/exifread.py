@@ -1,289 +1,558 @@
 import os
+import sys
 import zipfile
+import argparse
 from io import BytesIO
-
-# -------- Импорты библиотек --------
-# PDF
-try:
-    from PyPDF2 import PdfReader
-except ImportError:
-    PdfReader = None
-
-# DOCX
-try:
-    from docx import Document
-except ImportError:
-    Document = None
-
-# XLSX
-try:
-    import openpyxl
-except ImportError:
-    openpyxl = None
-
-# PPTX
-try:
-    import pptx
-except ImportError:
-    pptx = None
-
-# Аудио
-try:
-    from mutagen.mp3 import MP3
-    from mutagen.flac import FLAC
-    from mutagen.oggvorbis import OggVorbis
-    from mutagen.mp4 import MP4
-except ImportError:
-    MP3 = FLAC = OggVorbis = MP4 = None
-
-# Изображения
-try:
-    import exifread
-except ImportError:
-    exifread = None
-
-# Pillow (PNG, BMP, GIF, WEBP)
-try:
-    from PIL import Image
-except ImportError:
-    Image = None
-
-# HEIC
-try:
-    import pyheif
-except ImportError:
-    pyheif = None
-
-# Архивы
-try:
-    import rarfile
-except ImportError:
-    rarfile = None
-
-try:
-    import py7zr
-except ImportError:
-    py7zr = None
-
-# Hachoir (любые файлы)
-try:
-    from hachoir.parser import createParser
-    from hachoir.metadata import extractMetadata
-except ImportError:
-    createParser = extractMetadata = None
-
-# FFprobe для видео
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from lazyimport import Backends
+
+# -------- Библиотеки (ленивая загрузка) --------
+# Импорт при первом использовании формата, а не при старте:
+# на Termux полный набор грузится несколько секунд.
+BACKENDS = Backends({
+    # PDF
+    "PdfReader": ("PyPDF2", "PdfReader"),
+    # Аудио
+    "MP3": ("mutagen.mp3", "MP3"),
+    "FLAC": ("mutagen.flac", "FLAC"),
+    "OggVorbis": ("mutagen.oggvorbis", "OggVorbis"),
+    "MP4": ("mutagen.mp4", "MP4"),
+    # Изображения
+    "exifread": ("exifread", None),
+    "Image": ("PIL.Image", None),
+    "pyheif": ("pyheif", None),
+    # Архивы
+    "rarfile": ("rarfile", None),
+    "py7zr": ("py7zr", None),
+    # Hachoir (любые файлы)
+    "createParser": ("hachoir.parser", "createParser"),
+    "extractMetadata": ("hachoir.metadata", "extractMetadata"),
+})
+
+backend = BACKENDS.get
+
+# Видео / HEIC: свой разбор контейнера, FFprobe - запасной вариант
 import subprocess
 import json
+from mediaprobe import probe as probe_media
 
-# -------- Функции сканирования --------
+# Определение типа по magic bytes
+from magicsig import EXT_KIND, HEADER_SIZE, detect, detect_file
 
-def scan_pdf(path):
-    if PdfReader is None:
-        print("[!] PyPDF2 not installed")
-        return
-    reader = PdfReader(path)
-    print(reader.metadata)
+# ZIP / RAR / 7z - потоковый обход без загрузки всего списка
+from archwalk import Summary, date_bounds, filter_members, open_archive, parse_size
 
-def scan_docx(path):
-    if Document is None:
-        print("[!] python-docx not installed")
-        return
-    doc = Document(path)
-    props = doc.core_properties
-    print(f"Author: {props.author}, Created: {props.created}, Modified: {props.modified}")
+# DOCX / XLSX / PPTX - свойства без python-docx/openpyxl/python-pptx
+from ooxmlmeta import read_props
 
-def scan_xlsx(path):
-    if openpyxl is None:
-        print("[!] openpyxl not installed")
-        return
-    wb = openpyxl.load_workbook(path, data_only=True)
-    print(f"Sheets: {wb.sheetnames}")
+# Единый формат результата и экспорт
+from metarecord import (MetaRecord, WRITERS, dms_to_deg, join_device, norm_time,
+                        parse_iso6709, plain, print_record, ratio)
 
-def scan_pptx(path):
-    if pptx is None:
-        print("[!] python-pptx not installed")
-        return
-    pres = pptx.Presentation(path)
-    print(f"Slides: {len(pres.slides)}")
+# -------- Функции сканирования --------
+# Каждый сканер возвращает MetaRecord (metarecord.py), печать - отдельно
+
+def missing(path, fmt, lib):
+    return MetaRecord(path, fmt, error=f"{lib} not installed")
+
+def scan_pdf(path, source=None):
+    PdfReader = backend("PdfReader")
+    if PdfReader is None:
+        return missing(path, "pdf", "PyPDF2")
+    rec = MetaRecord(path, "pdf")
+    info = PdfReader(source or path).metadata or {}
+    rec.raw = {str(k).lstrip("/"): plain(v) for k, v in info.items()}
+    rec.author = rec.raw.get("Author") or None
+    rec.software = rec.raw.get("Producer") or rec.raw.get("Creator") or None
+    rec.set_time("created", rec.raw.get("CreationDate"))
+    rec.set_time("modified", rec.raw.get("ModDate"))
+    return rec
+
+# Office: только docProps/*.xml и workbook.xml, без загрузки ячеек/слайдов
+def scan_office(path, fmt, source=None):
+    props = read_props(source or path)
+    rec = MetaRecord(path, fmt)
+    rec.raw = props
+    rec.author = props.get("author") or props.get("last_modified_by")
+    if props.get("application"):
+        rec.software = f"{props['application']} {props.get('app_version', '')}".rstrip()
+    rec.set_time("created", props.get("created"))
+    rec.set_time("modified", props.get("modified"))
+    rec.set_time("printed", props.get("last_printed"))
+    return rec
+
+def scan_docx(path, source=None):
+    return scan_office(path, "docx", source)
+
+def scan_xlsx(path, source=None):
+    return scan_office(path, "xlsx", source)
+
+def scan_pptx(path, source=None):
+    return scan_office(path, "pptx", source)
+
+# Архивы: потоковый обход (archwalk), в записи - сводка и одна страница
+ARCHIVE_OPTIONS = {
+    "offset": 0, "limit": 100, "exts": None, "min_size": None, "max_size": None,
+    "since": None, "until": None, "top": 10, "meta": False,
+}
+
+def configure_archives(options):
+    """настройки листинга архивов; initializer для пула процессов"""
+    ARCHIVE_OPTIONS.update(options)
+
+# форматы, метаданные которых читаются из памяти (члены архивов)
+MEMBER_KINDS = ("pdf", "docx", "xlsx", "pptx", "jpg", "tiff", "png", "webp", "gif", "bmp")
+
+def scan_member(label, data):
+    """MetaRecord для содержимого файла в памяти, None если формат не поддержан"""
+    kind = detect(data[:HEADER_SIZE])
+    if kind not in MEMBER_KINDS:
+        return None
+    rec = SCANNERS[kind](label, BytesIO(data))
+    rec.format = kind
+    return rec
+
+def member_meta(path, arc, member):
+    """краткие метаданные члена архива (без записи на диск)"""
+    if EXT_KIND.get(member.ext) not in MEMBER_KINDS:
+        return None
+    data = arc.read(member)
+    if not data:
+        return None
+    try:
+        rec = scan_member(f"{path}!{member.name}", data)
+    except Exception as e:
+        return {"error": str(e)}
+    if rec is None:
+        return None
+    meta = {k: v for k, v in rec.to_dict().items()
+            if k in ("format", "author", "device", "software", "gps", "timestamps", "error") and v}
+    return meta or None
+
+def archive_record(path, fmt):
+    opts = ARCHIVE_OPTIONS
+    rec = MetaRecord(path, fmt)
+    summary = Summary(opts["top"])
+    since, until = date_bounds(opts["since"], opts["until"])
+    start, limit = opts["offset"], opts["limit"]
+    members = []
+    with open_archive(path, fmt) as arc:
+        for i, m in enumerate(filter_members(arc.members(), opts["exts"], opts["min_size"],
+                                             opts["max_size"], since, until)):
+            summary.add(m)
+            if i < start or (limit is not None and i >= start + limit):
+                continue
+            item = m.to_dict()
+            if opts["meta"]:
+                meta = member_meta(path, arc, m)
+                if meta:
+                    item["meta"] = meta
+            members.append(item)
+    info = summary.to_dict()
+    rec.raw["summary"] = info
+    rec.raw["members"] = members
+    if len(members) < info["members"] - info["dirs"]:
+        rec.raw["shown"] = f"{start + 1}-{start + len(members)} of {info['members'] - info['dirs']}"
+    rec.set_time("created", info["first"])
+    rec.set_time("modified", info["last"])
+    return rec
 
 def scan_zip(path):
-    with zipfile.ZipFile(path) as z:
-        for info in z.infolist():
-            print(f"{info.filename} | {info.date_time} | {info.file_size} bytes")
+    return archive_record(path, "zip")
 
 def scan_rar(path):
-    if rarfile is None:
-        print("[!] rarfile not installed")
-        return
-    rf = rarfile.RarFile(path)
-    for info in rf.infolist():
-        print(f"{info.filename} | {info.date_time} | {info.file_size} bytes")
+    if backend("rarfile") is None:
+        return missing(path, "rar", "rarfile")
+    return archive_record(path, "rar")
 
 def scan_7z(path):
-    if py7zr is None:
-        print("[!] py7zr not installed")
-        return
-    with py7zr.SevenZipFile(path, mode='r') as archive:
-        for name in archive.getnames():
-            print(name)
+    if backend("py7zr") is None:
+        return missing(path, "7z", "py7zr")
+    return archive_record(path, "7z")
+
+# теги аудио: ID3 / Vorbis comment / MP4 -> поля записи
+AUDIO_TAGS = {
+    "author": ("TPE1", "artist", "\xa9ART", "TCOM", "composer"),
+    "software": ("TSSE", "encoder", "\xa9too", "encoded-by"),
+    "created": ("TDRC", "date", "\xa9day", "TYER"),
+}
+
+def audio_record(path, fmt, audio):
+    rec = MetaRecord(path, fmt)
+    tags = audio.tags or {}
+    for key in tags.keys():
+        value = tags[key]
+        value = getattr(value, "text", value)
+        if isinstance(value, list) and len(value) == 1:
+            value = value[0]
+        rec.raw[str(key)] = plain(value)
+    for field, names in AUDIO_TAGS.items():
+        for name in names:
+            value = rec.raw.get(name)
+            if value in (None, ""):
+                continue
+            if field == "created":
+                rec.set_time("created", value)
+            else:
+                setattr(rec, field, str(value))
+            break
+    info = getattr(audio, "info", None)
+    if info is not None:
+        rec.raw["length"] = round(getattr(info, "length", 0) or 0, 3)
+        for name in ("bitrate", "sample_rate", "channels"):
+            if getattr(info, name, None):
+                rec.raw[name] = getattr(info, name)
+    return rec
 
 def scan_mp3(path):
+    MP3 = backend("MP3")
     if MP3 is None:
-        print("[!] mutagen not installed")
-        return
-    audio = MP3(path)
-    print("Keys:", audio.keys())
-    print("Length:", audio.info.length)
+        return missing(path, "mp3", "mutagen")
+    return audio_record(path, "mp3", MP3(path))
 
 def scan_flac(path):
+    FLAC = backend("FLAC")
     if FLAC is None:
-        print("[!] mutagen not installed")
-        return
-    audio = FLAC(path)
-    print(audio.pprint())
+        return missing(path, "flac", "mutagen")
+    return audio_record(path, "flac", FLAC(path))
 
 def scan_ogg(path):
+    OggVorbis = backend("OggVorbis")
     if OggVorbis is None:
-        print("[!] mutagen not installed")
-        return
-    audio = OggVorbis(path)
-    print(audio.pprint())
+        return missing(path, "ogg", "mutagen")
+    return audio_record(path, "ogg", OggVorbis(path))
 
 def scan_mp4_audio(path):
+    MP4 = backend("MP4")
     if MP4 is None:
-        print("[!] mutagen not installed")
-        return
-    audio = MP4(path)
-    print(audio.pprint())
-
-def scan_image_exif(path):
+        return missing(path, "m4a", "mutagen")
+    return audio_record(path, "m4a", MP4(path))
+
+def exif_fields(rec, get, gps):
+    """общие EXIF-поля; get(name) - значение тега IFD0/Exif, gps(name) - GPS IFD"""
+    rec.device = join_device(get("Make"), get("Model"))
+    rec.software = str(get("Software") or "").strip() or None
+    rec.author = str(get("Artist") or "").strip() or None
+    rec.set_time("taken", get("DateTimeOriginal"))
+    rec.set_time("digitized", get("DateTimeDigitized"))
+    rec.set_time("modified", get("DateTime"))
+    lat = gps("GPSLatitude")
+    lon = gps("GPSLongitude")
+    if lat and lon:
+        alt = gps("GPSAltitude")
+        try:
+            alt = ratio(alt[0] if isinstance(alt, (list, tuple)) else alt) if alt else None
+        except (TypeError, ValueError, ZeroDivisionError):
+            alt = None
+        rec.set_gps(dms_to_deg(lat, gps("GPSLatitudeRef")),
+                    dms_to_deg(lon, gps("GPSLongitudeRef")), alt)
+
+def scan_image_exif(path, source=None):
+    exifread = backend("exifread")
     if exifread is None:
-        print("[!] exifread not installed")
-        return
-    with open(path, "rb") as f:
+        return missing(path, "jpg", "exifread")
+    with source or open(path, "rb") as f:
         tags = exifread.process_file(f, details=False)
-    if tags:
-        for tag, value in tags.items():
-            print(f"{tag}: {value}")
-    else:
-        print("[+] No EXIF metadata found")
-
-def scan_image_pillow(path):
+    rec = MetaRecord(path, os.path.splitext(path)[1].lstrip(".").lower() or "jpg")
+    rec.raw = {tag: plain(str(value)) for tag, value in tags.items()}
+
+    def get(name):
+        for prefix in ("EXIF", "Image"):
+            tag = tags.get(f"{prefix} {name}")
+            if tag is not None:
+                return str(tag)
+        return None
+
+    def gps(name):
+        tag = tags.get(f"GPS {name}")
+        if tag is None:
+            return None
+        return tag.values if name in ("GPSLatitude", "GPSLongitude", "GPSAltitude") else str(tag)
+
+    exif_fields(rec, get, gps)
+    return rec
+
+# EXIF-теги для Pillow (getexif)
+PIL_TAGS = {"Make": 0x010F, "Model": 0x0110, "Software": 0x0131, "DateTime": 0x0132,
+            "Artist": 0x013B, "DateTimeOriginal": 0x9003, "DateTimeDigitized": 0x9004}
+PIL_GPS = {"GPSLatitudeRef": 1, "GPSLatitude": 2, "GPSLongitudeRef": 3,
+           "GPSLongitude": 4, "GPSAltitude": 6}
+
+def scan_image_pillow(path, source=None):
+    Image = backend("Image")
     if Image is None:
-        print("[!] Pillow not installed")
-        return
-    img = Image.open(path)
-    print(f"Format: {img.format}, Size: {img.size}, Mode: {img.mode}")
-    if img.info:
-        for k, v in img.info.items():
-            print(f"{k}: {v}")
-
-def scan_heic(path):
+        return missing(path, None, "Pillow")
+    with Image.open(source or path) as img:
+        rec = MetaRecord(path, (img.format or "").lower() or None)
+        rec.raw = {"size": list(img.size), "mode": img.mode}
+        rec.raw.update({str(k): plain(v) for k, v in img.info.items()})
+        exif = img.getexif()
+        ifd = exif.get_ifd(0x8769) if exif else {}
+        gps_ifd = exif.get_ifd(0x8825) if exif else {}
+
+    def get(name):
+        tag = PIL_TAGS[name]
+        return ifd.get(tag) or exif.get(tag)
+
+    exif_fields(rec, get, lambda name: gps_ifd.get(PIL_GPS[name]))
+    return rec
+
+def ffprobe(path):
+    cmd = ["ffprobe", "-v", "quiet", "-print_format", "json",
+           "-show_format", "-show_streams", path]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    return json.loads(result.stdout or "{}")
+
+# теги QuickTime/MP4 из ffprobe -> поля записи
+FFPROBE_TAGS = {
+    "device": (("com.apple.quicktime.make", "com.apple.quicktime.model"), ("make", "model")),
+    "software": ("com.apple.quicktime.software", "encoder", "software"),
+    "author": ("com.apple.quicktime.author", "artist", "author"),
+    "location": ("com.apple.quicktime.location.ISO6709", "location", "location-eng"),
+}
+
+def ffprobe_record(path, fmt):
     """
-    Сканирование HEIC через ffprobe (работает на Termux/Android)
+    Сканирование через ffprobe (работает на Termux/Android)
     """
     try:
-        cmd = [
-            "ffprobe",
-            "-v", "quiet",
-            "-print_format", "json",
-            "-show_format",
-            "-show_streams",
-            path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        info = json.loads(result.stdout)
-        # Выводим основные данные
-        if "format" in info:
-            fmt = info["format"]
-            print(f"Filename: {fmt.get('filename')}")
-            print(f"Format: {fmt.get('format_name')}")
-            print(f"Duration: {fmt.get('duration')} sec")
-            print(f"Size: {fmt.get('size')} bytes")
-            if "tags" in fmt:
-                print("Tags / Metadata:")
-                for k, v in fmt["tags"].items():
-                    print(f"  {k}: {v}")
-        if "streams" in info:
-            for i, stream in enumerate(info["streams"]):
-                print(f"\nStream #{i}:")
-                for k, v in stream.items():
-                    print(f"  {k}: {v}")
+        info = ffprobe(path)
     except Exception as e:
-        print("[!] FFprobe error:", e)
+        return MetaRecord(path, fmt, error=f"FFprobe error: {e}")
+    rec = MetaRecord(path, fmt)
+    container = info.get("format", {})
+    tags = {k.lower(): v for k, v in container.get("tags", {}).items()}
+    rec.raw = {"format_name": container.get("format_name"),
+               "duration": container.get("duration"),
+               "size": container.get("size"),
+               "tags": container.get("tags", {}),
+               "streams": [{k: v for k, v in s.items() if k != "disposition"}
+                           for s in info.get("streams", [])]}
+
+    for pair in FFPROBE_TAGS["device"]:
+        rec.device = rec.device or join_device(tags.get(pair[0]), tags.get(pair[1]))
+    for field in ("software", "author"):
+        for name in FFPROBE_TAGS[field]:
+            if tags.get(name):
+                setattr(rec, field, tags[name])
+                break
+    for name in FFPROBE_TAGS["location"]:
+        loc = parse_iso6709(tags.get(name))
+        if loc:
+            rec.set_gps(*loc)
+            break
+    rec.set_time("taken", tags.get("com.apple.quicktime.creationdate"))
+    rec.set_time("created", tags.get("creation_time"))
+    return rec
+
+def media_record(path, fmt, info):
+    """MetaRecord из mediaprobe.probe()"""
+    rec = MetaRecord(path, fmt)
+    rec.raw = {k: info[k] for k in ("container", "duration", "title", "streams", "tags")
+               if info.get(k) not in (None, [], {})}
+    rec.device = join_device(info.get("make"), info.get("model"))
+    rec.software = info.get("software")
+    rec.author = info.get("author")
+    rec.set_time("taken", info.get("taken"))
+    rec.set_time("created", info.get("created"))
+    rec.set_time("modified", info.get("modified"))
+    if info.get("location"):
+        rec.set_gps(*info["location"])
+    return rec
+
+# Видео/HEIC: заголовки контейнера читаются в Python (mediaprobe),
+# ffprobe - только для того, что mediaprobe не разобрал
+def scan_media(path, fmt):
+    info = probe_media(path)
+    if info is None:
+        return ffprobe_record(path, fmt)
+    return media_record(path, fmt, info)
+
+def scan_heic(path):
+    return scan_media(path, "heic")
 
 def scan_video_ffprobe(path):
-    try:
-        cmd = ["ffprobe","-v","quiet","-print_format","json","-show_format","-show_streams", path]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        info = json.loads(result.stdout)
-        print(json.dumps(info, indent=2))
-    except Exception as e:
-        print("[!] FFprobe error:", e)
+    return scan_media(path, os.path.splitext(path)[1].lstrip(".").lower() or None)
+
+# hachoir key -> поле
+HACHOIR_FIELDS = {
+    "author": "author", "producer": "software",
+    "creation_date": "created", "last_modification": "modified",
+}
 
 def scan_hachoir(path):
+    createParser = backend("createParser")
+    extractMetadata = backend("extractMetadata")
     if createParser is None or extractMetadata is None:
-        print("[!] hachoir not installed")
-        return
+        return missing(path, None, "hachoir")
     parser = createParser(path)
     if not parser:
-        print("[!] Can't read file!")
-        return
-    metadata = extractMetadata(parser)
-    if metadata:
-        print(metadata.exportPlaintext())
-    else:
-        print("[+] hachoir not finded any metadata")
+        return MetaRecord(path, error="Can't read file!")
+    with parser:
+        metadata = extractMetadata(parser)
+        rec = MetaRecord(path, getattr(parser, "mime_type", None))
+    if not metadata:
+        return rec
+    for item in metadata:
+        if not item.values:
+            continue
+        value = item.values[0].value
+        rec.raw[item.key] = plain(value)
+        field = HACHOIR_FIELDS.get(item.key)
+        if field in ("author", "software"):
+            setattr(rec, field, str(value))
+        elif field:
+            rec.set_time(field, value)
+    rec.device = join_device(rec.raw.get("camera_manufacturer"), rec.raw.get("camera_model"))
+    lat, lon = rec.raw.get("latitude"), rec.raw.get("longitude")
+    if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+        rec.set_gps(lat, lon, rec.raw.get("altitude") if isinstance(rec.raw.get("altitude"), (int, float)) else None)
+    return rec
 
 # -------- MAIN --------
 
-def scan_file(path):
-    ext = os.path.splitext(path)[1].lower()
-    if ext in [".pdf"]:
-        scan_pdf(path)
-    elif ext in [".docx"]:
-        scan_docx(path)
-    elif ext in [".xlsx"]:
-        scan_xlsx(path)
-    elif ext in [".pptx"]:
-        scan_pptx(path)
-    elif ext in [".zip"]:
-        scan_zip(path)
-    elif ext in [".rar"]:
-        scan_rar(path)
-    elif ext in [".7z"]:
-        scan_7z(path)
-    elif ext in [".mp3"]:
-        scan_mp3(path)
-    elif ext in [".flac"]:
-        scan_flac(path)
-    elif ext in [".ogg"]:
-        scan_ogg(path)
-    elif ext in [".m4a"]:
-        scan_mp4_audio(path)
-    elif ext in [".jpg", ".jpeg", ".tiff", ".tif"]:
-        scan_image_exif(path)
-    elif ext in [".png", ".webp", ".bmp", ".gif"]:
-        scan_image_pillow(path)
-    elif ext in [".heic", ".heif"]:
-        scan_heic(path)
-    elif ext in [".mp4", ".mkv", ".avi", ".mov"]:
-        scan_video_ffprobe(path)
-    else:
-        scan_hachoir(path)
+SCANNERS = {
+    "pdf": scan_pdf,
+    "docx": scan_docx,
+    "xlsx": scan_xlsx,
+    "pptx": scan_pptx,
+    "zip": scan_zip,
+    "rar": scan_rar,
+    "7z": scan_7z,
+    "mp3": scan_mp3,
+    "flac": scan_flac,
+    "ogg": scan_ogg,
+    "m4a": scan_mp4_audio,
+    "jpg": scan_image_exif,
+    "tiff": scan_image_exif,
+    "png": scan_image_pillow,
+    "webp": scan_image_pillow,
+    "bmp": scan_image_pillow,
+    "gif": scan_image_pillow,
+    "heic": scan_heic,
+    "mp4": scan_video_ffprobe,
+    "mov": scan_video_ffprobe,
+    "mkv": scan_video_ffprobe,
+    "avi": scan_video_ffprobe,
+}
+
+# сканеры, которые могут запустить внешний ffprobe (если mediaprobe не справился)
+MEDIA_SCANNERS = (scan_heic, scan_video_ffprobe)
+
+def scan_file(path, kind=None):
+    """MetaRecord для одного файла"""
+    # тип по сигнатуре, а не по расширению (переименованные файлы)
+    if kind is None:
+        kind, _ = detect_file(path)
+    scanner = SCANNERS.get(kind, scan_hachoir)
+    rec = scanner(path)
+    if scanner is not scan_hachoir:
+        rec.format = kind
+    return rec
+
+def capture_scan(path, kind=None):
+    """scan_file без исключений - для пулов"""
+    try:
+        return scan_file(path, kind)
+    except Exception as e:
+        return MetaRecord(path, kind, error=f"Error: {e}")
 
-def scan_path(path):
+# -------- Параллельный режим --------
+
+def parser_pool(jobs):
+    try:
+        return ProcessPoolExecutor(max_workers=jobs, initializer=configure_archives,
+                                   initargs=(dict(ARCHIVE_OPTIONS),))
+    except (NotImplementedError, ImportError, OSError):
+        # нет sem_open (Termux) - потоки
+        return ThreadPoolExecutor(max_workers=jobs)
+
+def iter_files(path):
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for file in sorted(files):
+            yield os.path.join(root, file)
+
+def scan_files_parallel(files, jobs=4, ffprobe_jobs=4):
+    """MetaRecord в исходном порядке; Python-парсеры в пуле процессов,
+    ffprobe - не больше ffprobe_jobs одновременно"""
+    window = (jobs + ffprobe_jobs) * 4
+    with parser_pool(jobs) as cpu, ThreadPoolExecutor(max_workers=ffprobe_jobs) as media:
+        pending = deque()
+        for path in files:
+            try:
+                kind, _ = detect_file(path)
+            except OSError as e:
+                fut = Future()
+                fut.set_result(MetaRecord(path, error=f"Error: {e}"))
+                pending.append(fut)
+                continue
+            pool = media if SCANNERS.get(kind) in MEDIA_SCANNERS else cpu
+            pending.append(pool.submit(capture_scan, path, kind))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def scan_path(path, jobs=1, ffprobe_jobs=4, writer=None):
+    """все записи для файла/папки -> writer (по умолчанию текст в stdout)"""
+    writer = writer or WRITERS["text"](sys.stdout)
     if os.path.isfile(path):
-        scan_file(path)
+        records = [capture_scan(path)]
     elif os.path.isdir(path):
-        for root, dirs, files in os.walk(path):
-            for file in files:
-                print(f"\n--- Scanning: {os.path.join(root,file)} ---")
-                scan_file(os.path.join(root, file))
+        if jobs > 1:
+            records = scan_files_parallel(iter_files(path), jobs, ffprobe_jobs)
+        else:
+            records = (capture_scan(file) for file in iter_files(path))
     else:
-        print("[!] Path not found")
+        print(f"[!] Path not found: {path}", file=sys.stderr)
+        return
+    for rec in records:
+        writer.write(rec)
 
 if __name__ == "__main__":
-    path = input("Enter file or folder path: ").strip()
-    scan_path(path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="File metadata reader")
+    parser.add_argument("paths", nargs="*", help="files or folders (asked interactively if omitted)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes for the Python parsers (default: 1)")
+    parser.add_argument("--ffprobe-jobs", type=int, default=4,
+                        help="concurrent ffprobe processes (default: 4)")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="text",
+                        help="output format (default: text)")
+    parser.add_argument("-o", "--output", help="write records here instead of stdout")
+    group = parser.add_argument_group("archives")
+    group.add_argument("--members", type=int, default=100,
+                       help="archive members listed per file, 0 = all (default: 100)")
+    group.add_argument("--offset", type=int, default=0, help="first archive member listed")
+    group.add_argument("--ext", help="only members with these extensions, comma separated")
+    group.add_argument("--min-size", type=parse_size, help="e.g. 500K, 10M")
+    group.add_argument("--max-size", type=parse_size)
+    group.add_argument("--since", help="earliest member date (YYYY-MM-DD or ISO 8601)")
+    group.add_argument("--until", help="latest member date")
+    group.add_argument("--top", type=int, default=10, help="largest members in the summary")
+    group.add_argument("--archive-meta", action="store_true",
+                       help="read metadata of image/document members in memory")
+    args = parser.parse_args()
+    try:
+        date_bounds(args.since, args.until)
+    except ValueError as e:
+        parser.error(str(e))
+    configure_archives({
+        "offset": max(0, args.offset), "limit": args.members or None,
+        "exts": args.ext.split(",") if args.ext else None,
+        "min_size": args.min_size, "max_size": args.max_size,
+        "since": args.since, "until": args.until, "top": args.top, "meta": args.archive_meta,
+    })
+
+    paths = args.paths or [input("Enter file or folder path: ").strip()]
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    writer = WRITERS[args.format](out)
+    try:
+        for path in paths:
+            scan_path(path, max(1, args.jobs), max(1, args.ffprobe_jobs), writer)
+    finally:
+        writer.close()
+        if out is not sys.stdout:
+            out.close()
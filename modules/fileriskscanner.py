@@ -5,65 +5,271 @@
 
 import os
 import sys
-import math
 import zipfile
-import string
 import hashlib
 import mimetypes
 import subprocess
 import json
-from collections import Counter
+import time
+import signal
+import argparse
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from io import BytesIO
 
+from bytestats import (
+    add_histogram, empty_histogram, entropy_from_counts,
+    histogram, printable_ratio, FAST_HISTOGRAM, MIN_STRING,
+)
+from iocmatch import DEFAULT_KEYWORDS, KeywordMatcher
+from scancache import DEFAULT_DB, ScanCache
+from vtclient import VTClient
+from scanprofile import Profiler
+from watcher import Debouncer, make_watcher
+from riskindex import DEFAULT_SOCKET, RiskIndex, query as query_index, serve as serve_index, stop as stop_index
+from magicsig import HEADER_SIZE, detect, matches_ext
+from archinspect import inspect_zip
+from lazyimport import Backends
+
 # ---------------------------
 # Optional libraries
 # ---------------------------
-try:
-    import exifread
-except:
-    exifread = None
-
 try:
     import requests
 except:
     requests = None
 
+# loaded on first use; also keeps modules/exifread.py from shadowing the library
+LIBS = Backends({"exifread": ("exifread", None)})
+
 # ---------------------------
 # Utils
 # ---------------------------
 
-def read_bytes(path, limit=1024 * 1024):
-    with open(path, "rb") as f:
-        return f.read(limit)
+HEAD_SIZE = 1024 * 1024
+TAIL_SIZE = 512
+CHUNK_SIZE = 1024 * 1024
+WINDOW_SIZE = 1024 * 1024
+WINDOW_SAMPLE = 64 * 1024
 
-def entropy(data):
-    if not data:
-        return 0.0
-    c = Counter(data)
-    total = len(data)
-    return -sum((v / total) * math.log2(v / total) for v in c.values())
+# ---------------------------
+# Streaming hasher
+# ---------------------------
 
-def printable_ratio(data):
-    if not data:
-        return 0.0
-    printable = sum(1 for b in data if chr(b) in string.printable)
-    return printable / len(data)
+class StreamHasher:
+    """md5/sha1/sha256 plus a 256-bin byte histogram, fed by fixed-size chunks.
+
+    Memory stays constant regardless of file size; per-window entropy is
+    recorded in `profile` as each WINDOW_SIZE block completes. Without NumPy
+    only the first `sample` bytes of every window are counted (a Counter
+    pass over a multi-GB file costs minutes), so the histogram still spans
+    the whole file but is an estimate; `sampled` says so.
+    """
+
+    def __init__(self, window=WINDOW_SIZE, sample=None):
+        self._hashes = [hashlib.md5(), hashlib.sha1(), hashlib.sha256()]
+        self.size = 0
+        self.histogram = empty_histogram()
+        self.counted = 0
+        self.window = window
+        self.sample = sample if sample is not None else (window if FAST_HISTOGRAM else WINDOW_SAMPLE)
+        self.profile = []
+        self._win = empty_histogram()
+        self._win_len = 0
+        self._win_counted = 0
+
+    def update(self, chunk):
+        for h in self._hashes:
+            h.update(chunk)
+        self.size += len(chunk)
+
+        pos = 0
+        while pos < len(chunk):
+            take = min(self.window - self._win_len, len(chunk) - pos)
+            want = min(take, self.sample - self._win_len)
+            if want > 0:
+                self._win = add_histogram(self._win, histogram(chunk[pos:pos + want]))
+                self._win_counted += want
+            self._win_len += take
+            pos += take
+            if self._win_len == self.window:
+                self._flush_window()
+
+    def _flush_window(self):
+        self.histogram = add_histogram(self.histogram, self._win)
+        self.counted += self._win_counted
+        self.profile.append(entropy_from_counts(self._win, self._win_counted))
+        self._win = empty_histogram()
+        self._win_len = 0
+        self._win_counted = 0
+
+    def finish(self):
+        if self._win_len:
+            self._flush_window()
+        return self
+
+    @property
+    def sampled(self):
+        return self.counted < self.size
+
+    def entropy(self):
+        return entropy_from_counts(self.histogram, self.counted)
+
+    def hexdigests(self):
+        md5, sha1, sha256 = self._hashes
+        return {
+            "md5": md5.hexdigest(),
+            "sha1": sha1.hexdigest(),
+            "sha256": sha256.hexdigest(),
+        }
 
 def file_hashes(path):
-    hashes = {}
+    hasher = StreamHasher()
     with open(path, "rb") as f:
-        data = f.read()
-        hashes["md5"] = hashlib.md5(data).hexdigest()
-        hashes["sha1"] = hashlib.sha1(data).hexdigest()
-        hashes["sha256"] = hashlib.sha256(data).hexdigest()
-    return hashes
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.finish().hexdigests()
+
+# ---------------------------
+# Scan context
+# ---------------------------
+
+class CountingFile:
+    """File wrapper that adds every byte read to ctx.bytes_read."""
+
+    def __init__(self, f, ctx):
+        self._f = f
+        self._ctx = ctx
+
+    def read(self, n=-1):
+        b = self._f.read(n)
+        self._ctx.bytes_read += len(b)
+        return b
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+class ScanContext:
+    """One pass over the file: head buffer, tail and hashes shared by all checks."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.ext = os.path.splitext(path)[1].lower()
+        self.size = 0
+        self.data = b""
+        self.tail = b""
+        self.hashes = {}
+        self.entropy = 0.0
+        self.entropy_profile = []
+        self.entropy_sampled = False
+        self.bytes_read = 0
+        self.swallowed = 0
+        self.last_error = None
+        self._archive = False
+        self._read()
+
+    def _read(self):
+        hasher = StreamHasher()
+        with open(self.path, "rb") as f:
+            chunk = self.data = f.read(HEAD_SIZE)
+            tail = b""
+            while chunk:
+                hasher.update(chunk)
+                tail = (tail + chunk[-TAIL_SIZE:])[-TAIL_SIZE:]
+                chunk = f.read(CHUNK_SIZE)
+        hasher.finish()
+        self.size = self.bytes_read = hasher.size
+        # same rule as a failed seek(-512, SEEK_END): no tail for tiny files
+        self.tail = tail if self.size >= TAIL_SIZE else b""
+        self.hashes = hasher.hexdigests()
+        self.entropy = hasher.entropy()
+        self.entropy_profile = hasher.profile
+        self.entropy_sampled = hasher.sampled
+        self.kind = detect(self.data[:HEADER_SIZE])
+
+    @property
+    def complete(self):
+        return self.size <= len(self.data)
+
+    def open(self):
+        if self.complete:
+            return BytesIO(self.data)
+        return CountingFile(open(self.path, "rb"), self)
+
+    def archive(self):
+        """ArchiveReport for zip-based files, None otherwise.
+        Raises on a corrupted archive; check_archive reports it."""
+        if self._archive is False:
+            self._archive = None
+            # small files are already in memory - no second open
+            with self.open() as f:
+                if zipfile.is_zipfile(f):
+                    self._archive = inspect_zip(f)
+        return self._archive
+
+    def swallow(self, e):
+        """Record an exception a check chose to ignore (shows up in --profile)."""
+        self.swallowed += 1
+        self.last_error = f"{type(e).__name__}: {e}"
+
+    def close(self):
+        self._archive = None
+
+# ---------------------------
+# Detector registry
+# ---------------------------
+
+CACHE_VERSION = 8
+
+MATCHER = KeywordMatcher(DEFAULT_KEYWORDS)
+CACHE = None
+SIGNATURE = None
+
+DETECTORS = []
+
+def detector(func=None, path_based=False):
+    """Register a check. path_based checks look at the name, not only the bytes,
+    so their findings are never reused for duplicate content elsewhere."""
+    def register(f):
+        f.path_based = path_based
+        DETECTORS.append(f)
+        return f
+    return register(func) if func else register
+
+def scan_signature():
+    # cached findings are only valid for the same detectors and keywords
+    h = hashlib.sha1(str(CACHE_VERSION).encode())
+    for check in DETECTORS:
+        h.update(check.__name__.encode())
+    for k in sorted(MATCHER.keywords):
+        h.update(b"\0" + k.encode())
+    return h.hexdigest()
+
+def configure(rules=None, cache=None, refresh_vt=False):
+    global MATCHER, CACHE, SIGNATURE
+    if rules:
+        MATCHER = KeywordMatcher.from_file(rules)
+    if CACHE:
+        CACHE.close()
+    CACHE = ScanCache(cache, refresh_vt=refresh_vt) if cache else None
+    SIGNATURE = None
 
 # ---------------------------
 # Name & format checks
 # ---------------------------
 
-def check_name(path, findings):
-    name = os.path.basename(path)
+@detector(path_based=True)
+def check_name(ctx, findings):
+    name = ctx.name
     if name.count(".") >= 2:
         findings.append(("name", "double extension", 20))
     if name.startswith("."):
@@ -71,62 +277,52 @@ def check_name(path, findings):
     if any(c in name for c in ["\u200b", "\u202e"]):
         findings.append(("name", "unicode spoofing (RTL)", 30))
 
-def check_magic(path, findings):
-    data = read_bytes(path, 4096)
-    ext = os.path.splitext(path)[1].lower()
-
-    magic = {
-        b"\x50\x4B\x03\x04": "zip",
-        b"\xFF\xD8\xFF": "jpg",
-        b"\x89PNG": "png",
-        b"\x25PDF": "pdf",
-        b"\x7FELF": "elf",
-        b"MZ": "exe"
-    }
-
-    detected = None
-    for sig, t in magic.items():
-        if data.startswith(sig):
-            detected = t
-
-    if detected and detected not in ext:
+@detector(path_based=True)
+def check_magic(ctx, findings):
+    detected = ctx.kind
+    if detected and not matches_ext(detected, ctx.ext.lstrip(".")):
         findings.append(("magic", f"extension mismatch ({detected})", 25))
 
 # ---------------------------
 # Embedded / tail data
 # ---------------------------
 
-def check_embedded(path, findings):
-    data = read_bytes(path)
+@detector
+def check_embedded(ctx, findings):
+    data = ctx.data
     if b"PK\x03\x04" in data[128:]:
         findings.append(("embed", "embedded ZIP detected", 30))
     if b"MZ" in data[128:]:
         findings.append(("embed", "embedded EXE detected", 40))
 
-def check_tail_data(path, findings):
-    try:
-        with open(path, "rb") as f:
-            f.seek(-512, os.SEEK_END)
-            tail = f.read()
-        if b"PK\x03\x04" in tail or b"MZ" in tail:
-            findings.append(("tail", "hidden data at EOF", 35))
-    except:
-        pass
+@detector
+def check_tail_data(ctx, findings):
+    tail = ctx.tail
+    if b"PK\x03\x04" in tail or b"MZ" in tail:
+        findings.append(("tail", "hidden data at EOF", 35))
 
 # ---------------------------
 # Entropy & stego
 # ---------------------------
 
-def check_entropy(path, findings):
-    data = read_bytes(path)
-    e = entropy(data)
+@detector
+def check_entropy(ctx, findings):
+    e = ctx.entropy
+    sampled = ", sampled" if ctx.entropy_sampled else ""
     if e > 7.5:
-        findings.append(("entropy", f"high entropy ({e:.2f})", 25))
-
-def check_stego(path, findings):
-    data = read_bytes(path)
-    ratio = printable_ratio(data)
-    size = os.path.getsize(path)
+        findings.append(("entropy", f"high entropy ({e:.2f}{sampled})", 25))
+        return
+    # packed/encrypted payload inside an otherwise ordinary file
+    if len(ctx.entropy_profile) > 1:
+        window, peak = max(enumerate(ctx.entropy_profile), key=lambda w: w[1])
+        if peak > 7.5:
+            findings.append(("entropy", f"high-entropy region at {window * WINDOW_SIZE // 1024} KiB "
+                                        f"({peak:.2f}{sampled})", 15))
+
+@detector
+def check_stego(ctx, findings):
+    ratio = printable_ratio(ctx.data)
+    size = ctx.size
 
     if ratio < 0.2:
         findings.append(("stego", "binary-heavy content", 10))
@@ -137,79 +333,77 @@ def check_stego(path, findings):
 # Metadata
 # ---------------------------
 
-def check_metadata(path, findings):
+@detector
+def check_metadata(ctx, findings):
+    exifread = LIBS.get("exifread")
     if not exifread:
         return
     try:
-        with open(path, "rb") as f:
+        with ctx.open() as f:
             tags = exifread.process_file(f, details=False)
         if "GPS GPSLatitude" in tags:
             findings.append(("meta", "GPS data present", 15))
         if "Image Software" in tags:
             findings.append(("meta", f"software: {tags['Image Software']}", 5))
-    except:
-        pass
+    except Exception as e:
+        ctx.swallow(e)
 
 # ---------------------------
 # Archives & Office
 # ---------------------------
 
-def check_archive(path, findings):
-    if zipfile.is_zipfile(path):
-        try:
-            with zipfile.ZipFile(path) as z:
-                for i in z.infolist():
-                    if i.flag_bits & 0x1:
-                        findings.append(("archive", "password protected file", 20))
-                        break
-        except:
-            findings.append(("archive", "corrupted archive", 15))
-
-def check_office_macros(path, findings):
-    if not zipfile.is_zipfile(path):
+@detector
+def check_archive(ctx, findings):
+    try:
+        report = ctx.archive()
+    except Exception as e:
+        ctx.swallow(e)
+        findings.append(("archive", "corrupted archive", 15))
         return
+    if not report:
+        return
+
+    if report.encrypted:
+        findings.append(("archive", "password protected file", 20))
+    for name, ratio in report.bombs:
+        findings.append(("archive", f"possible zip bomb: {name} (x{ratio:.0f})", 40))
+    if report.nested:
+        findings.append(("archive", f"nested archives: {len(report.nested)}", 10))
+    if report.corrupted:
+        findings.append(("archive", f"corrupted members: {len(report.corrupted)}", 15))
+
+@detector
+def check_office_macros(ctx, findings):
     try:
-        with zipfile.ZipFile(path) as z:
-            for name in z.namelist():
-                if "vbaProject.bin" in name:
-                    findings.append(("office", "VBA macros detected", 40))
-    except:
-        pass
+        report = ctx.archive()
+    except Exception as e:
+        ctx.swallow(e)
+        return
+    if not report:
+        return
+    for name in report.macros:
+        findings.append(("office", f"VBA macros detected ({name})", 40))
 
 # ---------------------------
 # Strings
 # ---------------------------
 
-def check_strings(path, findings):
-    data = read_bytes(path)
-    buf = b""
-    strings_found = []
-
-    for b in data:
-        if 32 <= b <= 126:
-            buf += bytes([b])
-        else:
-            if len(buf) > 8:
-                strings_found.append(buf.decode(errors="ignore"))
-            buf = b""
-
-    keywords = [
-        "powershell", "cmd.exe", "bash -c", "base64",
-        "curl ", "wget ", "nc ", "python -c"
-    ]
+@detector
+def check_strings(ctx, findings):
+    hits = MATCHER.scan(ctx.data, min_run=MIN_STRING)
 
-    for s in strings_found:
-        for k in keywords:
-            if k in s.lower():
-                findings.append(("strings", f"suspicious string: {k}", 20))
-                return
+    # first indicator keeps the old weight, every further one adds a little
+    for i, (k, (count, offsets)) in enumerate(sorted(hits.items(), key=lambda h: h[1][1][0])):
+        where = ", ".join(hex(o) for o in offsets[:3])
+        findings.append(("strings", f"suspicious string: {k.strip()} x{count} @ {where}", 20 if i == 0 else 5))
 
 # ---------------------------
 # Binary (PE / ELF)
 # ---------------------------
 
-def check_pe_elf(path, findings):
-    data = read_bytes(path, 2048)
+@detector
+def check_pe_elf(ctx, findings):
+    data = ctx.data[:2048]
 
     if data.startswith(b"MZ"):
         findings.append(("binary", "PE executable detected", 20))
@@ -225,54 +419,203 @@ def check_pe_elf(path, findings):
 # VirusTotal API (hash-based)
 # ---------------------------
 
-def vt_lookup(sha256):
+VT = None
+_vt_lock = threading.Lock()
+
+def vt_client():
+    global VT
     if not requests:
         return None
     api_key = os.getenv("VT_API_KEY")
     if not api_key:
         return None
+    with _vt_lock:
+        if VT is None:
+            VT = VTClient(api_key)
+    return VT
 
-    url = f"https://www.virustotal.com/api/v3/files/{sha256}"
-    headers = {"x-apikey": api_key}
-
-    try:
-        r = requests.get(url, headers=headers, timeout=15)
-        if r.status_code != 200:
-            return None
-        data = r.json()
-        return data["data"]["attributes"]["last_analysis_stats"]
-    except:
+def vt_lookup(sha256):
+    client = vt_client()
+    if client is None:
         return None
+    return client.lookup(sha256)
 
 # ---------------------------
 # Core scanner
 # ---------------------------
 
-def scan_file(path):
-    findings = []
+def new_result(path):
+    return {
+        "path": path,
+        "size": None,
+        "hashes": {},
+        "findings": [],
+        "kind": None,
+        "timings": {},
+        "bytes": {},
+        "swallowed": {},
+        "errors": {},
+        "cached": False,
+    }
+
+def analyze_file(path):
+    """Local checks only (no network). Returns a result dict."""
+    global SIGNATURE
+    result = new_result(path)
+    timings = result["timings"]
+    path_findings, content = [], []
 
     try:
-        check_name(path, findings)
-        check_magic(path, findings)
-        check_embedded(path, findings)
-        check_tail_data(path, findings)
-        check_entropy(path, findings)
-        check_stego(path, findings)
-        check_metadata(path, findings)
-        check_archive(path, findings)
-        check_office_macros(path, findings)
-        check_strings(path, findings)
-        check_pe_elf(path, findings)
-
-        hashes = file_hashes(path)
-        vt = vt_lookup(hashes["sha256"])
-        if vt and vt.get("malicious", 0) > 0:
-            findings.append(("av", f"VT malicious detections: {vt['malicious']}", 50))
+        if CACHE:
+            if SIGNATURE is None:
+                SIGNATURE = scan_signature()
+            t = time.perf_counter()
+            st = os.stat(path)
+            hit = CACHE.lookup_file(path, st, SIGNATURE)
+            if hit:
+                sha256, path_findings = hit
+                cached = CACHE.get_content(sha256, SIGNATURE)
+                if cached is not None:
+                    result["hashes"], result["size"], result["kind"], content = cached
+                    result["findings"] = path_findings + content
+                    result["cached"] = True
+                    timings["cache"] = time.perf_counter() - t
+                    return result
+                path_findings = []
+
+        t = time.perf_counter()
+        ctx = ScanContext(path)
+        timings["read"] = time.perf_counter() - t
+        result["bytes"]["read"] = ctx.bytes_read
+        result["size"] = ctx.size
+        result["hashes"] = ctx.hashes
+        result["kind"] = ctx.kind
+        try:
+            cached = CACHE.get_content(ctx.hashes["sha256"], SIGNATURE) if CACHE else None
+            for check in DETECTORS:
+                if check.path_based:
+                    out = path_findings
+                elif cached is None:
+                    out = content
+                else:
+                    continue
+                name = check.__name__
+                nbytes, swallowed = ctx.bytes_read, ctx.swallowed
+                t = time.perf_counter()
+                check(ctx, out)
+                timings[name] = time.perf_counter() - t
+                if ctx.bytes_read != nbytes:
+                    result["bytes"][name] = ctx.bytes_read - nbytes
+                if ctx.swallowed != swallowed:
+                    result["swallowed"][name] = ctx.swallowed - swallowed
+                    result["errors"][name] = ctx.last_error
+        finally:
+            ctx.close()
+
+        if CACHE:
+            if cached is None:
+                CACHE.put_content(ctx.hashes, ctx.size, ctx.kind, content, SIGNATURE)
+            else:
+                content = cached[3]
+                result["cached"] = True
+            CACHE.put_file(path, st, ctx.hashes["sha256"], path_findings, SIGNATURE)
 
     except Exception as e:
-        findings.append(("error", str(e), 0))
+        content.append(("error", str(e), 0))
+
+    result["findings"] = path_findings + content
+    return result
+
+def apply_vt(result):
+    sha256 = result["hashes"].get("sha256")
+    if sha256 is None:
+        return result
+    t = time.perf_counter()
+    try:
+        hit, vt = CACHE.get_vt(sha256) if CACHE else (False, None)
+        if not hit:
+            vt = vt_lookup(sha256)
+            if vt is not None and CACHE:
+                CACHE.put_vt(sha256, vt)
+        if vt and vt.get("malicious", 0) > 0:
+            result["findings"].append(("av", f"VT malicious detections: {vt['malicious']}", 50))
+    except Exception as e:
+        result["findings"].append(("error", str(e), 0))
+    result["timings"]["vt"] = time.perf_counter() - t
+    return result
+
+def scan_file(path):
+    return apply_vt(analyze_file(path))["findings"]
+
+# ---------------------------
+# Worker pool
+# ---------------------------
+
+VT_WORKERS = 4
+
+def _init_worker(options):
+    configure(**options)
+
+def cpu_pool(jobs, options):
+    try:
+        # spawn, not fork: workers must not inherit the parent's SQLite handle
+        return ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(options,)
+        )
+    except (NotImplementedError, ImportError, OSError):
+        # no working sem_open (e.g. Termux): fall back to threads
+        return ThreadPoolExecutor(max_workers=jobs)
+
+def _failed(path, e):
+    result = new_result(path)
+    result["findings"].append(("error", str(e), 0))
+    return result
+
+def _chain_vt(path, local, net):
+    out = Future()
+
+    def vt_done(f):
+        try:
+            out.set_result(f.result())
+        except Exception as e:
+            out.set_result(_failed(path, e))
+
+    def local_done(f):
+        try:
+            result = f.result()
+        except Exception as e:
+            out.set_result(_failed(path, e))
+            return
+        net.submit(apply_vt, result).add_done_callback(vt_done)
+
+    local.add_done_callback(local_done)
+    return out
 
-    return findings
+def _scan_pooled(files, cpu, net, window):
+    pending = deque()
+    for f in files:
+        pending.append(_chain_vt(f, cpu.submit(analyze_file, f), net))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def scan_files(files, jobs=1, pools=None, **options):
+    """Yield result dicts in the same order as files.
+    pools=(cpu, net) reuses executors across calls (watch mode)."""
+    if jobs <= 1:
+        for f in files:
+            yield apply_vt(analyze_file(f))
+        return
+
+    if pools:
+        yield from _scan_pooled(files, *pools, jobs * 4)
+        return
+    with cpu_pool(jobs, options) as cpu, ThreadPoolExecutor(max_workers=VT_WORKERS) as net:
+        yield from _scan_pooled(files, cpu, net, jobs * 4)
 
 # ---------------------------
 # Output
@@ -285,32 +628,232 @@ def risk_level(score):
         return "MEDIUM"
     return "LOW"
 
-def scan_path(path):
+def iter_files(path):
+    if not isinstance(path, str):
+        for p in path:
+            yield from iter_files(p)
+        return
     if os.path.isfile(path):
-        files = [path]
+        yield path
+        return
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        for n in sorted(names):
+            yield os.path.join(root, n)
+
+def print_result(result, score, out):
+    print("\n---", result["path"], file=out)
+
+    for t, msg, pts in result["findings"]:
+        print(f"[!] {t}: {msg} (+{pts})", file=out)
+
+    print(f"[=] SCORE: {score} | RISK: {risk_level(score)}", file=out)
+
+def json_record(result, score):
+    return {
+        "type": "file",
+        "path": result["path"],
+        "size": result["size"],
+        "hashes": result["hashes"],
+        "findings": [list(x) for x in result["findings"]],
+        "score": score,
+        "risk": risk_level(score),
+        "kind": result["kind"],
+        "cached": result["cached"],
+        "timings": {k: round(v, 6) for k, v in result["timings"].items()},
+    }
+
+def new_totals():
+    return {"files": 0, "bytes": 0, "errors": 0, "cached": 0,
+            "risk": {"LOW": 0, "MEDIUM": 0, "HIGH": 0}}
+
+def report_result(result, fmt, out, totals, profiler=None):
+    score = sum(x[2] for x in result["findings"])
+    totals["files"] += 1
+    totals["bytes"] += result["size"] or 0
+    totals["cached"] += result["cached"]
+    totals["errors"] += any(x[0] == "error" for x in result["findings"])
+    totals["risk"][risk_level(score)] += 1
+    if profiler:
+        profiler.add(result)
+
+    if fmt == "jsonl":
+        out.write(json.dumps(json_record(result, score), ensure_ascii=False) + "\n")
+        out.flush()
     else:
-        files = []
-        for root, _, names in os.walk(path):
-            for n in names:
-                files.append(os.path.join(root, n))
+        print_result(result, score, out)
+    return score
+
+def scan_path(path, jobs=1, fmt="text", out=None, profiler=None, **options):
+    """path: a file, a folder or a list of them."""
+    out = out or sys.stdout
+    configure(**options)
+
+    totals = new_totals()
+    start = time.perf_counter()
+
+    for result in scan_files(iter_files(path), jobs, **options):
+        report_result(result, fmt, out, totals, profiler)
+
+    elapsed = time.perf_counter() - start
+
+    if fmt == "jsonl":
+        totals.update(
+            type="summary",
+            elapsed=round(elapsed, 3),
+            files_per_sec=round(totals["files"] / elapsed, 2) if elapsed else None,
+            mb_per_sec=round(totals["bytes"] / 1e6 / elapsed, 2) if elapsed else None,
+            vt=dict(VT.stats) if VT is not None else None,
+        )
+        out.write(json.dumps(totals) + "\n")
+        out.flush()
+    elif VT is not None:
+        print(f"\n[=] VirusTotal: {VT.summary()}", file=out)
 
-    for f in files:
-        print("\n---", f)
-        findings = scan_file(f)
-        score = sum(x[2] for x in findings)
+# ---------------------------
+# Watch mode
+# ---------------------------
 
-        for t, msg, pts in findings:
-            print(f"[!] {t}: {msg} (+{pts})")
+def watch_paths(paths, jobs=1, fmt="text", out=None, settle=2.0, interval=5.0,
+                socket_path=DEFAULT_SOCKET, **options):
+    """Scan paths once, then rescan only created/modified files until Ctrl+C.
+    The running risk index is served on socket_path (see --query)."""
+    out = out or sys.stdout
+    configure(**options)
+    folders = [p for p in paths if os.path.isdir(p)]
 
-        print(f"[=] SCORE: {score} | RISK: {risk_level(score)}")
+    index = RiskIndex()
+    try:
+        server = serve_index(index, socket_path) if socket_path else None
+    except OSError as e:
+        sys.exit(f"[!] {e.strerror}: {e.filename}")
+    watcher = make_watcher(folders, interval)
+    debounce = Debouncer(settle)
+    totals = new_totals()
+
+    pools = None
+    if jobs > 1:
+        pools = (cpu_pool(jobs, options), ThreadPoolExecutor(max_workers=VT_WORKERS))
+
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt
+
+    # daemonized runs get SIGTERM, not Ctrl+C
+    signal.signal(signal.SIGTERM, interrupt)
+
+    def scan(files):
+        for result in scan_files(files, jobs, pools, **options):
+            score = report_result(result, fmt, out, totals)
+            index.update(result, score, risk_level(score))
+
+    try:
+        scan(iter_files(paths))
+        print(f"[*] Watching {len(folders)} folder(s) with {type(watcher).__name__}"
+              + (f", index on {socket_path}" if server else ""), file=sys.stderr)
+        while True:
+            for path, deleted in watcher.poll(min(settle, 1.0)):
+                if deleted:
+                    debounce.discard(path)
+                    index.remove(path)
+                else:
+                    debounce.touch(path)
+            if watcher.overflowed:
+                # lost events: fall back to one full (cache-assisted) pass
+                watcher.overflowed = False
+                scan(iter_files(folders))
+            ready = debounce.ready()
+            if ready:
+                scan(ready)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        if pools:
+            for pool in pools:
+                pool.shutdown()
+        if server:
+            stop_index(server)
 
 # ---------------------------
 # Main
 # ---------------------------
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: FindTheMole <file_or_folder>")
-        sys.exit(1)
-
-    scan_path(sys.argv[1])
\ No newline at end of file
+    parser = argparse.ArgumentParser(prog="FindTheMole")
+    parser.add_argument("paths", nargs="*", metavar="path", help="files or folders to scan")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="parallel workers for local checks (default: 1)")
+    parser.add_argument("--rules", metavar="FILE",
+                        help="extra IOC keywords, one per line (# comments)")
+    parser.add_argument("--cache", metavar="DB", default=DEFAULT_DB,
+                        help=f"scan cache database (default: {DEFAULT_DB})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="rescan everything and do not touch the cache")
+    parser.add_argument("--refresh-vt", action="store_true",
+                        help="ignore cached VirusTotal verdicts")
+    parser.add_argument("--format", choices=["text", "jsonl"], default="text",
+                        help="jsonl: one JSON record per file plus a summary trailer")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="write the report to FILE instead of stdout")
+    parser.add_argument("--profile", action="store_true",
+                        help="print per-check and per-file-type timing tables to stderr")
+    parser.add_argument("--top", type=int, default=10, metavar="N",
+                        help="rows per --profile table (default: 10)")
+    parser.add_argument("--profile-dump", metavar="FILE",
+                        help="also write cProfile/pstats data for the main process to FILE")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and rescan created/modified files (inotify or polling)")
+    parser.add_argument("--settle", type=float, default=2.0, metavar="SEC",
+                        help="quiet time before a changed file is scanned (default: 2)")
+    parser.add_argument("--interval", type=float, default=5.0, metavar="SEC",
+                        help="polling interval when inotify is unavailable (default: 5)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, metavar="PATH",
+                        help=f"watch mode query socket (default: {DEFAULT_SOCKET})")
+    parser.add_argument("--query", metavar="CMD",
+                        help="ask a running --watch instance: 'top N', 'get PATH', 'risk LEVEL', 'stats'")
+    args = parser.parse_args()
+
+    if args.query:
+        print(json.dumps(query_index(args.query, args.socket), indent=2, ensure_ascii=False))
+        sys.exit(0)
+    if not args.paths:
+        parser.error("at least one path is required")
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+
+    profiler = Profiler() if args.profile or args.profile_dump else None
+    cprof = None
+    if args.profile_dump:
+        import cProfile
+        cprof = cProfile.Profile()
+        cprof.enable()
+
+    options = dict(
+        rules=args.rules,
+        cache=None if args.no_cache else args.cache,
+        refresh_vt=args.refresh_vt
+    )
+    if args.watch:
+        watch_paths(
+            args.paths, max(1, args.jobs),
+            fmt=args.format,
+            out=out,
+            settle=args.settle,
+            interval=args.interval,
+            socket_path=args.socket,
+            **options
+        )
+    else:
+        scan_path(
+            args.paths, max(1, args.jobs),
+            fmt=args.format,
+            out=out,
+            profiler=profiler,
+            **options
+        )
+
+    if cprof:
+        cprof.disable()
+        cprof.dump_stats(args.profile_dump)
+    if profiler:
+        profiler.report(args.top)
@@ -0,0 +1,120 @@
+# Multi-pattern keyword matcher for FindTheMole
+# All keywords are folded into one compiled regex shaped like a trie
+# (shared prefixes are factored out), so a buffer is scanned once no matter
+# how many IOCs are loaded. Keywords inside other keywords are still counted:
+# the regex takes the longest keyword at each offset and the shorter ones
+# ending inside it are read back off the trie, so a hit costs the same
+# whatever the size of the keyword list.
+
+import re
+
+DEFAULT_KEYWORDS = [
+    "powershell", "cmd.exe", "bash -c", "base64",
+    "curl ", "wget ", "nc ", "python -c"
+]
+
+MAX_OFFSETS = 32
+
+# ---------------------------
+# Trie -> regex
+# ---------------------------
+
+def _build_trie(words):
+    """{byte: child, None: keyword} over lower-cased keyword bytes"""
+    trie = {}
+    for w, keyword in words.items():
+        node = trie
+        for b in w:
+            node = node.setdefault(b, {})
+        node[None] = keyword
+    return trie
+
+def _emit(node):
+    branches = []
+    for b in sorted(k for k in node if k is not None):
+        branches.append(re.escape(bytes([b])) + _emit(node[b]))
+
+    if not branches:
+        return b""
+    body = branches[0] if len(branches) == 1 else b"(?:" + b"|".join(branches) + b")"
+    if None in node:
+        # keyword ends here but a longer one may go on; greedy, so the
+        # longest keyword at an offset wins
+        return b"(?:" + body + b")?"
+    return body
+
+def trie_regex(trie):
+    """zero-width lookahead capturing the longest keyword at each offset, so
+    finditer tries every offset and overlapping keywords ('shell' in
+    'powershell') are found"""
+    if not trie:
+        return None
+    return re.compile(b"(?=(" + _emit(trie) + b"))", re.IGNORECASE)
+
+def _ends(trie, match):
+    """(keyword, length) for every keyword that is a prefix of match"""
+    node = trie
+    for i, b in enumerate(match.lower(), 1):
+        node = node.get(b)
+        if node is None:
+            return
+        if None in node:
+            yield node[None], i
+
+# ---------------------------
+# Matcher
+# ---------------------------
+
+def load_keywords(path):
+    words = []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if line.strip() and not line.lstrip().startswith("#"):
+                words.append(line)
+    return words
+
+def _in_run(data, start, end, min_run):
+    lo, hi = start, end
+    while hi - lo < min_run and lo > 0 and 0x20 <= data[lo - 1] < 0x7f:
+        lo -= 1
+    while hi - lo < min_run and hi < len(data) and 0x20 <= data[hi] < 0x7f:
+        hi += 1
+    return hi - lo >= min_run
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        seen = {}
+        for k in keywords:
+            seen.setdefault(k.lower().encode("utf-8"), k.lower())
+        seen.pop(b"", None)
+        self.keywords = list(seen.values())
+        self._trie = _build_trie(seen)
+        self._re = trie_regex(self._trie)
+
+    @classmethod
+    def from_file(cls, path, extend=True):
+        words = load_keywords(path)
+        if extend:
+            words = DEFAULT_KEYWORDS + words
+        return cls(words)
+
+    def scan(self, data, min_run=0):
+        """Return {keyword: (count, [offsets...])} for every keyword hit in data.
+
+        With min_run, a hit only counts inside a printable ASCII run of at
+        least that many bytes, like the old strings-then-search approach.
+        """
+        hits = {}
+        if self._re is None:
+            return hits
+        for m in self._re.finditer(data):
+            start = m.start()
+            for k, size in _ends(self._trie, m.group(1)):
+                if min_run and not _in_run(data, start, start + size, min_run):
+                    continue
+                count, offsets = hits.get(k, (0, []))
+                if len(offsets) < MAX_OFFSETS:
+                    offsets.append(start)
+                hits[k] = (count + 1, offsets)
+        return hits
@@ -0,0 +1,500 @@
+# Offline geo/ASN lookups for iprobiv
+# Reads MaxMind DB files (GeoLite2 / DB-IP lite .mmdb) straight from an mmap
+# and compiles DB-IP lite CSV ranges into a sorted, memory-mapped range index,
+# so a lookup is a tree walk or a binary search - no network, no parsing.
+#
+#   python3 modules/iplocal.py compile dbip-city-lite-2026-10.csv.gz
+#   python3 modules/iplocal.py lookup 8.8.8.8 2001:4860::8888
+
+import os
+import re
+import io
+import csv
+import sys
+import gzip
+import json
+import mmap
+import time
+import socket
+import struct
+import calendar
+import argparse
+import ipaddress
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mikoshi", "iplocal")
+DB_ENV = "IPROBIV_DB"       # files or folders, separated by os.pathsep
+MAX_AGE_DAYS = 45           # DB-IP lite is published monthly
+
+def _map(path):
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+# ---------------------------
+# MaxMind DB
+# ---------------------------
+
+MMDB_MARKER = b"\xab\xcd\xefMaxMind.com"
+
+class MMDBError(ValueError):
+    pass
+
+class _Decoder:
+    """MaxMind DB data section decoder; pointers are relative to `base`."""
+
+    def __init__(self, buf, base):
+        self.buf = buf
+        self.base = base
+
+    def decode(self, offset):
+        buf = self.buf
+        ctrl = buf[offset]
+        offset += 1
+        kind = ctrl >> 5
+
+        if kind == 1:                        # pointer
+            size = (ctrl >> 3) & 0x3
+            if size == 3:
+                pointer = struct.unpack_from(">I", buf, offset)[0]
+            else:
+                pointer = ((ctrl & 0x7) << (8 * (size + 1))) | \
+                    int.from_bytes(buf[offset:offset + size + 1], "big")
+                pointer += (0, 2048, 526336)[size]
+            value, _ = self.decode(self.base + pointer)
+            return value, offset + size + 1
+
+        if kind == 0:                        # extended type
+            kind = 7 + buf[offset]
+            offset += 1
+
+        size = ctrl & 0x1f
+        if size >= 29:
+            extra = size - 28
+            size = (29, 285, 65821)[extra - 1] + int.from_bytes(buf[offset:offset + extra], "big")
+            offset += extra
+
+        if kind == 2:
+            return buf[offset:offset + size].decode("utf-8"), offset + size
+        if kind == 7:
+            out = {}
+            for _ in range(size):
+                key, offset = self.decode(offset)
+                out[key], offset = self.decode(offset)
+            return out, offset
+        if kind == 11:
+            out = []
+            for _ in range(size):
+                value, offset = self.decode(offset)
+                out.append(value)
+            return out, offset
+        if kind == 3:
+            return struct.unpack_from(">d", buf, offset)[0], offset + 8
+        if kind == 15:
+            return struct.unpack_from(">f", buf, offset)[0], offset + 4
+        if kind == 14:
+            return bool(size), offset
+        if kind == 4:
+            return bytes(buf[offset:offset + size]), offset + size
+        if kind in (5, 6, 9, 10):
+            return int.from_bytes(buf[offset:offset + size], "big"), offset + size
+        if kind == 8:
+            return int.from_bytes(buf[offset:offset + size], "big", signed=size == 4), offset + size
+        raise MMDBError(f"unsupported MMDB data type {kind}")
+
+class MMDBReader:
+    """Pure-Python MaxMind DB reader over an mmap."""
+
+    def __init__(self, path):
+        self.path = path
+        self.buf = _map(path)
+        start = self.buf.rfind(MMDB_MARKER, max(0, len(self.buf) - 128 * 1024))
+        if start < 0:
+            raise MMDBError(f"{path}: not a MaxMind DB file")
+        self.metadata, _ = _Decoder(self.buf, start + len(MMDB_MARKER)).decode(
+            start + len(MMDB_MARKER))
+
+        self.node_count = self.metadata["node_count"]
+        self.record_size = self.metadata["record_size"]
+        if self.record_size not in (24, 28, 32):
+            raise MMDBError(f"{path}: unsupported record size {self.record_size}")
+        self.ip_version = self.metadata["ip_version"]
+        self.node_bytes = self.record_size // 4
+        tree_size = self.node_count * self.node_bytes
+        self.data = _Decoder(self.buf, tree_size + 16)
+        self.built = self.metadata.get("build_epoch")
+        self.kind = self.metadata.get("database_type", "mmdb")
+
+        # IPv4 addresses live under ::/96 in an IPv6 tree
+        node = 0
+        if self.ip_version == 6:
+            for _ in range(96):
+                if node >= self.node_count:
+                    break
+                node = self._record(node, 0)
+        self.ipv4_start = node
+
+    def _record(self, node, bit):
+        off = node * self.node_bytes
+        buf = self.buf
+        if self.record_size == 24:
+            off += 3 * bit
+            return (buf[off] << 16) | (buf[off + 1] << 8) | buf[off + 2]
+        if self.record_size == 28:
+            if bit:
+                return ((buf[off + 3] & 0x0f) << 24) | (buf[off + 4] << 16) | \
+                    (buf[off + 5] << 8) | buf[off + 6]
+            return ((buf[off + 3] & 0xf0) << 20) | (buf[off] << 16) | \
+                (buf[off + 1] << 8) | buf[off + 2]
+        return struct.unpack_from(">I", buf, off + 4 * bit)[0]
+
+    def lookup(self, addr):
+        """decoded record for an ipaddress object, None if absent"""
+        if addr.version == 6 and self.ip_version == 4:
+            return None
+        node = self.ipv4_start if addr.version == 4 else 0
+        value, bits = int(addr), addr.max_prefixlen
+        for i in range(bits - 1, -1, -1):
+            if node >= self.node_count:
+                break
+            node = self._record(node, (value >> i) & 1)
+        if node <= self.node_count:
+            return None
+        return self._decode(node - self.node_count - 16)
+
+    @lru_cache(maxsize=4096)
+    def _decode(self, pointer):
+        value, _ = self.data.decode(self.data.base + pointer)
+        return value
+
+    def close(self):
+        self._decode.cache_clear()
+        self.buf.close()
+
+def normalize_mmdb(rec):
+    """GeoLite2 / DB-IP City, Country and ASN records -> flat fields"""
+    out = {}
+    if not isinstance(rec, dict):
+        return out
+    country = rec.get("country") or rec.get("registered_country") or {}
+    if country.get("iso_code"):
+        out["country_code"] = country["iso_code"]
+    if country.get("names", {}).get("en"):
+        out["country"] = country["names"]["en"]
+    continent = rec.get("continent") or {}
+    if continent.get("code"):
+        out["continent"] = continent["code"]
+    subdivisions = rec.get("subdivisions") or []
+    if subdivisions and subdivisions[0].get("names", {}).get("en"):
+        out["region"] = subdivisions[0]["names"]["en"]
+    city = rec.get("city") or {}
+    if city.get("names", {}).get("en"):
+        out["city"] = city["names"]["en"]
+    location = rec.get("location") or {}
+    if location.get("latitude") is not None:
+        out["lat"], out["lon"] = location["latitude"], location.get("longitude")
+    if location.get("time_zone"):
+        out["timezone"] = location["time_zone"]
+    if rec.get("autonomous_system_number") is not None:
+        out["asn"] = rec["autonomous_system_number"]
+    if rec.get("autonomous_system_organization"):
+        out["org"] = rec["autonomous_system_organization"]
+    return out
+
+# ---------------------------
+# Compiled range index (DB-IP lite CSV)
+# ---------------------------
+
+INDEX_MAGIC = b"MIKIPDB1"
+
+# DB-IP lite layouts by column count
+CSV_LAYOUTS = {
+    3: ("country", ("country_code",)),
+    4: ("asn", ("asn", "org")),
+    8: ("city", ("continent", "country_code", "region", "city", "lat", "lon")),
+}
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path), encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+def _csv_record(fields, row):
+    rec = {}
+    for name, value in zip(fields, row):
+        if value in ("", "ZZ"):
+            continue
+        if name == "asn":
+            value = int(value)
+        elif name in ("lat", "lon"):
+            value = float(value)
+        rec[name] = value
+    return rec
+
+def _packed(values, byteorder):
+    """uint32 array -> bytes in the given byte order"""
+    values = array("I", values)
+    if sys.byteorder != byteorder:
+        values.byteswap()
+    return values.tobytes()
+
+_DATE = re.compile(r"(\d{4})-(\d{2})(?:-(\d{2}))?")
+
+def source_date(src):
+    """build time of a DB-IP dump: the date in its name (dbip-city-lite-2026-10.csv.gz),
+    else the file's mtime; never the time it was compiled"""
+    m = _DATE.search(os.path.basename(src))
+    if m:
+        year, month, day = int(m.group(1)), int(m.group(2)), int(m.group(3) or 1)
+        try:
+            return calendar.timegm((year, month, day, 0, 0, 0))
+        except ValueError:
+            pass
+    return int(os.path.getmtime(src))
+
+def compile_csv(src, out=None, built=None):
+    """DB-IP lite CSV (optionally .gz) -> sorted range index; returns the output path"""
+    out = out or os.path.join(DEFAULT_DIR, os.path.basename(src).split(".csv")[0] + ".ipdb")
+    # packed big-endian starts/ends per family: bytes compare like addresses
+    starts = {4: bytearray(), 6: bytearray()}
+    ends = {4: bytearray(), 6: bytearray()}
+    offsets = {4: array("I"), 6: array("I")}
+    last_start = {4: b"", 6: b""}
+    unsorted = set()
+    records, blob = {}, bytearray()
+    kind = fields = None
+    pton = socket.inet_pton
+
+    with _open_text(src) as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            if fields is None:
+                if len(row) not in CSV_LAYOUTS:
+                    raise ValueError(f"{src}: unknown CSV layout ({len(row)} columns)")
+                kind, fields = CSV_LAYOUTS[len(row)]
+            v, family = (6, socket.AF_INET6) if ":" in row[0] else (4, socket.AF_INET)
+            try:
+                first, last = pton(family, row[0]), pton(family, row[1])
+            except OSError:
+                continue                         # header line
+            key = tuple(row[2:])
+            offset = records.get(key)
+            if offset is None:
+                data = json.dumps(_csv_record(fields, key), ensure_ascii=False,
+                                  separators=(",", ":")).encode("utf-8")
+                offset = records[key] = len(blob)
+                blob += struct.pack("<I", len(data)) + data
+            if first < last_start[v]:
+                unsorted.add(v)
+            last_start[v] = first
+            starts[v] += first
+            ends[v] += last
+            offsets[v].append(offset)
+
+    if fields is None:
+        raise ValueError(f"{src}: empty file")
+
+    # DB-IP is already sorted; anything else is sorted here once
+    sections = {}
+    for v, width in ((4, 4), (6, 16)):
+        n = len(offsets[v])
+        s_bytes, e_bytes, offs = bytes(starts[v]), bytes(ends[v]), offsets[v]
+        if v in unsorted:
+            keys = [s_bytes[i * width:(i + 1) * width] for i in range(n)]
+            order = sorted(range(n), key=keys.__getitem__)
+            s_bytes = b"".join(keys[i] for i in order)
+            e_bytes = b"".join(e_bytes[i * width:(i + 1) * width] for i in order)
+            offs = array("I", (offs[i] for i in order))
+        sections[v] = (n, width, s_bytes, e_bytes, _packed(offs, "little"))
+
+    meta = {"kind": kind, "source": os.path.basename(src),
+            "built": int(built if built is not None else source_date(src)),
+            "compiled": int(time.time())}
+    layout, pos = {}, 0
+    for v, (n, width, s_bytes, e_bytes, offs) in sections.items():
+        layout[str(v)] = {"count": n, "width": width, "starts": pos,
+                          "ends": pos + len(s_bytes), "offsets": pos + 2 * len(s_bytes)}
+        pos += 2 * len(s_bytes) + len(offs)
+    meta["sections"], meta["records"] = layout, pos
+    header = json.dumps(meta).encode()
+
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp = out + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(INDEX_MAGIC + struct.pack("<I", len(header)) + header)
+        for n, width, s_bytes, e_bytes, offs in sections.values():
+            f.write(s_bytes)
+            f.write(e_bytes)
+            f.write(offs)
+        f.write(blob)
+    os.replace(tmp, out)
+    return out
+
+class _Column:
+    """fixed-width big-endian keys in an mmap, as a sequence for bisect"""
+
+    def __init__(self, buf, offset, width, count):
+        self.buf, self.offset, self.width, self.count = buf, offset, width, count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        start = self.offset + i * self.width
+        return self.buf[start:start + self.width]
+
+class RangeIndex:
+    """Compiled DB-IP ranges: binary search over the mmap, records decoded on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        self.buf = _map(path)
+        if self.buf[:8] != INDEX_MAGIC:
+            raise ValueError(f"{path}: not a compiled IP index")
+        size = struct.unpack_from("<I", self.buf, 8)[0]
+        meta = json.loads(self.buf[12:12 + size])
+        base = 12 + size
+        self.kind, self.built = meta["kind"], meta.get("built")
+        self.records = base + meta["records"]
+        self.sections = {}
+        for v, s in meta["sections"].items():
+            self.sections[int(v)] = (
+                _Column(self.buf, base + s["starts"], s["width"], s["count"]),
+                _Column(self.buf, base + s["ends"], s["width"], s["count"]),
+                base + s["offsets"])
+
+    def lookup(self, addr):
+        section = self.sections.get(addr.version)
+        if section is None:
+            return None
+        starts, ends, offsets = section
+        key = addr.packed
+        i = bisect_right(starts, key) - 1
+        if i < 0 or ends[i] < key:
+            return None
+        return self._decode(struct.unpack_from("<I", self.buf, offsets + 4 * i)[0])
+
+    @lru_cache(maxsize=4096)
+    def _decode(self, offset):
+        pos = self.records + offset
+        size = struct.unpack_from("<I", self.buf, pos)[0]
+        return json.loads(self.buf[pos + 4:pos + 4 + size])
+
+    def close(self):
+        self._decode.cache_clear()
+        self.buf.close()
+
+# ---------------------------
+# Combined backend
+# ---------------------------
+
+def open_database(path):
+    with open(path, "rb") as f:
+        magic = f.read(len(INDEX_MAGIC))
+    return RangeIndex(path) if magic == INDEX_MAGIC else MMDBReader(path)
+
+def find_databases(paths=None):
+    """.mmdb / .ipdb files from the given paths, $IPROBIV_DB or the cache folder"""
+    if not paths:
+        env = os.getenv(DB_ENV)
+        paths = env.split(os.pathsep) if env else [DEFAULT_DIR]
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.endswith((".mmdb", ".ipdb")))
+        elif os.path.isfile(path):
+            found.append(path)
+    return found
+
+class IPDatabase:
+    """All local databases together; lookup() merges city/country/ASN answers."""
+
+    def __init__(self, paths):
+        self.dbs = [open_database(path) for path in paths]
+        # build date of the data (MMDB build_epoch / .ipdb source date), not the
+        # file's mtime: copying or recompiling old data must not make it fresh
+        self.built = min((db.built or os.path.getmtime(db.path) for db in self.dbs), default=0)
+
+    @classmethod
+    def open(cls, paths=None):
+        """None when no database is installed"""
+        found = find_databases(paths)
+        return cls(found) if found else None
+
+    def age_days(self):
+        return (time.time() - self.built) / 86400
+
+    def stale(self, max_age_days=MAX_AGE_DAYS):
+        return self.age_days() > max_age_days
+
+    def lookup(self, ip):
+        """flat dict (country_code, city, lat, lon, asn, org, ...) or None"""
+        addr = ip if isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address)) \
+            else ipaddress.ip_address(ip)
+        out = {}
+        for db in self.dbs:
+            rec = db.lookup(addr)
+            if not rec:
+                continue
+            flat = normalize_mmdb(rec) if isinstance(db, MMDBReader) else rec
+            for key, value in flat.items():
+                out.setdefault(key, value)
+        return out or None
+
+    def describe(self):
+        return ", ".join(f"{os.path.basename(getattr(db, 'path', '?'))} ({db.kind})"
+                         for db in self.dbs)
+
+    def close(self):
+        for db in self.dbs:
+            db.close()
+
+# ---------------------------
+# CLI
+# ---------------------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline IP geo/ASN database")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("compile", help="build a range index from DB-IP lite CSV files")
+    p.add_argument("csv", nargs="+", help="dbip-city/country/asn-lite CSV (.csv or .csv.gz)")
+    p.add_argument("-o", "--out-dir", default=DEFAULT_DIR, help=f"default: {DEFAULT_DIR}")
+    p.add_argument("--built", help="release date of the data (YYYY-MM-DD) when the file "
+                                   "name doesn't carry one")
+
+    p = sub.add_parser("lookup", help="look addresses up in the local databases")
+    p.add_argument("ips", nargs="+")
+    p.add_argument("--db", action="append", help=f"database file or folder (default: ${DB_ENV} "
+                                                 f"or {DEFAULT_DIR})")
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        built = None
+        if args.built:
+            try:
+                built = calendar.timegm(time.strptime(args.built, "%Y-%m-%d"))
+            except ValueError:
+                sys.exit(f"[!] --built expects YYYY-MM-DD, got {args.built!r}")
+        for src in args.csv:
+            name = os.path.basename(src).split(".csv")[0] + ".ipdb"
+            started = time.perf_counter()
+            out = compile_csv(src, os.path.join(args.out_dir, name), built)
+            print(f"[+] {src} -> {out} ({time.perf_counter() - started:.1f} s)")
+        sys.exit(0)
+
+    db = IPDatabase.open(args.db)
+    if db is None:
+        sys.exit(f"[!] No local databases found (see {DEFAULT_DIR} or ${DB_ENV})")
+    print(f"[*] {db.describe()}, {db.age_days():.0f} days old", file=sys.stderr)
+    for ip in args.ips:
+        started = time.perf_counter()
+        try:
+            rec = db.lookup(ip.strip())
+        except ValueError as e:
+            rec = {"error": str(e)}
+        us = (time.perf_counter() - started) * 1e6
+        print(json.dumps({"ip": ip, **(rec or {}), "lookup_us": round(us, 1)}, ensure_ascii=False))
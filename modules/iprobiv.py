@@ -1,21 +1,64 @@
+import os
+import re
+import sys
+import time
+import argparse
+import ipaddress
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, \
+    TimeoutError as FuturesTimeout
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
 from rich.console import Console
 from rich.table import Table
 
+import metarecord
+from ratelimit import TokenBucket
+from iplocal import IPDatabase, MAX_AGE_DAYS, DEFAULT_DIR as DB_DIR, DB_ENV
+
 console = Console()
-ip = input("Enter IP: ")
 
 # Источники с исправленным endpoint для ip-api.com
-sources = {
-    "ipinfo.io": f"https://ipinfo.io/{ip}",
-    "ipwho.is": f"https://ipwho.is/{ip}?security=1",
-    "ip2location.io": f"https://api.ip2location.io/?ip={ip}",
-    "ip-api.com": f"http://ip-api.com/json/{ip}?fields=66846719",
-    "ipwhois.io": f"https://ipwhois.app/json/{ip}",
-    "ipapi.co": f"https://ipapi.co/{ip}/json/",
-    "api.db-ip.com": f"https://api.db-ip.com/v2/free/{ip}",
+# имя -> (шаблон URL, таймаут запроса в секундах)
+PROVIDERS = {
+    "ipinfo.io": ("https://ipinfo.io/{ip}", 6),
+    "ipwho.is": ("https://ipwho.is/{ip}?security=1", 8),
+    "ip2location.io": ("https://api.ip2location.io/?ip={ip}", 8),
+    "ip-api.com": ("http://ip-api.com/json/{ip}?fields=66846719", 5),
+    "ipwhois.io": ("https://ipwhois.app/json/{ip}", 8),
+    "ipapi.co": ("https://ipapi.co/{ip}/json/", 8),
+    "api.db-ip.com": ("https://api.db-ip.com/v2/free/{ip}", 8),
 }
 
+DEADLINE = 15        # секунд на все источники вместе
+CONNECT_TIMEOUT = 4
+
+# IPROBIV_STUB=http://127.0.0.1:8000 отправляет все запросы на локальную
+# заглушку: https://ipinfo.io/1.2.3.4 -> http://127.0.0.1:8000/ipinfo.io/1.2.3.4
+STUB_ENV = "IPROBIV_STUB"
+
+def stub_url(name, url, stub=None):
+    stub = stub or os.getenv(STUB_ENV)
+    if not stub:
+        return url
+    parts = urlsplit(url)
+    rest = parts.path + ("?" + parts.query if parts.query else "")
+    return f"{stub.rstrip('/')}/{name}{rest}"
+
+def provider_urls(stub=None):
+    """имя -> (шаблон URL, таймаут) с учётом заглушки"""
+    return {name: (stub_url(name, url, stub), timeout)
+            for name, (url, timeout) in PROVIDERS.items()}
+
+def make_session(pool_size=len(PROVIDERS)):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=len(PROVIDERS), pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 # Ключевые поля для OSINT
 
 keys = [
@@ -56,35 +99,402 @@ def format_value(value):
         return ", ".join(f"{k}:{v}" for k, v in value.items())
     return str(value)
 
-for name, url in sources.items():
-    console.rule(f"[bold green]{name}[/bold green]")
+# ---------- Запросы ----------
+
+def fetch(session, name, url, timeout):
+    """(имя, JSON или текст ответа, ошибка или None, секунды)"""
+    start = time.perf_counter()
     try:
-        r = requests.get(url, timeout=10)
+        r = session.get(url, timeout=(min(CONNECT_TIMEOUT, timeout), timeout))
         r.raise_for_status()
         try:
             data = r.json()
         except ValueError:
-            console.print(r.text)
-            continue
+            data = r.text
+        return name, data, None, time.perf_counter() - start
+    except Exception as e:
+        return name, None, str(e), time.perf_counter() - start
 
-        table = Table(show_header=True, header_style="bold magenta")
-        table.title = name
-        table.add_column("Field", style="cyan")
-        table.add_column("Value", style="yellow")
+def lookup(ip, session=None, deadline=DEADLINE, providers=None):
+    """Опрашивает все источники параллельно; выдаёт результаты по мере готовности.
+    Что не успело к deadline - выдаётся с ошибкой таймаута."""
+    providers = providers or provider_urls()
+    own = session is None
+    session = session or make_session()
+    pool = ThreadPoolExecutor(max_workers=len(providers))
+    # таймаут запроса не больше общего срока - иначе поток держит выход из программы
+    futures = {pool.submit(fetch, session, name, url.format(ip=ip), min(timeout, deadline)): name
+               for name, (url, timeout) in providers.items()}
+    try:
+        for fut in as_completed(futures, timeout=deadline):
+            yield fut.result()
+    except FuturesTimeout:
+        for fut, name in futures.items():
+            if not fut.done():
+                yield name, None, f"no answer within {deadline} s", float(deadline)
+    finally:
+        # зависшие запросы не держат выход - их потоки закончатся по своему таймауту
+        pool.shutdown(wait=False, cancel_futures=True)
+        if own:
+            session.close()
 
-        for key in keys:
-            value = data.get(key)
+# ---------- Вывод ----------
 
-            # ищем в вложенных словарях
-            if value is None:
-                for sub in ["connection", "timezone", "flag"]:
-                    if sub in data and key in data[sub]:
-                        value = data[sub][key]
+def find_value(data, key):
+    value = data.get(key)
 
-            if value is not None:
-                table.add_row(key, format_value(value))
+    # ищем в вложенных словарях
+    if value is None:
+        for sub in ["connection", "timezone", "flag"]:
+            if isinstance(data.get(sub), dict) and key in data[sub]:
+                value = data[sub][key]
+    return value
 
-        console.print(table)
+def render(name, data, error, seconds):
+    console.rule(f"[bold green]{name}[/bold green] [dim]{seconds:.2f}s[/dim]")
+    if error is not None:
+        console.print(f"[red]Ошибка при запросе {name}: {error}[/red]")
+        return
+    if not isinstance(data, dict):
+        console.print(data)
+        return
 
-    except Exception as e:
-        console.print(f"[red]Ошибка при запросе {name}: {e}[/red]")
\ No newline at end of file
+    table = Table(show_header=True, header_style="bold magenta")
+    table.title = name
+    table.add_column("Field", style="cyan")
+    table.add_column("Value", style="yellow")
+
+    for key in keys:
+        value = find_value(data, key)
+        if value is not None:
+            table.add_row(key, format_value(value))
+
+    console.print(table)
+
+# ---------- Локальная база ----------
+
+def open_local(paths=None, max_age=MAX_AGE_DAYS):
+    """IPDatabase или None, если базы нет или она устарела (тогда - только удалённые источники)"""
+    try:
+        db = IPDatabase.open(paths)
+    except (OSError, ValueError) as e:
+        print(f"[!] Local database unusable: {e}", file=sys.stderr)
+        return None
+    if db is not None and db.stale(max_age):
+        print(f"[!] Local database is {db.age_days():.0f} days old - using remote providers",
+              file=sys.stderr)
+        db.close()
+        return None
+    return db
+
+def local_lookup(db, ip):
+    """(имя, данные, ошибка, секунды) в формате lookup()"""
+    start = time.perf_counter()
+    try:
+        return "local database", db.lookup(ip), None, time.perf_counter() - start
+    except ValueError as e:
+        return "local database", None, str(e), time.perf_counter() - start
+
+# ---------- Пакетный режим ----------
+
+# лимиты бесплатных тарифов: (запросов, за секунд); остальным - 60 в минуту
+RATE_LIMITS = {
+    "ip-api.com": (45, 60),
+    "ip-api.com/batch": (15, 60),
+    "ipapi.co": (1000, 86400),       # дневной лимит
+    "ipinfo.io": (1600, 86400),      # ~50k в месяц
+    "ip2location.io": (1000, 86400),
+}
+DEFAULT_RATE = (60, 60)
+
+# провайдеры с пакетным endpoint: имя -> (URL, адресов в запросе)
+BATCH = {
+    "ip-api.com": ("http://ip-api.com/batch?fields=66846719", 100),
+}
+
+BULK_PROVIDERS = ("ip-api.com",)
+MAX_RETRIES = 3
+BACKOFF = 30.0
+
+_IPV4 = r"(?<![\d.])(?:\d{1,3}\.){3}\d{1,3}(?!\.?\d)"
+_IPV6 = r"(?<![\w:])[0-9A-Fa-f]{0,4}(?::[0-9A-Fa-f]{0,4}){2,7}(?![\w:.])"
+IP_PATTERN = re.compile(f"{_IPV4}|{_IPV6}")
+
+def iter_ips(lines, stats, public_only=True):
+    """уникальные адреса из строк лога; дубликаты отсеиваются по множеству int"""
+    seen = set()
+    for line in lines:
+        for token in IP_PATTERN.findall(line):
+            try:
+                addr = ipaddress.ip_address(token)
+            except ValueError:
+                continue
+            key = int(addr) if addr.version == 4 else int(addr) | 1 << 128
+            if key in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(key)
+            if public_only and not addr.is_global:
+                stats["private"] += 1
+                continue
+            stats["unique"] += 1
+            yield str(addr)
+
+# нормализованные колонки CSV -> ключи разных провайдеров
+COLUMNS = {
+    "country": ("country_name", "countryName", "country"),
+    "country_code": ("country_code", "countryCode"),
+    "region": ("region", "regionName", "region_name", "stateProv"),
+    "city": ("city", "city_name"),
+    "lat": ("latitude", "lat"),
+    "lon": ("longitude", "lon"),
+    "asn": ("asn", "as"),
+    "org": ("org", "isp", "asname"),
+}
+CSV_FIELDS = ("ip", "provider") + tuple(COLUMNS) + ("error",)
+
+def normalize(data):
+    row = {}
+    for column, candidates in COLUMNS.items():
+        for key in candidates:
+            value = find_value(data, key)
+            if value not in (None, ""):
+                row[column] = format_value(value)
+                break
+    if "lat" not in row and isinstance(data.get("loc"), str) and "," in data["loc"]:
+        row["lat"], row["lon"] = data["loc"].split(",", 1)
+    return row
+
+# те же писатели, что у exifread (построчный flush), только строка - ответ провайдера
+class JsonlWriter(metarecord.JsonlWriter):
+    def write(self, ip, provider, data, error):
+        self.emit({"ip": ip, "provider": provider, "error": error, "data": data})
+
+class CsvWriter(metarecord.CsvWriter):
+    fields = CSV_FIELDS
+
+    def write(self, ip, provider, data, error):
+        row = normalize(data) if isinstance(data, dict) else {}
+        row.update(ip=ip, provider=provider, error=error)
+        self.emit(row)
+
+WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter}
+
+class BulkLookup:
+    """Адреса потоком -> строки (ip, провайдер, данные, ошибка) в writer.
+    У каждого провайдера свой пул, свой TokenBucket и ограниченное число
+    запросов в полёте, так что память не растёт с размером входа."""
+
+    def __init__(self, providers=BULK_PROVIDERS, session=None, stub=None, max_wait=60.0,
+                 workers=4, local=None):
+        self.local = local
+        urls = provider_urls(stub)
+        self.providers = list(providers)
+        self.urls = {name: urls[name] for name in self.providers}
+        self.batch_urls = {name: (stub_url(name, url, stub), size)
+                           for name, (url, size) in BATCH.items() if name in self.providers}
+        self.session = session or make_session(workers * len(self.providers))
+        self.max_wait = max_wait
+        self.buckets = {}
+        for name in self.providers:
+            key = name + "/batch" if name in self.batch_urls else name
+            rate, per = RATE_LIMITS.get(key, DEFAULT_RATE)
+            self.buckets[name] = TokenBucket(rate, per=per)
+        self.pools = {name: ThreadPoolExecutor(max_workers=workers) for name in self.providers}
+        self.window = workers * 2
+        self.exhausted = set()
+        self._lock = threading.Lock()
+        self.stats = {"unique": 0, "duplicates": 0, "private": 0, "local": 0,
+                      "requests": 0, "rate_limited": 0, "errors": 0}
+
+    # ---------------------------
+    # Запросы
+    # ---------------------------
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _acquire(self, name):
+        # лимит, которого не дождаться за max_wait (дневной), - провайдер выбывает
+        if name in self.exhausted:
+            return False
+        if self.buckets[name].delay() > self.max_wait:
+            self.exhausted.add(name)
+            return False
+        return self.buckets[name].acquire(self.max_wait)
+
+    def _request(self, name, method, url, timeout, **kwargs):
+        for attempt in range(MAX_RETRIES + 1):
+            if not self._acquire(name):
+                raise RuntimeError("rate limit reached")
+            self._count("requests")
+            r = self.session.request(method, url, timeout=(CONNECT_TIMEOUT, timeout), **kwargs)
+            if r.status_code == 429:
+                self._count("rate_limited")
+                self.buckets[name].pause(self._retry_after(r, attempt))
+                continue
+            r.raise_for_status()
+            return r.json()
+        raise RuntimeError("rate limit reached")
+
+    @staticmethod
+    def _retry_after(r, attempt):
+        # ip-api.com сообщает секунды до сброса в X-Ttl
+        for header in ("Retry-After", "X-Ttl"):
+            try:
+                return float(r.headers.get(header))
+            except (TypeError, ValueError):
+                pass
+        return BACKOFF * (2 ** attempt)
+
+    def _single(self, name, ip):
+        url, timeout = self.urls[name]
+        try:
+            return [(ip, name, self._request(name, "GET", url.format(ip=ip), timeout), None)]
+        except Exception as e:
+            return [(ip, name, None, str(e))]
+
+    def _batch(self, name, ips):
+        url, _ = self.batch_urls[name]
+        try:
+            answers = self._request(name, "POST", url, self.urls[name][1] * 3, json=ips)
+        except Exception as e:
+            return [(ip, name, None, str(e)) for ip in ips]
+        # ответ не по одному объекту на адрес (ошибка, страница прокси) - строка
+        # с ошибкой для каждого адреса пачки, а не падение всего прогона
+        if not (isinstance(answers, list) and len(answers) == len(ips)
+                and all(isinstance(data, dict) for data in answers)):
+            error = f"bad batch response: expected {len(ips)} objects, got {type(answers).__name__}"
+            if isinstance(answers, list):
+                error += f" of {len(answers)}"
+            return [(ip, name, None, error) for ip in ips]
+        rows = []
+        for ip, data in zip(ips, answers):
+            error = data.get("message") if data.get("status") == "fail" else None
+            rows.append((ip, name, data, error))
+        return rows
+
+    # ---------------------------
+    # Планировщик
+    # ---------------------------
+
+    def _drain(self, futures, writer, block):
+        done, _ = wait(futures, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for fut in done:
+            futures.discard(fut)
+            for ip, provider, data, error in fut.result():
+                if error:
+                    self.stats["errors"] += 1
+                writer.write(ip, provider, data, error)
+
+    def _submit(self, name, fn, arg, pending, writer):
+        while len(pending[name]) >= self.window:
+            self._drain(pending[name], writer, block=True)
+        pending[name].add(self.pools[name].submit(fn, name, arg))
+
+    def run(self, ips, writer):
+        pending = {name: set() for name in self.providers}
+        chunks = {name: [] for name in self.batch_urls}
+        try:
+            for ip in ips:
+                # есть в локальной базе - в сеть не ходим
+                rec = self.local.lookup(ip) if self.local else None
+                if rec:
+                    self.stats["local"] += 1
+                    writer.write(ip, "local", rec, None)
+                    continue
+                for name in self.providers:
+                    if name in chunks:
+                        chunks[name].append(ip)
+                        if len(chunks[name]) >= self.batch_urls[name][1]:
+                            self._submit(name, self._batch, chunks[name], pending, writer)
+                            chunks[name] = []
+                    else:
+                        self._submit(name, self._single, ip, pending, writer)
+                for futures in pending.values():
+                    if futures:
+                        self._drain(futures, writer, block=False)
+            for name, chunk in chunks.items():
+                if chunk:
+                    self._submit(name, self._batch, chunk, pending, writer)
+            for futures in pending.values():
+                while futures:
+                    self._drain(futures, writer, block=True)
+        finally:
+            for pool in self.pools.values():
+                pool.shutdown(wait=False, cancel_futures=True)
+        return self.stats
+
+    def summary(self):
+        s = self.stats
+        text = (f"{s['unique']} unique addresses, {s['duplicates']} duplicates, "
+                f"{s['private']} private/reserved skipped; {s['local']} answered locally, "
+                f"{s['requests']} requests, "
+                f"{s['rate_limited']} rate-limited, {s['errors']} failed lookups")
+        if self.exhausted:
+            text += "; limit reached: " + ", ".join(sorted(self.exhausted))
+        return text
+
+# ---------- RUN ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="IP lookup across public geo/ASN providers")
+    parser.add_argument("ip", nargs="?", help="address to look up (asked interactively if omitted)")
+    parser.add_argument("--deadline", type=float, default=DEADLINE,
+                        help=f"seconds to wait for all providers together (default: {DEADLINE})")
+    parser.add_argument("--stub", help=f"send every request to this base URL (or ${STUB_ENV})")
+    parser.add_argument("--db", action="append",
+                        help=f"local .mmdb/.ipdb file or folder (default: ${DB_ENV} or {DB_DIR})")
+    parser.add_argument("--db-max-age", type=float, default=MAX_AGE_DAYS,
+                        help=f"days before the local database counts as stale (default: {MAX_AGE_DAYS})")
+    parser.add_argument("--remote", action="store_true",
+                        help="ask the remote providers even when the local database knows the address")
+    bulk = parser.add_argument_group("bulk mode")
+    bulk.add_argument("--bulk", metavar="FILE",
+                      help="read addresses from a file or log ('-' = stdin)")
+    bulk.add_argument("--providers", default=",".join(BULK_PROVIDERS),
+                      help=f"comma separated (default: {','.join(BULK_PROVIDERS)})")
+    bulk.add_argument("--format", choices=sorted(WRITERS), default="jsonl")
+    bulk.add_argument("-o", "--output", help="write results here instead of stdout")
+    bulk.add_argument("--max-wait", type=float, default=60.0,
+                      help="give up on a provider whose rate limit needs a longer wait (default: 60)")
+    bulk.add_argument("--all-addresses", action="store_true",
+                      help="also look up private and reserved addresses")
+    args = parser.parse_args()
+
+    if args.bulk:
+        names = [n.strip() for n in args.providers.split(",") if n.strip()]
+        unknown = [n for n in names if n not in PROVIDERS]
+        if unknown:
+            parser.error(f"unknown providers: {', '.join(unknown)}")
+        source = sys.stdin if args.bulk == "-" else open(args.bulk, encoding="utf-8", errors="replace")
+        out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+        local = None if args.remote else open_local(args.db, args.db_max_age)
+        engine = BulkLookup(names, stub=args.stub, max_wait=args.max_wait, local=local)
+        try:
+            engine.run(iter_ips(source, engine.stats, not args.all_addresses),
+                       WRITERS[args.format](out))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if out is not sys.stdout:
+                out.close()
+        print(f"[*] {engine.summary()}", file=sys.stderr)
+        sys.exit(0)
+
+    ip = (args.ip or input("Enter IP: ")).strip()
+    if not ip:
+        sys.exit(1)
+
+    local = open_local(args.db, args.db_max_age)
+    if local is not None:
+        result = local_lookup(local, ip)
+        if result[1] or result[2]:
+            render(*result)
+        else:
+            console.print(f"[dim]{ip} is not in the local database ({local.describe()})[/dim]")
+        if result[1] and not args.remote:
+            sys.exit(0)
+    for result in lookup(ip, deadline=args.deadline, providers=provider_urls(args.stub)):
+        render(*result)
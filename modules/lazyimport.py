@@ -0,0 +1,65 @@
+# Lazy loading of optional third-party libraries
+# A library is imported the first time a backend asks for it, so starting a
+# tool for one JPEG doesn't pay for PyPDF2, mutagen, hachoir, ...
+#
+# Scripts in this folder can shadow libraries (exifread.py vs the exifread
+# package); import_library() skips this folder so the real package is found.
+
+import os
+import sys
+import threading
+import importlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# sys.path and sys.modules are process-wide: two threads swapping them at
+# once could restore each other's copy or import our script instead
+_swap_lock = threading.Lock()
+
+def _shadowed(top):
+    return os.path.exists(os.path.join(HERE, top + ".py"))
+
+def import_library(module):
+    """importlib.import_module that ignores same-named scripts in modules/."""
+    top = module.split(".")[0]
+    if not _shadowed(top):
+        return importlib.import_module(module)
+
+    with _swap_lock:
+        saved_path = sys.path[:]
+        ours = sys.modules.get(top)
+        if ours is not None and os.path.dirname(os.path.abspath(getattr(ours, "__file__", "") or "")) == HERE:
+            del sys.modules[top]
+        else:
+            ours = None
+        try:
+            sys.path[:] = [p for p in sys.path if os.path.abspath(p or ".") != HERE]
+            return importlib.import_module(module)
+        finally:
+            sys.path[:] = saved_path
+            if ours is not None:
+                sys.modules[top] = ours
+
+class Backends:
+    """name -> (module, attribute or None), resolved on first get()."""
+
+    def __init__(self, table):
+        self.table = table
+        self._cache = {}
+
+    def get(self, name):
+        if name not in self._cache:
+            module, attr = self.table[name]
+            try:
+                obj = import_library(module)
+                self._cache[name] = getattr(obj, attr) if attr else obj
+            except (ImportError, AttributeError):
+                self._cache[name] = None
+        return self._cache[name]
+
+    def loaded(self):
+        return sorted(n for n, v in self._cache.items() if v is not None)
+
+    def load_all(self):
+        for name in self.table:
+            self.get(name)
@@ -0,0 +1,219 @@
+# Shared file-type detection by magic bytes (FindTheMole + metadata reader)
+# Signatures are compiled once into a prefix trie per offset; detection walks
+# at most the longest signature, so the cost per file is constant.
+
+import os
+
+HEADER_SIZE = 4096
+
+# ---------------------------
+# Structural checks
+# ---------------------------
+
+# two-byte signatures ("BM", MPEG frame sync) show up in ordinary text and
+# data, so they only count when the header behind them is well-formed
+
+def _bmp(header):
+    # BITMAPFILEHEADER is followed by a DIB header of a known size
+    return int.from_bytes(header[14:18], "little") in (12, 40, 52, 56, 64, 108, 124)
+
+_MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),    # MPEG-1
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),        # MPEG-2
+}
+_MP3_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000)}
+
+def _mp3_frame(header, pos):
+    """length of the layer III frame at pos, or None"""
+    if len(header) < pos + 4 or header[pos] != 0xFF:
+        return None
+    version, layer = (header[pos + 1] >> 3) & 3, (header[pos + 1] >> 1) & 3
+    bitrate, rate = header[pos + 2] >> 4, (header[pos + 2] >> 2) & 3
+    if version not in _MP3_BITRATES or layer != 1 or not 0 < bitrate < 15 or rate == 3:
+        return None
+    scale = 144000 if version == 3 else 72000
+    return scale * _MP3_BITRATES[version][bitrate] // _MP3_RATES[version][rate] + ((header[pos + 2] >> 1) & 1)
+
+def _mp3(header):
+    # a sane frame header, and the next frame right behind it when it fits
+    size = _mp3_frame(header, 0)
+    if size is None:
+        return False
+    return size + 4 > len(header) or _mp3_frame(header, size) is not None
+
+# (kind, [(offset, bytes), ...][, check]) - every part must match, and the
+# check (if any) must accept the header
+SIGNATURES = [
+    ("zip",  [(0, b"PK\x03\x04")]),
+    ("zip",  [(0, b"PK\x05\x06")]),
+    ("rar",  [(0, b"Rar!\x1a\x07")]),
+    ("7z",   [(0, b"7z\xbc\xaf\x27\x1c")]),
+    ("gz",   [(0, b"\x1f\x8b\x08")]),
+    ("ole",  [(0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1")]),
+    ("pdf",  [(0, b"%PDF")]),
+    ("elf",  [(0, b"\x7fELF")]),
+    ("exe",  [(0, b"MZ")]),
+    ("jpg",  [(0, b"\xff\xd8\xff")]),
+    ("png",  [(0, b"\x89PNG\r\n\x1a\n")]),
+    ("gif",  [(0, b"GIF87a")]),
+    ("gif",  [(0, b"GIF89a")]),
+    ("bmp",  [(0, b"BM")], _bmp),
+    ("tiff", [(0, b"II*\x00")]),
+    ("tiff", [(0, b"MM\x00*")]),
+    ("webp", [(0, b"RIFF"), (8, b"WEBP")]),
+    ("avi",  [(0, b"RIFF"), (8, b"AVI ")]),
+    ("wav",  [(0, b"RIFF"), (8, b"WAVE")]),
+    ("mp3",  [(0, b"ID3")]),
+    ("mp3",  [(0, b"\xff\xfb")], _mp3),
+    ("mp3",  [(0, b"\xff\xf3")], _mp3),
+    ("mp3",  [(0, b"\xff\xf2")], _mp3),
+    ("flac", [(0, b"fLaC")]),
+    ("ogg",  [(0, b"OggS")]),
+    ("mkv",  [(0, b"\x1a\x45\xdf\xa3")]),
+    ("mp4",  [(4, b"ftyp")]),
+    ("heic", [(4, b"ftypheic")]),
+    ("heic", [(4, b"ftypheix")]),
+    ("heic", [(4, b"ftyphevc")]),
+    ("heic", [(4, b"ftypmif1")]),
+    ("heic", [(4, b"ftypmsf1")]),
+    ("heic", [(4, b"ftypavif")]),
+    ("mov",  [(4, b"ftypqt  ")]),
+    ("m4a",  [(4, b"ftypM4A ")]),
+]
+
+# extensions that are normal for each detected kind
+KIND_EXTS = {
+    "zip":  {"zip", "docx", "xlsx", "pptx", "docm", "xlsm", "pptm", "odt", "ods",
+             "odp", "jar", "apk", "epub", "xpi", "whl", "cbz"},
+    "docx": {"docx", "docm", "dotx"},
+    "xlsx": {"xlsx", "xlsm", "xltx"},
+    "pptx": {"pptx", "pptm", "potx"},
+    "jar":  {"jar", "war", "ear"},
+    "apk":  {"apk"},
+    "rar":  {"rar", "cbr"},
+    "7z":   {"7z"},
+    "gz":   {"gz", "tgz"},
+    "ole":  {"doc", "xls", "ppt", "msi", "msg"},
+    "pdf":  {"pdf"},
+    "elf":  {"", "elf", "so", "o", "ko", "bin"},
+    "exe":  {"exe", "dll", "sys", "ocx", "drv", "efi", "cpl", "mui"},
+    "jpg":  {"jpg", "jpeg", "jpe", "jfif"},
+    "png":  {"png"},
+    "gif":  {"gif"},
+    "bmp":  {"bmp", "dib"},
+    "tiff": {"tif", "tiff", "dng", "nef", "cr2", "arw"},
+    "webp": {"webp"},
+    "avi":  {"avi"},
+    "wav":  {"wav"},
+    "mp3":  {"mp3"},
+    "flac": {"flac"},
+    "ogg":  {"ogg", "oga", "opus"},
+    "mkv":  {"mkv", "webm", "mka"},
+    "mp4":  {"mp4", "m4v", "m4a", "3gp", "3g2", "mov"},
+    "heic": {"heic", "heif", "avif"},
+    "mov":  {"mov", "qt"},
+    "m4a":  {"m4a", "m4b"},
+}
+
+GENERIC = ("zip", "mp4")
+
+EXT_KIND = {}
+for _kind in sorted(KIND_EXTS, key=lambda k: k not in GENERIC):
+    for _ext in KIND_EXTS[_kind]:
+        if _ext:
+            EXT_KIND[_ext] = _kind
+
+# zip member names that identify the container: (prefix, kind), matched
+# against local-header filenames in the header only
+_ZIP_HINTS = [
+    (b"word/", "docx"),
+    (b"xl/", "xlsx"),
+    (b"ppt/", "pptx"),
+    (b"AndroidManifest.xml", "apk"),
+    (b"META-INF/MANIFEST.MF", "jar"),
+]
+
+# zip-based formats that are still plain archives when named .zip
+ZIP_FLAVOURS = {"docx", "xlsx", "pptx", "jar", "apk"}
+
+# ---------------------------
+# Trie
+# ---------------------------
+
+def _compile(signatures):
+    tries = {}
+    for kind, parts, *check in signatures:
+        (offset, prefix), rest = parts[0], parts[1:]
+        node = tries.setdefault(offset, {})
+        for b in prefix:
+            node = node.setdefault(b, {})
+        node.setdefault(None, []).append((kind, rest, sum(len(p) for _, p in parts),
+                                          check[0] if check else None))
+    depth = max(len(p) for _, parts, *_ in signatures for _, p in parts[:1])
+    return sorted(tries.items()), depth
+
+_TRIES, _DEPTH = _compile(SIGNATURES)
+
+def detect(header):
+    """Most specific kind whose signature matches header, or None."""
+    best, best_len = None, 0
+    for offset, node in _TRIES:
+        for b in header[offset:offset + _DEPTH]:
+            node = node.get(b)
+            if node is None:
+                break
+            for kind, rest, length, check in node.get(None, ()):
+                if (length > best_len and all(header[o:o + len(p)] == p for o, p in rest)
+                        and (check is None or check(header))):
+                    best, best_len = kind, length
+    if best == "zip":
+        for name in _zip_names(header):
+            for hint, kind in _ZIP_HINTS:
+                if name.startswith(hint):
+                    return kind
+    return best
+
+_LOCAL = b"PK\x03\x04"
+
+def _zip_names(header):
+    """filenames of the local file headers that fit in header"""
+    pos = header.find(_LOCAL)
+    while 0 <= pos and pos + 30 <= len(header):
+        flags, size, name_len, extra_len = (
+            int.from_bytes(header[pos + o:pos + o + n], "little")
+            for o, n in ((6, 2), (18, 4), (26, 2), (28, 2)))
+        name_end = pos + 30 + name_len
+        if name_end > len(header):
+            return
+        yield header[pos + 30:name_end]
+        if flags & 0x08:
+            # sizes follow the data (data descriptor): find the next record
+            pos = header.find(_LOCAL, name_end)
+        else:
+            pos = name_end + extra_len + size
+            if header[pos:pos + 4] != _LOCAL:
+                return
+
+def read_header(path, size=HEADER_SIZE):
+    with open(path, "rb") as f:
+        return f.read(size)
+
+def file_ext(path):
+    return os.path.splitext(path)[1].lower().lstrip(".")
+
+def matches_ext(kind, ext):
+    return ext in KIND_EXTS.get(kind, {kind}) or (kind in ZIP_FLAVOURS and ext == "zip")
+
+def resolve(kind, ext):
+    """Routing kind: trust the content, but let a compatible extension refine
+    a generic container (a .docx whose header only said 'zip')."""
+    if kind is None or (kind in GENERIC and matches_ext(kind, ext)):
+        return EXT_KIND.get(ext, kind)
+    if kind in ZIP_FLAVOURS and ext == "zip":
+        return "zip"
+    return kind
+
+def detect_file(path):
+    """(routing kind, header bytes) from one header read."""
+    header = read_header(path)
+    return resolve(detect(header), file_ext(path)), header
@@ -0,0 +1,645 @@
+# Native container header reader for the metadata reader (exifread.py)
+# ISO-BMFF (mp4 / mov / heic / avif), Matroska / WebM and RIFF / AVI.
+# Only box / element headers and the metadata parts (moov, meta, Info,
+# Tracks, Tags, hdrl, INFO) are read; media data is skipped with seek(),
+# so a 4 GB video costs a few small reads. probe() returns None for
+# anything it can't handle - the caller falls back to ffprobe.
+
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+
+from metarecord import dms_to_deg, parse_iso6709, ratio
+
+MAX_META = 64 * 1024 * 1024     # biggest moov / meta / Info we load
+MAX_EXIF = 1024 * 1024
+
+EPOCH_1904 = datetime(1904, 1, 1, tzinfo=timezone.utc)   # QuickTime
+EPOCH_2001 = datetime(2001, 1, 1, tzinfo=timezone.utc)   # Matroska DateUTC
+
+def _new(container):
+    return {"container": container, "created": None, "modified": None, "taken": None,
+            "duration": None, "make": None, "model": None, "software": None, "author": None,
+            "title": None, "location": None, "streams": [], "tags": {}}
+
+def _iso(dt):
+    return dt.isoformat().replace("+00:00", "Z")
+
+def _text(raw):
+    return raw.split(b"\0", 1)[0].decode("utf-8", "replace").strip()
+
+# ---------------------------
+# EXIF (TIFF) - HEIF Exif items
+# ---------------------------
+
+TIFF_TAGS = {0x010F: "Make", 0x0110: "Model", 0x0131: "Software", 0x0132: "DateTime",
+             0x013B: "Artist", 0x9003: "DateTimeOriginal", 0x9004: "DateTimeDigitized"}
+GPS_TAGS = {1: "GPSLatitudeRef", 2: "GPSLatitude", 3: "GPSLongitudeRef",
+            4: "GPSLongitude", 5: "GPSAltitudeRef", 6: "GPSAltitude"}
+EXIF_IFD, GPS_IFD = 0x8769, 0x8825
+_TYPE_SIZE = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+def _ifd(data, bo, off):
+    entries = {}
+    if off <= 0 or off + 2 > len(data):
+        return entries
+    count = struct.unpack_from(bo + "H", data, off)[0]
+    for i in range(min(count, 512)):
+        pos = off + 2 + i * 12
+        if pos + 12 > len(data):
+            break
+        tag, typ, n = struct.unpack_from(bo + "HHI", data, pos)
+        size = _TYPE_SIZE.get(typ)
+        if size is None:
+            continue
+        start = pos + 8 if size * n <= 4 else struct.unpack_from(bo + "I", data, pos + 8)[0]
+        raw = data[start:start + size * n]
+        if len(raw) < size * n:
+            continue
+        if typ == 2:
+            value = _text(raw)
+        elif typ in (3, 4, 9):
+            fmt = {3: "H", 4: "I", 9: "i"}[typ]
+            value = list(struct.unpack(bo + fmt * n, raw))
+        elif typ in (5, 10):
+            fmt = "I" if typ == 5 else "i"
+            nums = struct.unpack(bo + fmt * (2 * n), raw)
+            value = list(zip(nums[::2], nums[1::2]))
+        else:
+            value = raw
+        if isinstance(value, list) and len(value) == 1 and typ in (3, 4, 9):
+            value = value[0]
+        entries[tag] = value
+    return entries
+
+def parse_exif(data):
+    """Make/Model/dates/GPS from a TIFF-structured EXIF block"""
+    if data[:4] == b"Exif":
+        data = data[6:]
+    bo = {b"II": "<", b"MM": ">"}.get(bytes(data[:2]))
+    if bo is None or len(data) < 8:
+        return {}
+    ifd0 = _ifd(data, bo, struct.unpack_from(bo + "I", data, 4)[0])
+    out = {name: ifd0[tag] for tag, name in TIFF_TAGS.items() if tag in ifd0}
+    if isinstance(ifd0.get(EXIF_IFD), int):
+        sub = _ifd(data, bo, ifd0[EXIF_IFD])
+        out.update({name: sub[tag] for tag, name in TIFF_TAGS.items() if tag in sub})
+    if isinstance(ifd0.get(GPS_IFD), int):
+        gps = _ifd(data, bo, ifd0[GPS_IFD])
+        out.update({name: gps[tag] for tag, name in GPS_TAGS.items() if tag in gps})
+    return out
+
+def _exif_into(info, exif):
+    info["tags"].update({k: v for k, v in exif.items() if isinstance(v, (str, int))})
+    for key, name in (("make", "Make"), ("model", "Model"), ("software", "Software"),
+                      ("author", "Artist")):
+        info[key] = info[key] or exif.get(name) or None
+    info["taken"] = info["taken"] or exif.get("DateTimeOriginal") or exif.get("DateTime")
+    if "GPSLatitude" in exif and "GPSLongitude" in exif:
+        lat = dms_to_deg(exif["GPSLatitude"], exif.get("GPSLatitudeRef"))
+        lon = dms_to_deg(exif["GPSLongitude"], exif.get("GPSLongitudeRef"))
+        alt = exif.get("GPSAltitude")
+        # a malformed file can store a SHORT/LONG here instead of one RATIONAL
+        try:
+            alt = ratio(alt[0] if isinstance(alt, (list, tuple)) else alt) if alt else None
+        except (TypeError, ValueError, ZeroDivisionError):
+            alt = None
+        if alt is not None and exif.get("GPSAltitudeRef") in (b"\x01", 1):
+            alt = -alt
+        if lat is not None and lon is not None:
+            info["location"] = (lat, lon, alt)
+
+# ---------------------------
+# ISO-BMFF (mp4 / mov / heic)
+# ---------------------------
+
+def _boxes(data, start=0, end=None):
+    """(type, body_start, box_end) for boxes inside a buffer"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, typ = struct.unpack_from(">I4s", data, pos)
+        head = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            head = 16
+        elif size == 0:
+            size = end - pos
+        if size < head or pos + size > end:
+            return
+        yield typ, pos + head, pos + size
+        pos += size
+
+def _file_boxes(f, end):
+    """same over a file, reading only the 8/16-byte headers"""
+    pos = 0
+    while pos + 8 <= end:
+        f.seek(pos)
+        head = f.read(16)
+        if len(head) < 8:
+            return
+        size, typ = struct.unpack_from(">I4s", head)
+        hl = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", head, 8)[0]
+            hl = 16
+        elif size == 0:
+            size = end - pos
+        if size < hl:
+            return
+        yield typ, pos + hl, min(pos + size, end)
+        pos += size
+
+def _find(data, path):
+    """body of the first box along path, e.g. [b'mdia', b'minf', b'stbl']"""
+    start, end = 0, len(data)
+    for name in path:
+        for typ, s, e in _boxes(data, start, end):
+            if typ == name:
+                start, end = s, e
+                break
+        else:
+            return None
+    return data[start:end]
+
+def _mac_time(seconds):
+    if not seconds:
+        return None
+    try:
+        return _iso(EPOCH_1904 + timedelta(seconds=seconds))
+    except OverflowError:
+        return None
+
+def _qt_string(body):
+    # QuickTime udta text: u16 length, u16 language, text
+    if len(body) >= 4:
+        n = struct.unpack_from(">H", body)[0]
+        if 4 + n <= len(body):
+            return body[4:4 + n].decode("utf-8", "replace").strip("\0")
+    return _text(body)
+
+def _data_value(body):
+    # iTunes / mdta 'data' box: u32 type, u32 locale, payload
+    if len(body) < 8:
+        return None
+    code = struct.unpack_from(">I", body)[0] & 0xFFFFFF
+    payload = body[8:]
+    if code == 1:
+        return payload.decode("utf-8", "replace")
+    if code == 23 and len(payload) == 4:
+        return struct.unpack(">f", payload)[0]
+    if code == 24 and len(payload) == 8:
+        return struct.unpack(">d", payload)[0]
+    if code in (21, 22) and 0 < len(payload) <= 8:
+        return int.from_bytes(payload, "big", signed=code == 21)
+    return f"<{len(payload)} bytes>"
+
+def _meta_ilst(body, tags):
+    # moov/meta is a plain box in QuickTime, a full box in MP4 udta
+    start = 0 if body[4:8] in (b"hdlr", b"keys", b"ilst") else 4
+    keys = []
+    keys_box = None
+    for typ, s, e in _boxes(body, start):
+        if typ == b"keys":
+            keys_box = body[s:e]
+    if keys_box:
+        pos = 8
+        for _ in range(struct.unpack_from(">I", keys_box, 4)[0]):
+            if pos + 8 > len(keys_box):
+                break
+            size = struct.unpack_from(">I", keys_box, pos)[0]
+            if size < 8:
+                break
+            keys.append(keys_box[pos + 8:pos + size].decode("utf-8", "replace"))
+            pos += size
+    ilst = _find(body[start:], [b"ilst"])
+    if not ilst:
+        return
+    for typ, s, e in _boxes(ilst):
+        index = int.from_bytes(typ, "big")
+        name = keys[index - 1] if keys and 1 <= index <= len(keys) else typ.decode("latin-1")
+        data = _find(ilst[s:e], [b"data"])
+        if data is not None:
+            tags[name] = _data_value(data)
+
+def _trak(body):
+    stream = {}
+    tkhd = _find(body, [b"tkhd"])
+    if tkhd and len(tkhd) >= 84:
+        w, h = struct.unpack_from(">II", tkhd, len(tkhd) - 8)
+        if w or h:
+            stream["width"], stream["height"] = w >> 16, h >> 16
+    hdlr = _find(body, [b"mdia", b"hdlr"])
+    if hdlr and len(hdlr) >= 12:
+        kind = hdlr[8:12]
+        stream["type"] = {b"vide": "video", b"soun": "audio"}.get(kind, kind.decode("latin-1"))
+    stsd = _find(body, [b"mdia", b"minf", b"stbl", b"stsd"])
+    if stsd and len(stsd) >= 16:
+        stream["codec"] = stsd[12:16].decode("latin-1").strip()
+    if stream.get("type") != "video":
+        stream.pop("width", None)
+        stream.pop("height", None)
+    return stream
+
+def _moov(data, info):
+    tags = info["tags"]
+    for typ, s, e in _boxes(data):
+        body = data[s:e]
+        if typ == b"mvhd" and len(body) >= 20:
+            if body[0] == 1:
+                created, modified, scale, duration = struct.unpack_from(">QQIQ", body, 4)
+            else:
+                created, modified, scale, duration = struct.unpack_from(">IIII", body, 4)
+            info["created"] = _mac_time(created)
+            info["modified"] = _mac_time(modified)
+            if scale:
+                info["duration"] = round(duration / scale, 3)
+        elif typ == b"trak":
+            info["streams"].append(_trak(body))
+        elif typ == b"meta":
+            _meta_ilst(body, tags)
+        elif typ == b"udta":
+            for t, cs, ce in _boxes(body):
+                if t == b"meta":
+                    _meta_ilst(body[cs:ce], tags)
+                elif t[:1] == b"\xa9":
+                    tags[t.decode("latin-1")] = _qt_string(body[cs:ce])
+
+    # Apple mdta keys first, then classic udta atoms
+    pick = lambda *names: next((tags[n] for n in names if tags.get(n) not in (None, "")), None)
+    info["make"] = pick("com.apple.quicktime.make", "\xa9mak", "com.android.manufacturer")
+    info["model"] = pick("com.apple.quicktime.model", "\xa9mod", "com.android.model")
+    info["software"] = pick("com.apple.quicktime.software", "\xa9swr", "\xa9too")
+    info["author"] = pick("com.apple.quicktime.author", "\xa9aut", "\xa9ART")
+    info["title"] = pick("com.apple.quicktime.title", "\xa9nam")
+    info["taken"] = pick("com.apple.quicktime.creationdate", "\xa9day")
+    location = pick("com.apple.quicktime.location.ISO6709", "\xa9xyz")
+    if location:
+        info["location"] = parse_iso6709(location)
+
+def _iloc(body):
+    """item_ID -> (construction_method, offset, length) of the first extent"""
+    version = body[0]
+    sizes = struct.unpack_from(">H", body, 4)[0]
+    off_size, len_size = sizes >> 12, (sizes >> 8) & 0xF
+    base_size, index_size = (sizes >> 4) & 0xF, sizes & 0xF if version in (1, 2) else 0
+    pos = 6
+    if version < 2:
+        count = struct.unpack_from(">H", body, pos)[0]
+        pos += 2
+    else:
+        count = struct.unpack_from(">I", body, pos)[0]
+        pos += 4
+
+    def num(n):
+        nonlocal pos
+        v = int.from_bytes(body[pos:pos + n], "big") if n else 0
+        pos += n
+        return v
+
+    items = {}
+    for _ in range(count):
+        item = num(2 if version < 2 else 4)
+        method = num(2) & 0xF if version in (1, 2) else 0
+        num(2)                                  # data_reference_index
+        base = num(base_size)
+        extents = num(2)
+        first = None
+        for _ in range(extents):
+            num(index_size)
+            offset, length = num(off_size), num(len_size)
+            if first is None:
+                first = (method, base + offset, length)
+        if first:
+            items[item] = first
+    return items
+
+def _heif_meta(f, body, info):
+    # top-level meta of HEIF/AVIF stills: Exif is an item located via iinf + iloc
+    exif_ids, locations, idat = [], {}, b""
+    for typ, s, e in _boxes(body, 4):
+        child = body[s:e]
+        if typ == b"iinf":
+            start = 6 if child[0] == 0 else 8
+            for t, cs, ce in _boxes(child, start):
+                infe = child[cs:ce]
+                if t != b"infe" or infe[0] < 2:
+                    continue
+                fmt, n = (">H", 2) if infe[0] == 2 else (">I", 4)
+                item = struct.unpack_from(fmt, infe, 4)[0]
+                if infe[4 + n + 2:4 + n + 6] == b"Exif":
+                    exif_ids.append(item)
+        elif typ == b"iloc":
+            locations = _iloc(child)
+        elif typ == b"idat":
+            idat = child
+        elif typ == b"iprp":
+            ipco = _find(child, [b"ipco"]) or b""
+            for t, cs, ce in _boxes(ipco):
+                if t == b"ispe" and ce - cs >= 12:
+                    w, h = struct.unpack_from(">II", ipco, cs + 4)
+                    info["streams"].append({"type": "image", "width": w, "height": h})
+    for item in exif_ids:
+        method, offset, length = locations.get(item, (None, 0, 0))
+        if method is None or not length or length > MAX_EXIF:
+            continue
+        if method == 1:
+            data = idat[offset:offset + length]
+        else:
+            f.seek(offset)
+            data = f.read(length)
+        if len(data) > 4:
+            skip = struct.unpack_from(">I", data)[0]
+            _exif_into(info, parse_exif(data[4 + skip:]))
+        break
+    # keep only the largest ispe (the others are tiles / thumbnails)
+    images = [s for s in info["streams"] if s.get("type") == "image"]
+    if len(images) > 1:
+        best = max(images, key=lambda s: s["width"] * s["height"])
+        info["streams"] = [s for s in info["streams"] if s.get("type") != "image"] + [best]
+
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"heim", b"heis", b"mif1", b"msf1", b"avif", b"avis"}
+
+def probe_bmff(f, size):
+    info = _new("mp4")
+    found = False
+    for typ, s, e in _file_boxes(f, size):
+        if typ == b"ftyp":
+            f.seek(s)
+            brand = f.read(4)
+            info["tags"]["major_brand"] = brand.decode("latin-1")
+            if brand == b"qt  ":
+                info["container"] = "mov"
+            elif brand in HEIF_BRANDS:
+                info["container"] = "avif" if brand.startswith(b"avi") else "heif"
+        elif typ in (b"moov", b"meta") and e - s <= MAX_META:
+            f.seek(s)
+            body = f.read(e - s)
+            if typ == b"moov":
+                _moov(body, info)
+            else:
+                _heif_meta(f, body, info)
+            found = True
+    return info if found else None
+
+# ---------------------------
+# Matroska / WebM (EBML)
+# ---------------------------
+
+EBML_HEADER, DOCTYPE = 0x1A45DFA3, 0x4282
+SEGMENT, SEEKHEAD, SEEK, SEEK_ID, SEEK_POS = 0x18538067, 0x114D9B74, 0x4DBB, 0x53AB, 0x53AC
+INFO, TRACKS, TAGS, CLUSTER = 0x1549A966, 0x1654AE6B, 0x1254C367, 0x1F43B675
+
+def _vint(data, pos, keep_marker=False):
+    first = data[pos]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8 or pos + length > len(data):
+        raise ValueError("bad EBML vint")
+    value = first if keep_marker else first & (0xFF >> length)
+    for b in data[pos + 1:pos + length]:
+        value = (value << 8) | b
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+def _element_head(data, pos):
+    eid, n, _ = _vint(data, pos, keep_marker=True)
+    size, m, unknown = _vint(data, pos + n)
+    return eid, pos + n + m, None if unknown else size
+
+def _elements(data, start=0, end=None):
+    end = len(data) if end is None else end
+    pos = start
+    while pos < end:
+        eid, body, size = _element_head(data, pos)
+        stop = end if size is None else min(body + size, end)
+        yield eid, data[body:stop]
+        pos = stop
+
+def _uint(raw):
+    return int.from_bytes(raw, "big")
+
+def _float(raw):
+    if len(raw) == 4:
+        return struct.unpack(">f", raw)[0]
+    if len(raw) == 8:
+        return struct.unpack(">d", raw)[0]
+    return None
+
+def _mkv_info(body, info):
+    scale, duration = 1000000, None
+    for eid, raw in _elements(body):
+        if eid == 0x2AD7B1:
+            scale = _uint(raw)
+        elif eid == 0x4489:
+            duration = _float(raw)
+        elif eid == 0x4461 and len(raw) == 8:
+            info["created"] = _iso(EPOCH_2001 + timedelta(microseconds=struct.unpack(">q", raw)[0] // 1000))
+        elif eid == 0x7BA9:
+            info["title"] = _text(raw)
+        elif eid == 0x4D80:
+            info["tags"]["muxing_app"] = _text(raw)
+        elif eid == 0x5741:
+            info["software"] = _text(raw)
+    if duration is not None:
+        info["duration"] = round(duration * scale / 1e9, 3)
+
+def _mkv_tracks(body, info):
+    kinds = {1: "video", 2: "audio", 17: "subtitle"}
+    for eid, entry in _elements(body):
+        if eid != 0xAE:
+            continue
+        stream = {}
+        for cid, raw in _elements(entry):
+            if cid == 0x83:
+                stream["type"] = kinds.get(_uint(raw), str(_uint(raw)))
+            elif cid == 0x86:
+                stream["codec"] = _text(raw)
+            elif cid == 0xE0:
+                for vid, v in _elements(raw):
+                    if vid == 0xB0:
+                        stream["width"] = _uint(v)
+                    elif vid == 0xBA:
+                        stream["height"] = _uint(v)
+            elif cid == 0xE1:
+                for aid, v in _elements(raw):
+                    if aid == 0xB5:
+                        stream["sample_rate"] = _float(v)
+                    elif aid == 0x9F:
+                        stream["channels"] = _uint(v)
+        info["streams"].append(stream)
+
+def _mkv_tags(body, info):
+    def simple(raw):
+        name = value = None
+        for eid, v in _elements(raw):
+            if eid == 0x45A3:
+                name = _text(v)
+            elif eid == 0x4487:
+                value = _text(v)
+            elif eid == 0x67C8:
+                simple(v)
+        if name and value is not None:
+            info["tags"][name] = value
+
+    for eid, tag in _elements(body):
+        if eid == 0x7373:
+            for sid, raw in _elements(tag):
+                if sid == 0x67C8:
+                    simple(raw)
+    tags = info["tags"]
+    info["taken"] = info["taken"] or tags.get("DATE_RECORDED")
+    info["software"] = info["software"] or tags.get("ENCODER")
+    info["author"] = info["author"] or tags.get("ARTIST") or tags.get("DIRECTOR")
+    if tags.get("LOCATION") or tags.get("RECORDING_LOCATION"):
+        info["location"] = parse_iso6709(tags.get("LOCATION") or tags.get("RECORDING_LOCATION"))
+
+def _read_element(f, pos, end):
+    """(id, body_start, size) of the element at pos; size None if unknown"""
+    f.seek(pos)
+    head = f.read(16)
+    if not head:
+        return None
+    eid, body, size = _element_head(head, 0)
+    return eid, pos + body, size
+
+def probe_mkv(f, size):
+    head = _read_element(f, 0, size)
+    if not head or head[0] != EBML_HEADER or head[2] is None:
+        return None
+    f.seek(head[1])
+    for eid, raw in _elements(f.read(min(head[2], 4096))):
+        if eid == DOCTYPE:
+            doctype = _text(raw)
+            break
+    else:
+        doctype = "matroska"
+    info = _new(doctype)
+
+    seg = _read_element(f, head[1] + head[2], size)
+    if not seg or seg[0] != SEGMENT:
+        return info
+    seg_start = seg[1]
+    seg_end = size if seg[2] is None else min(seg_start + seg[2], size)
+
+    parsers = {INFO: _mkv_info, TRACKS: _mkv_tracks, TAGS: _mkv_tags}
+    done, later = set(), []
+    pos = seg_start
+    while pos < seg_end:
+        el = _read_element(f, pos, seg_end)
+        if el is None:
+            break
+        eid, body, length = el
+        if eid == CLUSTER or length is None:
+            # media starts here; the rest is reachable only through SeekHead
+            break
+        if eid in parsers and eid not in done and length <= MAX_META:
+            f.seek(body)
+            parsers[eid](f.read(length), info)
+            done.add(eid)
+        elif eid == SEEKHEAD and length <= MAX_META:
+            f.seek(body)
+            for sid, seek in _elements(f.read(length)):
+                if sid != SEEK:
+                    continue
+                target = offset = None
+                for cid, raw in _elements(seek):
+                    if cid == SEEK_ID:
+                        target = _uint(raw)
+                    elif cid == SEEK_POS:
+                        offset = _uint(raw)
+                if target in parsers and offset is not None:
+                    later.append((target, seg_start + offset))
+        pos = body + length
+    for eid, at in later:
+        if eid in done:
+            continue
+        el = _read_element(f, at, seg_end)
+        if el and el[0] == eid and el[2] is not None and el[2] <= MAX_META:
+            f.seek(el[1])
+            parsers[eid](f.read(el[2]), info)
+            done.add(eid)
+    return info
+
+# ---------------------------
+# RIFF / AVI
+# ---------------------------
+
+RIFF_INFO = {b"IART": "author", b"INAM": "title", b"ISFT": "software",
+             b"ICRD": "created", b"IMAK": "make", b"IMOD": "model"}
+
+def _chunks(data, start=0):
+    pos = start
+    while pos + 8 <= len(data):
+        cid, size = struct.unpack_from("<4sI", data, pos)
+        yield cid, data[pos + 8:pos + 8 + size]
+        pos += 8 + size + (size & 1)
+
+def _idit(raw):
+    text = _text(raw)
+    for fmt in ("%a %b %d %H:%M:%S %Y", "%Y:%m:%d %H:%M:%S", "%Y/%m/%d %H:%M:%S"):
+        try:
+            return datetime.strptime(text, fmt).isoformat()
+        except ValueError:
+            continue
+    return text or None
+
+def _hdrl(body, info):
+    for cid, raw in _chunks(body, 4):
+        if cid == b"avih" and len(raw) >= 40:
+            usec, _, _, _, frames, _, _, _, w, h = struct.unpack_from("<10I", raw)
+            info["duration"] = round(frames * usec / 1e6, 3)
+            info["tags"]["frame_size"] = f"{w}x{h}"
+        elif cid == b"LIST" and raw[:4] == b"strl":
+            for sid, s in _chunks(raw, 4):
+                if sid == b"strh" and len(s) >= 8:
+                    kind = {b"vids": "video", b"auds": "audio"}.get(s[:4], s[:4].decode("latin-1"))
+                    info["streams"].append({"type": kind, "codec": s[4:8].decode("latin-1").strip("\0 ")})
+        elif cid == b"IDIT":
+            info["taken"] = _idit(raw)
+
+def probe_riff(f, size):
+    info = _new("avi")
+    pos = 12
+    while pos + 12 <= size:
+        f.seek(pos)
+        cid, length, kind = struct.unpack("<4sI4s", f.read(12))
+        if cid == b"LIST" and kind in (b"hdrl", b"INFO") and length <= MAX_META:
+            f.seek(pos + 8)
+            body = f.read(length)
+            if kind == b"hdrl":
+                _hdrl(body, info)
+            else:
+                for tid, raw in _chunks(body, 4):
+                    info["tags"][tid.decode("latin-1")] = _text(raw)
+                    key = RIFF_INFO.get(tid)
+                    if key:
+                        info[key] = _text(raw)
+        elif cid == b"IDIT":
+            f.seek(pos + 8)
+            info["taken"] = _idit(f.read(min(length, 64)))
+        pos += 8 + length + (length & 1)
+    return info
+
+# ---------------------------
+# Entry point
+# ---------------------------
+
+def probe(path):
+    """container metadata dict, or None if the format isn't supported here"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(12)
+        try:
+            if head[4:8] == b"ftyp":
+                return probe_bmff(f, size)
+            if head[:4] == b"\x1a\x45\xdf\xa3":
+                return probe_mkv(f, size)
+            if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+                return probe_riff(f, size)
+        except (struct.error, ValueError, IndexError, OverflowError):
+            return None
+    return None
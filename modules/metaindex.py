@@ -0,0 +1,373 @@
+# Persistent metadata index for the metadata reader (SQLite)
+# files:  (path, size, mtime, inode) -> sha256, so unchanged files are skipped
+# meta:   sha256 -> normalized MetaRecord, one row per distinct content
+# labels: distinct devices / authors, so substring searches stay cheap
+#
+#   python3 modules/metaindex.py index /sdcard/DCIM -j 4 --prune
+#   python3 modules/metaindex.py query --camera "iPhone 12" --since 2021-01-01
+#   python3 modules/metaindex.py query --bbox 55.5,37.3,55.9,37.9 --format csv
+#   python3 modules/metaindex.py query --author alice
+#   python3 modules/metaindex.py stats
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+from collections import deque
+
+import exifread as reader
+from metarecord import MetaRecord, WRITERS, TIME_FIELDS, norm_time
+
+DEFAULT_DB = os.path.join(os.path.expanduser("~"), ".cache", "mikoshi", "metaindex.db")
+SCHEMA_VERSION = 1
+CHUNK_SIZE = 1024 * 1024
+BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER, mtime INTEGER, inode INTEGER,
+    sha256 TEXT, seen REAL
+);
+CREATE INDEX IF NOT EXISTS files_sha ON files(sha256);
+CREATE TABLE IF NOT EXISTS meta (
+    sha256 TEXT PRIMARY KEY,
+    format TEXT, time TEXT,
+    author TEXT COLLATE NOCASE, device TEXT COLLATE NOCASE, software TEXT,
+    lat REAL, lon REAL, alt REAL,
+    timestamps TEXT, raw TEXT, error TEXT, indexed REAL
+);
+CREATE INDEX IF NOT EXISTS meta_time ON meta(time);
+CREATE INDEX IF NOT EXISTS meta_device ON meta(device, time);
+CREATE INDEX IF NOT EXISTS meta_author ON meta(author, time);
+CREATE INDEX IF NOT EXISTS meta_geo ON meta(lat, lon);
+CREATE TABLE IF NOT EXISTS labels (
+    kind TEXT, value TEXT,
+    PRIMARY KEY (kind, value)
+) WITHOUT ROWID;
+"""
+
+def stat_key(st):
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def best_time(rec):
+    """timestamp used for the time column / --since / --until"""
+    for name in TIME_FIELDS:
+        if rec.timestamps.get(name):
+            return rec.timestamps[name]
+    return None
+
+def _contains(needle):
+    """LIKE pattern for a literal substring: % and _ in user text match themselves"""
+    escaped = needle.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return "%" + escaped + "%"
+
+def _bound(value, end=False):
+    """--since/--until value -> ISO string; a bare date in --until covers the whole day"""
+    iso = norm_time(value)
+    if iso is None:
+        raise ValueError(f"bad date: {value}")
+    if end and len(value.strip()) <= 10:
+        day = datetime.fromisoformat(iso) + timedelta(days=1)
+        return day.isoformat(), "<"
+    return iso, "<=" if end else ">="
+
+class MetaIndex:
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise RuntimeError(f"{path}: index schema v{version}, expected v{SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+        self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # ---- indexing ----
+
+    def lookup_file(self, path, st):
+        """sha256 if path is unchanged since it was indexed (and its record exists)"""
+        row = self.db.execute(
+            "SELECT f.size, f.mtime, f.inode, f.sha256 FROM files f "
+            "JOIN meta m ON m.sha256 = f.sha256 WHERE f.path = ?", (path,)
+        ).fetchone()
+        if not row or tuple(row[:3]) != stat_key(st):
+            return None
+        return row[3]
+
+    def has_content(self, sha256, retry_errors=False):
+        row = self.db.execute("SELECT error FROM meta WHERE sha256 = ?", (sha256,)).fetchone()
+        return row is not None and not (retry_errors and row[0])
+
+    def put_file(self, path, st, sha256, seen):
+        size, mtime, inode = stat_key(st)
+        self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                        (path, size, mtime, inode, sha256, seen))
+
+    def touch(self, path, seen):
+        self.db.execute("UPDATE files SET seen = ? WHERE path = ?", (seen, path))
+
+    def put_record(self, sha256, rec):
+        gps = tuple(rec.gps or ()) + (None,) * 3
+        self.db.execute(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (sha256, rec.format, best_time(rec), rec.author, rec.device, rec.software,
+             gps[0], gps[1], gps[2], json.dumps(rec.timestamps),
+             json.dumps(rec.raw, ensure_ascii=False, default=str), rec.error, time.time())
+        )
+        for kind, value in (("device", rec.device), ("author", rec.author)):
+            if value:
+                self.db.execute("INSERT OR IGNORE INTO labels VALUES (?, ?)", (kind, value))
+
+    def prune(self, roots, before):
+        """drop files under roots not seen in this run, then orphaned content"""
+        removed = 0
+        for root in roots:
+            root = os.path.abspath(root)
+            if os.path.isfile(root):
+                continue
+            prefix = root.rstrip(os.sep) + os.sep
+            # path range instead of LIKE: no escaping, uses the primary key
+            cur = self.db.execute(
+                "DELETE FROM files WHERE path >= ? AND path < ? AND seen < ?",
+                (prefix, prefix[:-1] + chr(ord(os.sep) + 1), before)
+            )
+            removed += cur.rowcount
+        self.db.execute("DELETE FROM meta WHERE sha256 NOT IN (SELECT sha256 FROM files)")
+        return removed
+
+    def update(self, roots, jobs=1, ffprobe_jobs=4, retry_errors=False, prune=False, progress=None):
+        """index files under roots; returns counters"""
+        stats = {"files": 0, "unchanged": 0, "duplicates": 0, "scanned": 0, "errors": 0, "removed": 0}
+        started = time.time()
+        queued = deque()
+        pending = {}        # sha256 -> [(path, stat)] waiting for their record
+
+        def to_scan():
+            # hashes and dedupes in the feeding thread; only new content reaches the parsers
+            for root in roots:
+                files = [root] if os.path.isfile(root) else reader.iter_files(root)
+                for path in files:
+                    path = os.path.abspath(path)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    stats["files"] += 1
+                    with self._lock:
+                        if self.lookup_file(path, st):
+                            self.touch(path, started)
+                            stats["unchanged"] += 1
+                            continue
+                    try:
+                        sha = sha256_file(path)
+                    except OSError:
+                        stats["errors"] += 1
+                        continue
+                    if sha in pending:
+                        pending[sha].append((path, st))
+                        stats["duplicates"] += 1
+                        continue
+                    with self._lock:
+                        if self.has_content(sha, retry_errors):
+                            self.put_file(path, st, sha, started)
+                            stats["duplicates"] += 1
+                            continue
+                    # the files row is written with the record, so an interrupted
+                    # run leaves nothing that looks indexed
+                    pending[sha] = [(path, st)]
+                    queued.append(sha)
+                    yield path
+
+        if jobs > 1:
+            records = reader.scan_files_parallel(to_scan(), jobs, ffprobe_jobs)
+        else:
+            records = (reader.capture_scan(path) for path in to_scan())
+
+        batch = 0
+        for rec in records:
+            sha = queued.popleft()
+            with self._lock:
+                self.put_record(sha, rec)
+                for path, st in pending.pop(sha):
+                    self.put_file(path, st, sha, started)
+            stats["scanned"] += 1
+            stats["errors"] += bool(rec.error)
+            batch += 1
+            if batch >= BATCH:
+                with self._lock:
+                    self.db.commit()
+                batch = 0
+                if progress:
+                    progress(stats)
+
+        with self._lock, self.db:
+            if prune:
+                stats["removed"] = self.prune(roots, started)
+            # sampled stats let the planner pick meta_geo/meta_device over meta_time
+            self.db.execute("PRAGMA analysis_limit = 1000")
+            self.db.execute("ANALYZE")
+        return stats
+
+    # ---- queries ----
+
+    def labels(self, kind, needle):
+        """distinct devices/authors containing needle (case-insensitive)"""
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT value FROM labels WHERE kind = ? AND value LIKE ? ESCAPE '\\'",
+                (kind, _contains(needle))
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def query(self, camera=None, author=None, bbox=None, since=None, until=None,
+              fmt=None, limit=None):
+        """MetaRecords (one per path) matching every given filter"""
+        where, args = [], []
+        for column, needle in (("device", camera), ("author", author)):
+            if needle is None:
+                continue
+            # exact matches on the indexed column, not a LIKE scan over meta; a
+            # subquery instead of bound values, any number of labels may match
+            where.append(f"m.{column} IN (SELECT value FROM labels "
+                         f"WHERE kind = ? AND value LIKE ? ESCAPE '\\')")
+            args += [column, _contains(needle)]
+        if bbox:
+            lat1, lon1, lat2, lon2 = bbox
+            where.append("m.lat BETWEEN ? AND ? AND m.lon BETWEEN ? AND ?")
+            args += [min(lat1, lat2), max(lat1, lat2), min(lon1, lon2), max(lon1, lon2)]
+        if since:
+            value, op = _bound(since)
+            where.append(f"m.time {op} ?")
+            args.append(value)
+        if until:
+            value, op = _bound(until, end=True)
+            where.append(f"m.time {op} ?")
+            args.append(value)
+        if fmt:
+            where.append("m.format = ?")
+            args.append(fmt)
+
+        # every filter is on meta: CROSS JOIN keeps it as the outer loop
+        sql = ("SELECT f.path, m.format, m.author, m.device, m.software, m.lat, m.lon, m.alt, "
+               "m.timestamps, m.raw, m.error FROM meta m CROSS JOIN files f ON f.sha256 = m.sha256")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY m.time"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        with self._lock:
+            rows = self.db.execute(sql, args).fetchall()
+        for path, format, author, device, software, lat, lon, alt, stamps, raw, error in rows:
+            rec = MetaRecord(path, format, error)
+            rec.author, rec.device, rec.software = author, device, software
+            if lat is not None and lon is not None:
+                rec.gps = (lat, lon) if alt is None else (lat, lon, alt)
+            rec.timestamps = json.loads(stamps or "{}")
+            rec.raw = json.loads(raw or "{}")
+            yield rec
+
+    def stats(self):
+        with self._lock:
+            one = lambda sql: self.db.execute(sql).fetchone()[0]
+            return {
+                "files": one("SELECT COUNT(*) FROM files"),
+                "contents": one("SELECT COUNT(*) FROM meta"),
+                "with_gps": one("SELECT COUNT(*) FROM meta WHERE lat IS NOT NULL"),
+                "devices": one("SELECT COUNT(*) FROM labels WHERE kind = 'device'"),
+                "authors": one("SELECT COUNT(*) FROM labels WHERE kind = 'author'"),
+                "errors": one("SELECT COUNT(*) FROM meta WHERE error IS NOT NULL"),
+                "first": one("SELECT MIN(time) FROM meta"),
+                "last": one("SELECT MAX(time) FROM meta"),
+            }
+
+    def close(self):
+        with self._lock:
+            self.db.commit()
+            self.db.close()
+
+# ---------------------------
+# CLI
+# ---------------------------
+
+def parse_bbox(text):
+    parts = [float(x) for x in text.split(",")]
+    if len(parts) != 4:
+        raise argparse.ArgumentTypeError("bbox is LAT1,LON1,LAT2,LON2")
+    return parts
+
+def main():
+    parser = argparse.ArgumentParser(description="Metadata index for the metadata reader")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"index database (default: {DEFAULT_DB})")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("index", help="add or refresh files and folders")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("-j", "--jobs", type=int, default=1)
+    p.add_argument("--ffprobe-jobs", type=int, default=4)
+    p.add_argument("--prune", action="store_true", help="forget files that disappeared")
+    p.add_argument("--retry-errors", action="store_true",
+                   help="re-parse content that failed before (e.g. after installing a library)")
+
+    q = sub.add_parser("query", help="search the index")
+    q.add_argument("--camera", help="device make/model substring")
+    q.add_argument("--author", help="author substring")
+    q.add_argument("--bbox", type=parse_bbox, metavar="LAT1,LON1,LAT2,LON2")
+    q.add_argument("--since", help="earliest time (YYYY-MM-DD or ISO 8601)")
+    q.add_argument("--until", help="latest time (YYYY-MM-DD or ISO 8601)")
+    q.add_argument("--type", dest="fmt", help="file type (jpg, pdf, mp4, ...)")
+    q.add_argument("--limit", type=int)
+    q.add_argument("--format", choices=sorted(WRITERS), default="text")
+
+    sub.add_parser("stats", help="index summary")
+    args = parser.parse_args()
+
+    index = MetaIndex(args.db)
+    try:
+        if args.cmd == "index":
+            start = time.perf_counter()
+            progress = lambda s: print(f"[*] {s['files']} files, {s['scanned']} parsed", file=sys.stderr)
+            stats = index.update(args.paths, max(1, args.jobs), max(1, args.ffprobe_jobs),
+                                 args.retry_errors, args.prune, progress)
+            stats["elapsed"] = round(time.perf_counter() - start, 3)
+            print(json.dumps(stats))
+        elif args.cmd == "query":
+            writer = WRITERS[args.format](sys.stdout)
+            start = time.perf_counter()
+            count = 0
+            try:
+                for rec in index.query(args.camera, args.author, args.bbox, args.since,
+                                       args.until, args.fmt, args.limit):
+                    writer.write(rec)
+                    count += 1
+            except ValueError as e:
+                parser.error(str(e))
+            writer.close()
+            print(f"[*] {count} files in {(time.perf_counter() - start) * 1000:.1f} ms",
+                  file=sys.stderr)
+        else:
+            print(json.dumps(index.stats(), indent=2))
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    main()
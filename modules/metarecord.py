@@ -0,0 +1,253 @@
+# Normalized metadata record for the metadata reader (exifread.py)
+# Every scan_* returns a MetaRecord; the exporters below stream them as
+# text, JSONL or CSV so large dumps never have to be re-parsed.
+
+import re
+import csv
+import json
+from datetime import datetime, date
+
+# canonical timestamp names (also CSV columns)
+TIME_FIELDS = ("taken", "created", "modified", "digitized", "printed")
+
+class MetaRecord:
+    __slots__ = ("path", "format", "timestamps", "author", "device",
+                 "gps", "software", "raw", "error")
+
+    def __init__(self, path, format=None, error=None):
+        self.path = path
+        self.format = format
+        self.timestamps = {}
+        self.author = None
+        self.device = None
+        self.gps = None         # (lat, lon) or (lat, lon, alt), decimal degrees
+        self.software = None
+        self.raw = {}
+        self.error = error
+
+    def set_time(self, name, value):
+        value = norm_time(value)
+        if value and name not in self.timestamps:
+            self.timestamps[name] = value
+
+    def set_gps(self, lat, lon, alt=None):
+        if lat is None or lon is None:
+            return
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return
+        self.gps = (round(lat, 7), round(lon, 7)) if alt is None else \
+                   (round(lat, 7), round(lon, 7), round(alt, 2))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"MetaRecord({self.path!r}, {self.format!r})"
+
+# ---------------------------
+# Normalization helpers
+# ---------------------------
+
+_TIME_FORMATS = (
+    "%Y:%m:%d %H:%M:%S",        # EXIF
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M",
+    "%Y-%m-%d",
+    "%Y",
+)
+_PDF_TIME = re.compile(r"D:(\d{4})(\d{2})?(\d{2})?(\d{2})?(\d{2})?(\d{2})?([Zz+\-].*)?")
+_FRACTION = re.compile(r"\.\d+")
+
+def norm_time(value):
+    """ISO 8601 string from EXIF/PDF/ISO/datetime values, None if unparsable"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (tuple, list)) and len(value) == 6:
+        try:
+            return datetime(*value).isoformat()
+        except ValueError:
+            return None
+    text = str(value).strip().strip("\0")
+    if not text or text.startswith("0000"):
+        return None
+
+    m = _PDF_TIME.match(text)
+    if m:
+        parts = [int(p) if p else d for p, d in zip(m.groups()[:6], (0, 1, 1, 0, 0, 0))]
+        try:
+            out = datetime(*parts).isoformat()
+        except ValueError:
+            return None
+        tz = (m.group(7) or "").replace("'", "")
+        if tz[:1] in "Zz" and tz:
+            return out + "Z"
+        if len(tz) >= 5:
+            return f"{out}{tz[:3]}:{tz[3:5]}"
+        return out
+
+    suffix = ""
+    if text.endswith(("Z", "z")):
+        text, suffix = text[:-1], "Z"
+    else:
+        m = re.search(r"([+\-]\d{2}:?\d{2})$", text)
+        if m and len(text) > 10:
+            text, suffix = text[:m.start()], m.group(1)
+            if ":" not in suffix:
+                suffix = suffix[:3] + ":" + suffix[3:]
+    text = _FRACTION.sub("", text)
+    for fmt in _TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).isoformat() + suffix
+        except ValueError:
+            continue
+    return None
+
+def ratio(value):
+    """float from exifread Ratio, Pillow IFDRational, (num, den) or number"""
+    if isinstance(value, (tuple, list)) and len(value) == 2:
+        num, den = value
+        return num / den if den else 0.0
+    num, den = getattr(value, "num", None), getattr(value, "den", None)
+    if num is not None:
+        return num / den if den else 0.0
+    return float(value)
+
+def dms_to_deg(values, ref=None):
+    """EXIF degrees/minutes/seconds triple -> signed decimal degrees"""
+    try:
+        parts = [ratio(v) for v in values]
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    if not parts:
+        return None
+    parts += [0.0] * (3 - len(parts))
+    deg = parts[0] + parts[1] / 60 + parts[2] / 3600
+    if str(ref or "").strip().upper()[:1] in ("S", "W"):
+        deg = -deg
+    return deg
+
+_ISO6709 = re.compile(r"([+\-]\d+(?:\.\d+)?)([+\-]\d+(?:\.\d+)?)([+\-]\d+(?:\.\d+)?)?")
+
+def parse_iso6709(text):
+    """'+37.3349-122.0090+010.000/' (QuickTime ©xyz / location tags)"""
+    m = _ISO6709.match(str(text or "").strip())
+    if not m:
+        return None
+    lat, lon, alt = m.groups()
+    return float(lat), float(lon), float(alt) if alt else None
+
+def join_device(make, model):
+    make = str(make or "").strip().strip("\0")
+    model = str(model or "").strip().strip("\0")
+    if make and model.lower().startswith(make.lower()):
+        return model
+    return " ".join(p for p in (make, model) if p) or None
+
+def plain(value, limit=256):
+    """JSON-safe raw value; long binary blobs are summarized"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        text = bytes(value[:limit + 1]).rstrip(b"\0").decode("utf-8", "replace")
+        if len(value) > limit or not text.isprintable():
+            return f"<{len(value)} bytes>"
+        return text
+    if isinstance(value, dict):
+        return {str(k): plain(v, limit) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(v, limit) for v in value]
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+# ---------------------------
+# Exporters
+# ---------------------------
+
+def print_record(rec, out=None):
+    """human-readable text, as the reader printed before"""
+    lines = []
+    if rec.error:
+        lines.append(f"[!] {rec.error}")
+    fields = (("Format", rec.format), ("Author", rec.author),
+              ("Device", rec.device), ("Software", rec.software))
+    for label, value in fields:
+        if value:
+            lines.append(f"{label}: {value}")
+    for name, value in rec.timestamps.items():
+        lines.append(f"{name.capitalize()}: {value}")
+    if rec.gps:
+        lines.append("GPS: " + ", ".join(str(v) for v in rec.gps))
+    for key, value in rec.raw.items():
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            lines.append(f"{key}:")
+            lines += ["  " + " | ".join(str(v) for v in item.values()) for item in value]
+        elif isinstance(value, (dict, list)):
+            lines.append(f"{key}: {json.dumps(value, ensure_ascii=False)}")
+        else:
+            lines.append(f"{key}: {value}")
+    if not lines:
+        lines.append("[+] No metadata found")
+    print("\n".join(lines), file=out)
+
+class JsonlWriter:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, rec):
+        self.emit(rec.to_dict())
+
+    def emit(self, obj):
+        # flushed per record: an interrupted dump still ends on a whole line
+        self.out.write(json.dumps(obj, ensure_ascii=False, default=str) + "\n")
+        self.out.flush()
+
+    def close(self):
+        pass
+
+CSV_FIELDS = ("path", "format", "author", "device", "software",
+              "lat", "lon", "alt") + TIME_FIELDS + ("error", "raw")
+
+class CsvWriter:
+    """one row per file; raw tags go into a JSON column"""
+    fields = CSV_FIELDS
+
+    def __init__(self, out):
+        self.out = out
+        self.writer = csv.DictWriter(out, fieldnames=self.fields, extrasaction="ignore")
+        self.writer.writeheader()
+
+    def write(self, rec):
+        gps = tuple(rec.gps or ()) + (None,) * 3
+        row = {"path": rec.path, "format": rec.format, "author": rec.author,
+               "device": rec.device, "software": rec.software,
+               "lat": gps[0], "lon": gps[1], "alt": gps[2],
+               "error": rec.error,
+               "raw": json.dumps(rec.raw, ensure_ascii=False, default=str) if rec.raw else ""}
+        row.update(rec.timestamps)
+        self.emit(row)
+
+    def emit(self, row):
+        self.writer.writerow(row)
+        self.out.flush()
+
+    def close(self):
+        pass
+
+class TextWriter:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, rec):
+        print(f"\n--- Scanning: {rec.path} ---", file=self.out)
+        print_record(rec, self.out)
+
+    def close(self):
+        pass
+
+WRITERS = {"text": TextWriter, "jsonl": JsonlWriter, "csv": CsvWriter}
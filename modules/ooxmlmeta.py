@@ -0,0 +1,105 @@
+# Header-only metadata for Office Open XML (docx / xlsx / pptx)
+# Reads docProps/core.xml, docProps/app.xml and the workbook part straight
+# from the zip with iterparse - cell data and slide contents are never
+# loaded, so a 50 MB workbook costs the same as a 10 KB one.
+
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+
+CORE = "docProps/core.xml"
+APP = "docProps/app.xml"
+ROOT_RELS = "_rels/.rels"
+OFFICE_DOCUMENT = "/officeDocument"
+# usual main parts, for packages written without _rels/.rels
+MAIN_PARTS = ("word/document.xml", "xl/workbook.xml", "ppt/presentation.xml")
+
+# core.xml local name -> key
+CORE_FIELDS = {
+    "creator": "author",
+    "lastModifiedBy": "last_modified_by",
+    "created": "created",
+    "modified": "modified",
+    "lastPrinted": "last_printed",
+    "title": "title",
+    "subject": "subject",
+    "keywords": "keywords",
+    "description": "description",
+    "revision": "revision",
+    "category": "category",
+}
+
+# app.xml local name -> key
+APP_FIELDS = {
+    "Application": "application",
+    "AppVersion": "app_version",
+    "Company": "company",
+    "Manager": "manager",
+    "Template": "template",
+    "TotalTime": "total_time",
+    "Pages": "pages",
+    "Words": "words",
+    "Characters": "characters",
+    "Slides": "slides",
+    "Notes": "notes",
+    "HiddenSlides": "hidden_slides",
+}
+
+COUNTS = ("pages", "words", "characters", "slides", "notes", "hidden_slides", "total_time")
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+def _iter_elements(z, name):
+    """(local name, element) for every closed element of a zip member"""
+    try:
+        f = z.open(name)
+    except KeyError:
+        return
+    with f:
+        for _, elem in ET.iterparse(f, events=("end",)):
+            yield _local(elem.tag), elem
+            elem.clear()
+
+def _read_fields(z, name, fields):
+    out = {}
+    for tag, elem in _iter_elements(z, name):
+        key = fields.get(tag)
+        if key and elem.text and elem.text.strip():
+            out[key] = elem.text.strip()
+    return out
+
+def _main_part(z, names):
+    for tag, elem in _iter_elements(z, ROOT_RELS):
+        if tag == "Relationship" and elem.get("Type", "").endswith(OFFICE_DOCUMENT):
+            return elem.get("Target", "").lstrip("/")
+    for part in MAIN_PARTS:
+        if part in names:
+            return part
+    return None
+
+def _sheet_names(z, part):
+    return [elem.get("name") for tag, elem in _iter_elements(z, part) if tag == "sheet"]
+
+def read_props(path):
+    """author, dates, application, sheet/slide counts; raises zipfile.BadZipFile"""
+    with zipfile.ZipFile(path) as z:
+        props = _read_fields(z, CORE, CORE_FIELDS)
+        props.update(_read_fields(z, APP, APP_FIELDS))
+        for key in COUNTS:
+            if key in props:
+                try:
+                    props[key] = int(props[key])
+                except ValueError:
+                    pass
+
+        names = set(z.namelist())
+        main = _main_part(z, names) or ""
+        if posixpath.basename(main).startswith("workbook"):
+            props["sheets"] = _sheet_names(z, main)
+        elif main.startswith("ppt/") and "slides" not in props:
+            # app.xml is optional; the slide parts are listed in the central directory
+            props["slides"] = sum(1 for n in names
+                                  if n.startswith("ppt/slides/slide") and n.endswith(".xml"))
+        props["part"] = main or None
+    return props
@@ -0,0 +1,53 @@
+# Thread-safe token bucket shared by the API clients
+
+import time
+import threading
+
+class TokenBucket:
+    """`rate` tokens every `per` seconds, at most `burst` saved up."""
+
+    def __init__(self, rate, per=1.0, burst=None):
+        self.capacity = float(burst if burst is not None else rate)
+        self.fill = rate / per
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill)
+        self.updated = now
+
+    def delay(self):
+        """Seconds until a token is available (0 if one is ready now)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self.blocked_until - now)
+            if self.tokens < 1:
+                wait = max(wait, (1 - self.tokens) / self.fill)
+            return wait
+
+    def acquire(self, timeout=None):
+        """Take one token, sleeping as needed. False if timeout runs out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.fill, 0.01)
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                wait = min(wait, left)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Server said slow down: hold every caller for `seconds` and empty the bucket."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
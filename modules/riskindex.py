@@ -0,0 +1,134 @@
+# In-memory risk index for FindTheMole --watch, queryable over a Unix socket
+#
+#   FindTheMole --query "top 20"
+#   FindTheMole --query "get /sdcard/Download/x.apk"
+#   FindTheMole --query "risk HIGH"
+#   FindTheMole --query "stats"
+
+import os
+import json
+import errno
+import time
+import socket
+import threading
+import socketserver
+
+DEFAULT_SOCKET = os.path.join(os.path.expanduser("~"), ".cache", "mikoshi", "findthemole.sock")
+
+class RiskIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = {}
+        self.updates = 0
+        self.started = time.time()
+
+    def update(self, result, score, risk):
+        entry = {
+            "path": result["path"],
+            "score": score,
+            "risk": risk,
+            "sha256": result["hashes"].get("sha256"),
+            "findings": [list(x) for x in result["findings"]],
+            "scanned": time.time(),
+        }
+        with self._lock:
+            self.entries[result["path"]] = entry
+            self.updates += 1
+
+    def remove(self, path):
+        """drop path, or every entry under it when a folder was deleted/moved"""
+        prefix = path + os.sep
+        with self._lock:
+            for p in [p for p in self.entries if p == path or p.startswith(prefix)]:
+                del self.entries[p]
+
+    def top(self, n=10):
+        with self._lock:
+            rows = sorted(self.entries.values(), key=lambda e: e["score"], reverse=True)
+        return rows[:n]
+
+    def get(self, path):
+        with self._lock:
+            return self.entries.get(path)
+
+    def by_risk(self, level):
+        with self._lock:
+            return [e for e in self.entries.values() if e["risk"] == level.upper()]
+
+    def stats(self):
+        with self._lock:
+            risk = {"LOW": 0, "MEDIUM": 0, "HIGH": 0}
+            for e in self.entries.values():
+                risk[e["risk"]] += 1
+            return {"files": len(self.entries), "updates": self.updates,
+                    "risk": risk, "since": self.started}
+
+    def query(self, line):
+        cmd, _, arg = line.strip().partition(" ")
+        arg = arg.strip()
+        if cmd == "top":
+            return self.top(int(arg) if arg else 10)
+        if cmd == "get":
+            return self.get(arg)
+        if cmd == "risk":
+            return self.by_risk(arg or "HIGH")
+        if cmd == "stats":
+            return self.stats()
+        return {"error": f"unknown command: {cmd} (top [N] | get PATH | risk LEVEL | stats)"}
+
+# ---------------------------
+# Socket server / client
+# ---------------------------
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.decode("utf-8", "replace").strip()
+            if not line:
+                break
+            try:
+                reply = self.server.index.query(line)
+            except Exception as e:
+                reply = {"error": str(e)}
+            self.wfile.write(json.dumps(reply, ensure_ascii=False).encode() + b"\n")
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(index, path=DEFAULT_SOCKET):
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    if os.path.exists(path):
+        # only a stale socket may be replaced, never a live instance's
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.connect(path)
+        except OSError:
+            os.unlink(path)
+        else:
+            raise OSError(errno.EADDRINUSE, "another --watch instance is serving", path)
+    server = _Server(path, _Handler)
+    server.index = index
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def stop(server):
+    server.shutdown()
+    server.server_close()
+    try:
+        os.unlink(server.server_address)
+    except OSError:
+        pass
+
+def query(line, path=DEFAULT_SOCKET):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(path)
+        s.sendall(line.encode() + b"\n\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
@@ -0,0 +1,129 @@
+# Persistent scan cache for FindTheMole (SQLite)
+# files:   (path, size, mtime, inode) -> sha256 + path-dependent findings
+# content: sha256 -> hashes, size, kind and content findings, valid for one
+#          detector/rules signature
+# vt:      sha256 -> VirusTotal stats with a TTL
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+DEFAULT_DB = os.path.join(os.path.expanduser("~"), ".cache", "mikoshi", "findthemole.db")
+VT_TTL = 7 * 24 * 3600
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER, mtime INTEGER, inode INTEGER,
+    sha256 TEXT, findings TEXT, sig TEXT
+);
+CREATE TABLE IF NOT EXISTS content (
+    sha256 TEXT PRIMARY KEY,
+    hashes TEXT, size INTEGER, kind TEXT,
+    findings TEXT, sig TEXT, scanned REAL
+);
+CREATE TABLE IF NOT EXISTS vt (
+    sha256 TEXT PRIMARY KEY,
+    stats TEXT, checked REAL
+);
+"""
+
+def stat_key(st):
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+def _findings(raw):
+    return [tuple(x) for x in json.loads(raw)]
+
+class ScanCache:
+    def __init__(self, path=DEFAULT_DB, vt_ttl=VT_TTL, refresh_vt=False):
+        self.path = path
+        self.vt_ttl = vt_ttl
+        self.refresh_vt = refresh_vt
+        self._lock = threading.Lock()
+
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # the cache is disposable: rebuild instead of migrating
+            with self.db:
+                self.db.executescript(
+                    "DROP TABLE IF EXISTS files;"
+                    "DROP TABLE IF EXISTS content;"
+                    "DROP TABLE IF EXISTS vt;"
+                )
+                self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+
+    # ---- path level ----
+
+    def lookup_file(self, path, st, sig):
+        """(sha256, path_findings) if path is unchanged since the last scan."""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT size, mtime, inode, sha256, findings, sig FROM files WHERE path = ?",
+                (path,)
+            ).fetchone()
+        if not row or tuple(row[:3]) != stat_key(st) or row[5] != sig:
+            return None
+        return row[3], _findings(row[4])
+
+    def put_file(self, path, st, sha256, findings, sig):
+        size, mtime, inode = stat_key(st)
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime, inode, sha256, json.dumps(findings), sig)
+            )
+
+    # ---- content level ----
+
+    def get_content(self, sha256, sig):
+        """(hashes, size, kind, findings) or None."""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT hashes, size, kind, findings FROM content WHERE sha256 = ? AND sig = ?",
+                (sha256, sig)
+            ).fetchone()
+        if not row:
+            return None
+        return json.loads(row[0]), row[1], row[2], _findings(row[3])
+
+    def put_content(self, hashes, size, kind, findings, sig):
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO content VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (hashes["sha256"], json.dumps(hashes), size, kind,
+                 json.dumps(findings), sig, time.time())
+            )
+
+    # ---- VirusTotal ----
+
+    def get_vt(self, sha256):
+        """(True, stats) on a fresh hit, (False, None) otherwise."""
+        if self.refresh_vt:
+            return False, None
+        with self._lock:
+            row = self.db.execute(
+                "SELECT stats, checked FROM vt WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+        if not row or time.time() - row[1] > self.vt_ttl:
+            return False, None
+        return True, json.loads(row[0])
+
+    def put_vt(self, sha256, stats):
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO vt VALUES (?, ?, ?)",
+                (sha256, json.dumps(stats), time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self.db.close()
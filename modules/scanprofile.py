@@ -0,0 +1,59 @@
+# Per-check profiling for FindTheMole (--profile)
+# Aggregates the timings / bytes / swallowed exceptions carried by each scan
+# result, so it works the same with worker processes.
+
+import sys
+from collections import defaultdict
+
+class _Stat:
+    __slots__ = ("calls", "time", "max", "bytes", "errors")
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.errors = 0
+
+    def add(self, t, nbytes=0, errors=0):
+        self.calls += 1
+        self.time += t
+        self.max = max(self.max, t)
+        self.bytes += nbytes
+        self.errors += errors
+
+class Profiler:
+    def __init__(self):
+        self.checks = defaultdict(_Stat)
+        self.kinds = defaultdict(_Stat)
+        self.last_errors = {}
+
+    def add(self, result):
+        nbytes = result.get("bytes", {})
+        swallowed = result.get("swallowed", {})
+        total = 0.0
+        for name, t in result["timings"].items():
+            self.checks[name].add(t, nbytes.get(name, 0), swallowed.get(name, 0))
+            total += t
+        for name, msg in result.get("errors", {}).items():
+            self.last_errors[name] = msg
+        kind = result.get("kind") or "unknown"
+        self.kinds[kind].add(total, result.get("size") or 0, sum(swallowed.values()))
+
+    def _table(self, title, stats, top, out):
+        rows = sorted(stats.items(), key=lambda x: x[1].time, reverse=True)[:top]
+        print(f"\n{title:<22} {'calls':>8} {'total s':>10} {'avg ms':>9} "
+              f"{'max ms':>9} {'MB':>9} {'errors':>7}", file=out)
+        for name, s in rows:
+            avg = s.time / s.calls * 1000 if s.calls else 0.0
+            print(f"{name:<22} {s.calls:>8} {s.time:>10.3f} {avg:>9.2f} "
+                  f"{s.max * 1000:>9.2f} {s.bytes / 1e6:>9.2f} {s.errors:>7}", file=out)
+
+    def report(self, top=10, out=None):
+        out = out or sys.stderr
+        self._table("check", self.checks, top, out)
+        self._table("file type", self.kinds, top, out)
+        if self.last_errors:
+            print("\nlast swallowed exception per check:", file=out)
+            for name, msg in sorted(self.last_errors.items()):
+                print(f"  {name}: {msg}", file=out)
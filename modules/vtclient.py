@@ -0,0 +1,142 @@
+# VirusTotal v3 client for FindTheMole
+# Pooled session, token-bucket rate limiting (free tier: 4 req/min),
+# 429/5xx backoff and de-duplication of lookups by sha256.
+# VT_API_URL points the client at another server (e.g. a local stub).
+
+import os
+import time
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+from ratelimit import TokenBucket
+
+VT_URL = "https://www.virustotal.com/api/v3"
+VT_RATE = 4          # requests per minute on the public API
+MAX_RETRIES = 4
+BACKOFF = 15.0       # seconds, doubled per retry without Retry-After
+MAX_SEEN = 4096      # finished lookups kept for de-duplication (LRU)
+
+class VTClient:
+    def __init__(self, api_key, base_url=None, rate=None, timeout=15,
+                 max_wait=None, max_retries=MAX_RETRIES, pool_size=8):
+        if requests is None:
+            raise RuntimeError("requests not installed")
+        self.api_key = api_key
+        self.base_url = (base_url or os.getenv("VT_API_URL") or VT_URL).rstrip("/")
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+
+        rate = rate or float(os.getenv("VT_RATE", VT_RATE))
+        self.bucket = TokenBucket(rate, per=60.0)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["x-apikey"] = api_key
+
+        self._lock = threading.Lock()
+        # sha256 -> Future; in-flight lookups plus the MAX_SEEN most recent
+        # answers, so --watch runs don't grow it forever
+        self._seen = OrderedDict()
+        self.stats = Counter()
+
+    # ---------------------------
+    # Public API
+    # ---------------------------
+
+    def lookup(self, sha256):
+        """last_analysis_stats dict, {} if VT doesn't know the file, None if dropped."""
+        with self._lock:
+            fut = self._seen.get(sha256)
+            owner = fut is None
+            if owner:
+                fut = self._seen[sha256] = Future()
+            else:
+                self._seen.move_to_end(sha256)
+                self.stats["deduplicated"] += 1
+
+        if not owner:
+            return fut.result()
+
+        try:
+            result = self._fetch(sha256)
+        except Exception:
+            self._count("errors")
+            result = None
+        if result is None:
+            self._count("dropped")
+            with self._lock:
+                # let a later caller retry instead of pinning the failure
+                self._seen.pop(sha256, None)
+        else:
+            self._count("served")
+            with self._lock:
+                self._trim()
+        fut.set_result(result)
+        return result
+
+    def summary(self):
+        s = self.stats
+        return (f"served {s['served']}, queued {s['queued']}, "
+                f"deduplicated {s['deduplicated']}, dropped {s['dropped']}, "
+                f"rate-limited {s['rate_limited']}")
+
+    def close(self):
+        self.session.close()
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+
+    def _trim(self):
+        # oldest answers first; lookups still in flight stay, their waiters need them
+        extra = len(self._seen) - MAX_SEEN
+        if extra <= 0:
+            return
+        for sha256 in [k for k, fut in self._seen.items() if fut.done()][:extra]:
+            del self._seen[sha256]
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _fetch(self, sha256):
+        url = f"{self.base_url}/files/{sha256}"
+
+        for attempt in range(self.max_retries + 1):
+            if self.bucket.delay() > 0:
+                self._count("queued")
+            if not self.bucket.acquire(self.max_wait):
+                return None
+
+            r = self.session.get(url, timeout=self.timeout)
+
+            if r.status_code == 200:
+                return r.json()["data"]["attributes"]["last_analysis_stats"]
+            if r.status_code == 404:
+                return {}
+            if r.status_code == 429 or r.status_code >= 500:
+                if r.status_code == 429:
+                    self._count("rate_limited")
+                self.bucket.pause(self._retry_after(r, attempt))
+                continue
+            # 401/403 and friends won't get better by retrying
+            return None
+
+        return None
+
+    @staticmethod
+    def _retry_after(r, attempt):
+        try:
+            return float(r.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return BACKOFF * (2 ** attempt)
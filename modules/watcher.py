@@ -0,0 +1,227 @@
+# Folder watching for FindTheMole --watch
+# inotify through ctypes on Linux/Android, stat polling everywhere else.
+# Both watchers return (path, deleted) events; a deleted path may be a
+# folder, meaning everything under it. Debouncer decides when a file has
+# stopped changing and is safe to scan.
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+              IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+_EVENT = struct.Struct("iIII")
+
+def _walk_dirs(root):
+    yield root
+    for base, dirs, _ in os.walk(root):
+        for d in dirs:
+            yield os.path.join(base, d)
+
+# ---------------------------
+# inotify
+# ---------------------------
+
+class InotifyWatcher:
+    def __init__(self, roots):
+        name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(name, use_errno=True)
+        self._libc.inotify_init1.argtypes = [ctypes.c_int]
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.wds = {}
+        self.overflowed = False
+        for root in roots:
+            for d in _walk_dirs(root):
+                self._add(d)
+
+    def _add(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOSPC, errno.EMFILE):
+                raise OSError(err, "inotify watch limit reached")
+            return
+        self.wds[wd] = path
+
+    def _drop(self, path):
+        # folder deleted or moved away: forget its watches, the kernel keeps
+        # reporting a moved folder under the old path otherwise
+        prefix = path + os.sep
+        for wd, p in list(self.wds.items()):
+            if p == path or p.startswith(prefix):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self.wds[wd]
+
+    def poll(self, timeout):
+        events = []
+        r, _, _ = select.select([self.fd], [], [], timeout)
+        if not r:
+            return events
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return events
+
+        pos = 0
+        while pos + _EVENT.size <= len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, pos)
+            name = buf[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0")
+            pos += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # kernel dropped events; the caller has to rescan
+                self.overflowed = True
+                continue
+            base = self.wds.get(wd)
+            if base is None:
+                continue
+            if mask & IN_IGNORED:
+                self.wds.pop(wd, None)
+                continue
+            path = os.path.join(base, os.fsdecode(name)) if name else base
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # new folder: watch it and pick up files that landed before the watch
+                    for d in _walk_dirs(path):
+                        try:
+                            self._add(d)
+                            names = os.listdir(d)
+                        except OSError as e:
+                            if e.errno in (errno.ENOSPC, errno.EMFILE):
+                                # out of watches: the caller's rescan still finds the files
+                                self.overflowed = True
+                                break
+                            # already gone again
+                            continue
+                        for n in names:
+                            p = os.path.join(d, n)
+                            if os.path.isfile(p):
+                                events.append((p, False))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    # whole folder gone; a rename comes back as IN_MOVED_TO above
+                    self._drop(path)
+                    events.append((path, True))
+                continue
+            deleted = bool(mask & (IN_DELETE | IN_MOVED_FROM))
+            events.append((path, deleted))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+# ---------------------------
+# Polling fallback
+# ---------------------------
+
+class PollingWatcher:
+    def __init__(self, roots, interval=5.0):
+        self.roots = roots
+        self.interval = interval
+        self.overflowed = False
+        self._next = time.monotonic() + interval
+        self._seen = self._snapshot()
+
+    def _snapshot(self):
+        seen = {}
+        for root in self.roots:
+            for base, _, names in os.walk(root):
+                for n in names:
+                    p = os.path.join(base, n)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    seen[p] = (st.st_size, st.st_mtime_ns)
+        return seen
+
+    def poll(self, timeout):
+        wait = self._next - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(0.0, wait))
+        self._next = time.monotonic() + self.interval
+
+        now = self._snapshot()
+        events = [(p, False) for p, key in now.items() if self._seen.get(p) != key]
+        events += [(p, True) for p in self._seen if p not in now]
+        self._seen = now
+        return events
+
+    def close(self):
+        pass
+
+def make_watcher(roots, interval=5.0):
+    try:
+        return InotifyWatcher(roots)
+    except (OSError, AttributeError):
+        return PollingWatcher(roots, interval)
+
+# ---------------------------
+# Debounce
+# ---------------------------
+
+class Debouncer:
+    """A file is ready once it saw no events for `settle` seconds and its
+    size/mtime did not move between two consecutive checks."""
+
+    def __init__(self, settle=2.0):
+        self.settle = settle
+        self.pending = {}
+
+    def touch(self, path):
+        self.pending[path] = (time.monotonic(), None)
+
+    def discard(self, path):
+        """forget path, or everything under it when a folder went away"""
+        prefix = path + os.sep
+        for p in list(self.pending):
+            if p == path or p.startswith(prefix):
+                del self.pending[p]
+
+    def ready(self):
+        now = time.monotonic()
+        out = []
+        for path, (last, key) in list(self.pending.items()):
+            if now - last < self.settle:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                self.pending.pop(path)
+                continue
+            if not os.path.isfile(path):
+                self.pending.pop(path)
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            if current != key:
+                self.pending[path] = (now, current)
+                continue
+            self.pending.pop(path)
+            out.append(path)
+        return sorted(out)